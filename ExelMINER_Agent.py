@@ -1,5 +1,3 @@
-import io
-
 import re
 
 import pandas as pd
@@ -8,225 +6,149 @@ import openpyxl
 
 import numpy as np
 
-import pytest
-
 from openpyxl.utils import get_column_letter
 
-from typing import Dict, List, Any, Optional
-
-from pydantic import BaseModel
-
-from langgraph.graph import StateGraph, END, START
-
-from langchain_openai import ChatOpenAI
-
-from contextlib import redirect_stdout
-
-from dotenv import load_dotenv
-
-import traceback
-
-
-
-load_dotenv()
-
-
-
-# --- STEP 1: DUAL-CONTEXT MINER ---
-
-class IndustryLogicMiner:
-
-    def __init__(self, file_path: str):
-
-        self.file_path = file_path
-
-        self.wb = openpyxl.load_workbook(file_path, data_only=False, read_only=True)
-
-        self.val_wb = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
-
-
-
-    def _get_header_map(self, ws_v) -> Dict[str, str]:
-
-        header_row = next(ws_v.iter_rows(min_row=1, max_row=1), [])
-
-        return {get_column_letter(i): re.sub(r'[^a-zA-Z0-9_]', '_', str(c.value or f"Col_{i}"))
-
-                for i, c in enumerate(header_row, 1)}
-
-
-
-    def _map_formula(self, formula: str, header_map: Dict[str, str]) -> Dict[str, str]:
+from logic_miner import IndustryLogicMiner
 
-        if not isinstance(formula, str): return {"raw": "", "semantic": ""}
+from formula_transpiler import (CALCULATOR_SCAFFOLD, CALCULATOR_RUNTIME_IMPORT, RUNTIME_IMPORT, properties_named,
+                                transpile_calculator)
 
-        row_match = re.search(r'\d+', formula)
+from header_index import load_header_index
 
-        row_num = row_match.group(0) if row_match else ""
+from dependency_graph import ensure_import, install_methods
 
-        raw_pattern = formula.replace(row_num, "{n}") if row_num else formula
+from metadata_cache import MetadataCache
 
-       
+from speculative import speculate
 
-        def to_header(match):
+from llm_cache import CachedLLM, LLMCache
 
-            col = match.group(1)
+from prompt_encoder import encode_metadata, token_report
 
-            return f"df['{header_map.get(col, col)}']"
+from sandbox_pool import SandboxPool
 
-       
+from sharded_pytest import run_tests
 
-        semantic_pattern = re.sub(r'\$?([A-Z]+)\$?\d+', to_header, formula)
+from workspace import Workspace, new_run_id
 
-        return {"excel_pattern": raw_pattern, "python_semantic": semantic_pattern}
+from checkpointing import SqliteCheckpointer, run_or_resume
 
+from typing import Dict, List, Any, Optional
 
+from pydantic import BaseModel
 
-    def extract_full_context(self) -> Dict[str, Any]:
-
-        model_meta = {}
-
-        for sheet_name in self.wb.sheetnames:
-
-            # ws has formulas, ws_v has values
-
-            ws = self.wb[sheet_name]
-
-            ws_v = self.val_wb[sheet_name]
-
-           
-
-            header_map = self._get_header_map(ws_v)
-
-            vector_rules = {}
-
-           
-
-            # 1. EXTRACT LOGIC FROM 'ws' (The one WITH formulas)
-
-            # Use ws here, not ws_v
-
-            for row in ws.iter_rows(min_row=2, max_row=11):
-
-                for col_idx, cell in enumerate(row, start=1):
-
-                    # In ws, cell.value will be the string "=VLOOKUP..."
-
-                    if cell and isinstance(cell.value, str) and cell.value.startswith('='):
-
-                        col_letter = get_column_letter(col_idx)
-
-                        header_name = header_map[col_letter]
-
-                       
-
-                        if header_name not in vector_rules:
+from langgraph.graph import StateGraph, END, START
 
-                            patterns = self._map_formula(cell.value, header_map)
+from langchain_openai import ChatOpenAI
 
-                            vector_rules[header_name] = {
+from dotenv import load_dotenv
 
-                                "excel_col": col_letter,
+import traceback
 
-                                **patterns
+import sys
 
-                            }
+import threading
 
-           
 
-            # 2. EXTRACT SCHEMA FROM 'ws_v' (The one WITH calculated values)
 
-            df_sample = pd.DataFrame([
+load_dotenv()
 
-                {header_map[get_column_letter(i)]: c.value for i, c in enumerate(r, 1)}
 
-                for r in ws_v.iter_rows(min_row=2, max_row=100)
 
-            ]).dropna(how='all')
+# --- STEP 1: SINGLE-PASS MINER (logic_miner.py) ---
 
 
 
-            schema = {}
+# --- STEP 2: AGENT STATE ---
 
-            # ... (Rest of your schema logic remains the same) ...
+class AgentState(BaseModel):
 
-            for col in df_sample.columns:
+    excel_path: str
 
-                series = df_sample[col]
+    run_id: Optional[str] = None     # artifacts go to .runs/<run_id>/ (assigned by the miner if not given)
 
-                if pd.api.types.is_numeric_dtype(series):
+    metadata: Dict[str, Any] = {}
 
-                    # Ensure we handle empty sheets to avoid min/max errors
+    generated_code: str = ""
 
-                    s_min = series.min()
+    unit_tests: str = ""
 
-                    s_max = series.max()
+    test_results: str = ""
 
-                    schema[col] = {
+    error_log: Optional[str] = None
 
-                        "type": "numeric",
+    iterations: int = 0
 
-                        "min": float(s_min) if pd.notnull(s_min) else 0,
+    is_validated: bool = False
 
-                        "max": float(s_max) if pd.notnull(s_max) else 0
+    miner_workers: Optional[int] = 1
 
-                    }
+    speculative_k: int = 1          # > 1: race this many architect candidates concurrently
 
-                else:
+    sandboxed: bool = False         # the architect already ran generated_code through the sandbox (speculative winner)
 
-                    schema[col] = {
+    max_llm_concurrency: int = 2    # LLM calls in flight at once (API rate limits)
 
-                        "type": "categorical",
+    test_workers: Optional[int] = None   # pytest shards run in parallel (None: one per core)
 
-                    }
+    test_passed: bool = False
 
-           
+    test_failures: List[Dict[str, Any]] = []   # failing / erroring tests: nodeid, outcome, message, diff
 
-            model_meta[sheet_name] = {"logic": vector_rules, "schema": schema}
+    test_durations: Dict[str, float] = {}       # previous run, used to balance the shards
 
-           
+    test_rounds: int = 0
 
-        return model_meta
+    max_test_rounds: int = 3
 
-       
 
 
+# --- STEP 3: NODES ---
 
-# --- STEP 2: AGENT STATE ---
+# Shared clients and caches are built on first use, never at import: spawned sandbox
+# workers re-import the main script (as __mp_main__) and must not rebuild them.
+_singletons: Dict[str, Any] = {}
 
-class AgentState(BaseModel):
+_singletons_lock = threading.RLock()
 
-    excel_path: str
 
-    metadata: Dict[str, Any] = {}
+def _singleton(name: str, build):
+    with _singletons_lock:
+        if name not in _singletons:
+            _singletons[name] = build()
+        return _singletons[name]
 
-    generated_code: str = ""
 
-    unit_tests: str = ""
+def get_llm_cache() -> LLMCache:
+    # Identical prompts (same model parameters) are answered from .llm_cache/ on reruns
+    return _singleton("llm_cache", LLMCache)
 
-    test_results: str = ""
 
-    error_log: Optional[str] = None
+def get_llm() -> CachedLLM:
+    return _singleton("llm", lambda: CachedLLM(ChatOpenAI(model="gpt-4o", temperature=0), get_llm_cache()))
 
-    iterations: int = 0
 
-    is_validated: bool = False
+def get_sandbox_pool() -> SandboxPool:
+    # Generated code runs in pre-warmed worker processes (started on first use)
+    return _singleton("sandbox_pool", lambda: SandboxPool(workers=2, timeout=60, cpu_seconds=60, memory_mb=2048))
 
 
+def get_metadata_cache() -> MetadataCache:
+    return _singleton("metadata_cache", MetadataCache)
 
-# --- STEP 3: NODES ---
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
 
+def miner_node(state: AgentState):
 
+    miner = IndustryLogicMiner(state.excel_path, cache=get_metadata_cache(), max_workers=state.miner_workers)
 
-def miner_node(state: AgentState):
+    metadata = miner.extract_full_context()
 
-    miner = IndustryLogicMiner(state.excel_path)
+    print(f"Excel Extract: {metadata}\n")
 
-    print(f"Excel Extract: {miner.extract_full_context()}\n")
+    print(f"Metadata cache: {get_metadata_cache().stats()}\n")
 
-    return {"metadata": miner.extract_full_context()}
+    return {"metadata": metadata, "run_id": state.run_id or new_run_id()}
 
 
 
@@ -234,6 +156,31 @@ def architect_node(state: AgentState):
 
     feedback = f"\nFIX ERROR FROM PREVIOUS ATTEMPT: {state.error_log}" if state.error_log else ""
 
+    # Fast path: transpilable formulas skip the LLM on every attempt. A retry hands the LLM
+    # the properties the error names (failing unit tests, a property that raised) on top of
+    # the untranspilable ones; only an error that names no property sends every formula.
+    header_index = load_header_index(state.excel_path)
+    transpiled, llm_columns = transpile_calculator(state.metadata, header_index)
+    if state.error_log:
+        named = properties_named(state.error_log, state.metadata)
+        if not named:
+            transpiled, llm_columns = {}, []
+        for node in named:
+            if transpiled.pop(node.partition(".")[2].lower(), None) is not None:
+                llm_columns.append(node)
+        print(f"Retry: {len(transpiled)} transpiled properties kept, LLM writes {llm_columns or 'everything'}")
+    elif not llm_columns:
+        print(f"All {len(transpiled)} formulas transpiled, skipping the LLM")
+        code = install_methods(CALCULATOR_SCAFFOLD, transpiled, "ExcelCalculator")
+        return {"generated_code": code, "iterations": state.iterations + 1, "sandboxed": False}
+
+    only = (f"8. Only write the properties for: {llm_columns}. These are generated automatically, "
+            f"do NOT write them: {list(transpiled)}") if transpiled else ""
+
+    # Compact metadata (see prompt_encoder); with a fast path only the LLM's columns are sent
+    metadata_text = encode_metadata(state.metadata, only=llm_columns if transpiled else None, header_index=header_index)
+    print(f"Prompt metadata: {token_report(str(state.metadata), metadata_text)}")
+
     prompt = f"""
 
     You are a Senior Python Developer. Translate Excel sheet logic into a vectorized Python class.
@@ -248,9 +195,9 @@ def architect_node(state: AgentState):
 
    
 
-    METADATA, FORMULAS & SCHEMA CONTEXT (No real data):
+    METADATA, FORMULAS & SCHEMA CONTEXT (No real data; "refs" map the formula's cell letters to column names):
 
-    {state.metadata}
+{metadata_text}
 
    
 
@@ -260,9 +207,11 @@ def architect_node(state: AgentState):
 
     REQUIREMENTS:
 
-    1. Define 'ExcelCalculator(df: pd.DataFrame, all_data: Dict[str, pd.DataFrame])'.
+    1. Define 'ExcelCalculator(df: pd.DataFrame, all_data: Dict[str, pd.DataFrame])' as a subclass of
+       'CalculatorBase' ('from calculator_runtime import CalculatorBase, formula_property').
 
-    2. Map every 'logic' from the metadata to a @property.
+    2. Map every 'logic' from the metadata to a @formula_property (a cached @property). Properties may use
+       each other (e.g. 'self.total_sales'); each one is computed only once.
 
     3. If a formula references another sheet (e.g., 'Products!A1'), access it via 'self.all_data["Products"]'.
 
@@ -270,47 +219,70 @@ def architect_node(state: AgentState):
 
     5. Return ONLY the code inside a markdown code block. No need to be chatty.
 
-    6. Use the 'schema' to determine if columns are floats, ints, or strings.
+    6. Use the input column types (int, float, str) to determine if columns are floats, ints, or strings.
 
     7. Ensure code handles potential NaNs if ranges suggest empty cells.
 
-    """
+    {only}
 
-    res = llm.invoke(prompt)
+    9. For VLOOKUP / INDEX-MATCH do NOT merge DataFrames. Use the first-match lookup runtime:
+       `from lookup_runtime import LookupIndex`, then
+       `LookupIndex(products["ProductID"]).match(self.df["ProductID"]).take(products["BasePrice"])`.
 
-    code_match = re.search(r"```python\s+(.*?)\s+```", res.content, re.DOTALL)
+    """
 
-    if code_match:
+    def finish(content: str) -> str:
 
-        code = code_match.group(1)
-
-    else:
+        code_match = re.search(r"```python\s+(.*?)\s+```", content, re.DOTALL)
 
         # Fallback if no backticks
+        code = code_match.group(1) if code_match else content
 
-        code = res.content
+        code = install_methods(code, transpiled, "ExcelCalculator")
+        if transpiled:
+            code = ensure_import(ensure_import(code, CALCULATOR_RUNTIME_IMPORT), RUNTIME_IMPORT)
+        return code
 
-    print(f"HumanMessage\n: {prompt} \n AIMessage\n: {res.content} \n OutpuCode\n: {code}")
+    if state.speculative_k > 1:
 
-    return {"generated_code": code, "iterations": state.iterations + 1}
+        # Speculative mode: K candidates (temperature/seed varied) race through the sandbox
+        async def generate(settings):
+            res = await get_llm().bind(**settings).ainvoke(prompt)
+            return finish(res.content)
 
+        def validate(code):
+            result = sandbox_node(state.model_copy(update={"generated_code": code}))
+            return result["is_validated"], result
 
+        result = speculate(generate, validate, k=state.speculative_k, max_concurrency=state.max_llm_concurrency)
+        print(f"Speculative architect: {result.summary()}")
+        produced = sorted((c for c in result.candidates if c.value is not None), key=lambda c: c.index)
+        if result.winner is None and not produced:
+            raise RuntimeError(f"Every architect call failed: {result.candidates[0].report}")
+        # Nothing passed: carry the base-temperature candidate into the repair loop
+        chosen = result.winner or produced[0]
+        if isinstance(chosen.report, dict):
+            # Sandboxed during the race: the graph goes straight to the router with its verdict
+            return {"generated_code": chosen.value, "iterations": state.iterations + 1, **chosen.report, "sandboxed": True}
+        return {"generated_code": chosen.value, "iterations": state.iterations + 1, "sandboxed": False}
 
+    res = get_llm().invoke(prompt)
 
+    code = finish(res.content)
 
-def sandbox_node(state: AgentState):
+    print(f"HumanMessage\n: {prompt} \n AIMessage\n: {res.content} \n OutpuCode\n: {code}")
 
-    print(f"\n--- 🔒 ANONYMOUS STRUCTURE TEST ---")
+    return {"generated_code": code, "iterations": state.iterations + 1, "sandboxed": False}
 
-    try:
 
-        exec_context = {"pd": pd, "np": np, "Dict": Dict, "Any": Any}
 
-        exec(state.generated_code, exec_context)
 
-        CalculatorClass = exec_context.get("ExcelCalculator")
 
+def sandbox_node(state: AgentState):
+
+    print(f"\n--- 🔒 ANONYMOUS STRUCTURE TEST ---")
 
+    try:
 
         # GENERATE FULLY ANONYMOUS TEST DATA
 
@@ -344,23 +316,26 @@ def sandbox_node(state: AgentState):
 
 
 
-        # TEST EXECUTION
+        # TEST EXECUTION: out of process, under time / CPU / memory limits
 
-        for sheet, meta in state.metadata.items():
+        logic = {sheet: list(meta['logic'].keys()) for sheet, meta in state.metadata.items() if meta['logic']}
+
+        run = get_sandbox_pool().run("calculator_properties", state.generated_code, synthetic_context, logic=logic)
 
-            if not meta['logic']: continue
+        if not run.ok:
 
-            calc = CalculatorClass(df=synthetic_context[sheet], all_data=synthetic_context)
+            # Last line of the worker traceback (or the limit that stopped it)
+            raise RuntimeError(run.error.strip().splitlines()[-1])
 
-           
+        for checked in run.value["checked"]:
 
-            for col in meta['logic'].keys():
+            # If it executes without error, the logic is structurally sound
 
-                actual = getattr(calc, col.lower())
+            print(f" ✅ Structural Match: {checked}")
 
-                # If it executes without error, the logic is structurally sound
+        print("\n".join(f"    ⏱️ {line}" for line in run.value["timings"]))
 
-                print(f" ✅ Structural Match: {sheet} -> {col}")
+        print(f"    Sandbox: {run.seconds:.2f}s wall, {run.cpu_seconds:.2f}s CPU, peak {run.peak_mb:.0f} MB")
 
 
 
@@ -378,11 +353,19 @@ def sandbox_node(state: AgentState):
 
 def test_gen_node(state: AgentState):
 
+    # The previous suite could not run (see test_router): say why
+    broken = state.test_failures and all(f["outcome"] == "error" for f in state.test_failures)
+
+    feedback = "\n".join(f"- {f['nodeid']}: {f['message']}\n{f['details']}" for f in state.test_failures) if broken else ""
+
+    feedback = f"\n    THE PREVIOUS TEST FILE FAILED TO RUN, FIX IT:\n{feedback}\n" if feedback else ""
+
     prompt = f"""
     Write a pytest file for this code:
     {state.generated_code}
     
-    Metadata: {state.metadata}
+    Metadata:
+{encode_metadata(state.metadata, header_index=load_header_index(state.excel_path))}
     
     REQUIREMENTS:
     1. Import the calculator as 'from model import ExcelCalculator'.
@@ -390,9 +373,9 @@ def test_gen_node(state: AgentState):
     3. IMPORTANT: For every test assertion, include a message that prints the expected value and the actual value.
        Example: assert actual == expected, f"Failed! Expected: {{expected}}, but got: {{actual}}"
     4. Ensure the tests cover cross-sheet logic.
-    """
+    {feedback}"""
 
-    res = llm.invoke(prompt)
+    res = get_llm().invoke(prompt)
 
     code_match = re.search(r"```python\s+(.*?)\s+```", res.content, re.DOTALL)
 
@@ -414,12 +397,15 @@ def test_gen_node(state: AgentState):
 
 def execute_tests_node(state: AgentState):
 
-    with open("model.py", "w") as f: f.write(state.generated_code)
+    # Own directory per run: concurrent invokes never overwrite each other's model / tests
+    workspace = Workspace(state.run_id)
+
+    workspace.write("model.py", state.generated_code)
 
-    with open("test_model.py", "w") as f: f.write(state.unit_tests)
+    workspace.write("test_model.py", state.unit_tests)
 
     # 3. Create the demo XLSX with float precision
-    output_xlsx = "pytest_demo_data.xlsx"
+    output_xlsx = workspace.path("pytest_demo_data.xlsx")
     with pd.ExcelWriter(output_xlsx, engine='openpyxl') as writer:
         for sheet, meta in state.metadata.items():
             rows = 10
@@ -432,13 +418,28 @@ def execute_tests_node(state: AgentState):
                     dummy_data[col] = [f"PLACEHOLDER_{i}" for i in range(rows)]
             pd.DataFrame(dummy_data).to_excel(writer, sheet_name=sheet, index=False)
 
-    f_io = io.StringIO()
+    # Fresh interpreters per shard: the model module is never served from a previous iteration
+    run = run_tests("test_model.py", workers=state.test_workers, cwd=workspace.dir,
+                    durations=state.test_durations, pythonpath=workspace.pythonpath())
+
+    print(f"Unit tests ({workspace.dir}): {run.summary()}")
+
+    failures = [f._asdict() for f in run.failures()]
 
-    with redirect_stdout(f_io):
+    if run.collection_error is not None:
 
-        pytest.main(["-v", "-s", "test_model.py"])
+        failures = [{"nodeid": "test_model.py", "outcome": "error", "message": "collection failed",
+                     "diff": "", "details": run.collection_error}]
 
-    return {"test_results": f_io.getvalue()}
+    error_log = None
+
+    if failures:
+
+        error_log = "Unit test failures:\n" + "\n".join(
+            f"- {f['nodeid']}: {f['diff'] or f['message']}" for f in failures)
+
+    return {"test_results": run.report(), "test_passed": run.passed, "test_failures": failures,
+            "test_durations": run.durations(), "test_rounds": state.test_rounds + 1, "error_log": error_log}
 
 
 
@@ -464,10 +465,6 @@ workflow.add_edge(START, "mine")
 
 workflow.add_edge("mine", "architect")
 
-workflow.add_edge("architect", "sandbox")
-
-
-
 def router(state: AgentState):
 
     if state.is_validated: return "generate"
@@ -476,15 +473,45 @@ def router(state: AgentState):
 
 
 
+def architect_router(state: AgentState):
+
+    # A speculative winner comes with its sandbox verdict: don't run the same code twice
+    return router(state) if state.sandboxed else "sandbox"
+
+
+
+workflow.add_conditional_edges("architect", architect_router,
+                               {"sandbox": "sandbox", "generate": "test_gen", "retry": "architect", "end": END})
+
+
+
 workflow.add_conditional_edges("sandbox", router, {"generate": "test_gen", "retry": "architect", "end": END})
 
 workflow.add_edge("test_gen", "run_tests")
 
-workflow.add_edge("run_tests", END)
 
 
+def test_router(state: AgentState):
+
+    if state.test_passed: return "done"
+
+    if state.test_rounds >= state.max_test_rounds or state.iterations >= 5: return "end"
+
+    # Only errors (suite does not import, broken fixtures): the tests are at fault, write new ones.
+    # Failed assertions go back to the architect with the diffs in error_log.
+    if all(f["outcome"] == "error" for f in state.test_failures): return "regenerate"
+
+    return "repair"
 
-agent = workflow.compile()
+
+
+workflow.add_conditional_edges("run_tests", test_router, {"done": END, "end": END, "regenerate": "test_gen", "repair": "architect"})
+
+
+
+def get_agent():
+    # State is checkpointed after every node (thread id = run id): see run_or_resume
+    return _singleton("agent", lambda: workflow.compile(checkpointer=SqliteCheckpointer(".checkpoints/agent.sqlite")))
 
 
 
@@ -492,6 +519,13 @@ agent = workflow.compile()
 
 if __name__ == "__main__":
 
-    final_result = agent.invoke({"excel_path": "complex_financial_model_4.xlsx"})
+    # `python ExelMINER_Agent.py <run_id>` resumes an interrupted run from its last completed node
+    run_id = sys.argv[1] if len(sys.argv) > 1 else new_run_id()
+
+    final_result = run_or_resume(get_agent(), {"excel_path": "complex_financial_model_4.xlsx", "run_id": run_id}, run_id)
+
+    print("\n--- PYTEST RESULTS ---\n", final_result.get("test_results", "No tests run."))
+
+    print(f"LLM cache: {get_llm_cache().summary()}")
 
-    print("\n--- PYTEST RESULTS ---\n", final_result.get("test_results", "No tests run."))
\ No newline at end of file
+    print(f"Artifacts: {Workspace(final_result['run_id']).dir}")
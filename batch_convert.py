@@ -0,0 +1,247 @@
+import os
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import threading
+import traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, NamedTuple
+
+from llm_cache import metered
+from checkpointing import run_or_resume
+
+
+# --- BATCH CONVERSION ---
+# Both entry points converted one hard-coded workbook. This one takes a directory
+# (every .xlsx in it) or a manifest (one path per line, or a JSON list) and runs
+# the agent graph (ExelMINER_Agent) over all of them:
+#
+#   mining processes --(bounded queue)--> conversion threads (LLM, sandbox, pytest)
+#
+#   * mining is CPU-bound and runs in a spawn process pool; it fills the shared
+#     .miner_cache, so the graph's own miner node is a cache hit afterwards
+#   * conversions are mostly LLM round trips and run in threads; at most
+#     `queue_size` mined workbooks wait, so mining never runs far ahead
+#   * every finished workbook is appended to <out>/ledger.jsonl (flushed at once).
+#     A rerun skips workbooks whose content hash already has a final status, so an
+#     interrupted batch resumes where it stopped; "error" entries are retried, and a
+#     conversion that died halfway continues from its last graph checkpoint
+#   * <out>/summary.csv: status, iterations, wall time and token spend per workbook
+#
+#   python batch_convert.py templates/ --out .runs/batch --convert-workers 4
+#
+# Statuses: passed (structure + unit tests), tests_failed, invalid (no structurally
+# valid code within the iteration budget), error (crashed / interrupted).
+
+FINAL_STATUSES = ("passed", "tests_failed", "invalid")
+SUMMARY_COLUMNS = ["workbook", "status", "iterations", "mine_s", "convert_s", "wall_s",
+                   "input_tokens", "output_tokens", "llm_calls", "cached_calls", "run_id", "error"]
+
+
+class BatchJob(NamedTuple):
+    path: str
+    key: str      # sha256 of the file: an edited workbook is converted again
+
+
+def file_key(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discover(source: str) -> List[str]:
+    """Workbooks in a directory (recursive), or listed in a manifest (.json list / one path per line)."""
+    if os.path.isdir(source):
+        found = []
+        for dirpath, _, names in os.walk(source):
+            # "~$book.xlsx" is Excel's lock file of an open workbook
+            found += [os.path.join(dirpath, n) for n in names if n.lower().endswith(".xlsx") and not n.startswith("~$")]
+        return sorted(found)
+    with open(source, encoding="utf-8") as fh:
+        text = fh.read()
+    paths = json.loads(text) if source.lower().endswith(".json") else [
+        line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    # Relative manifest entries are relative to the manifest
+    base = os.path.dirname(os.path.abspath(source))
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+
+# --- Ledger (resume state) ---
+class Ledger:
+    def __init__(self, out_dir: str):
+        self.path = os.path.join(out_dir, "ledger.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(out_dir, exist_ok=True)
+
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        """Latest record per workbook path."""
+        latest = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue   # torn last line of an interrupted run
+                    latest[record["workbook"]] = record
+        return latest
+
+    def append(self, record: Dict[str, Any]):
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+def pending(jobs: List[BatchJob], done: Dict[str, Dict[str, Any]], retry_failed: bool = False) -> List[BatchJob]:
+    statuses = ("passed",) if retry_failed else FINAL_STATUSES
+    return [job for job in jobs
+            if not (job.path in done and done[job.path]["key"] == job.key and done[job.path]["status"] in statuses)]
+
+
+# --- Stages ---
+def _mine(path: str) -> float:
+    """Process pool task: mine one workbook into the shared metadata cache."""
+    from logic_miner import IndustryLogicMiner
+    from metadata_cache import MetadataCache
+
+    start = time.perf_counter()
+    IndustryLogicMiner(path, cache=MetadataCache(), max_workers=1).extract_full_context()
+    return time.perf_counter() - start
+
+
+def run_id_for(job: BatchJob) -> str:
+    # Stable per (path, content): a crashed conversion resumes from its checkpoint on the next batch run
+    return f"batch-{hashlib.sha256(job.path.encode()).hexdigest()[:8]}-{job.key[:12]}"
+
+
+def _convert(job: BatchJob, overrides: Dict[str, Any], recursion_limit: int, restart: bool) -> Dict[str, Any]:
+    # Imported here: spawned mining processes must not build the LLM client and sandbox pool
+    from ExelMINER_Agent import get_agent
+
+    start = time.perf_counter()
+    run_id = run_id_for(job)
+    with metered() as usage:
+        try:
+            final = run_or_resume(get_agent(), {"excel_path": job.path, "run_id": run_id, **overrides}, run_id,
+                                  restart=restart, recursion_limit=recursion_limit)
+            status = ("passed" if final.get("test_passed") else "tests_failed") if final.get("is_validated") else "invalid"
+            record = {"status": status, "iterations": final.get("iterations", 0), "run_id": final.get("run_id"),
+                      "error": None if status == "passed" else (final.get("error_log") or "")[:500]}
+        except Exception:
+            record = {"status": "error", "iterations": 0, "run_id": run_id,
+                      "error": traceback.format_exc().strip().splitlines()[-1]}
+    return {**record, "convert_s": round(time.perf_counter() - start, 2), "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"], "llm_calls": usage["calls"], "cached_calls": usage["cached_calls"]}
+
+
+async def _run(jobs: List[BatchJob], ledger: Ledger, mine_workers: int, convert_workers: int, queue_size: int,
+               overrides: Dict[str, Any], recursion_limit: int, restart: set, log) -> None:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+    slots = asyncio.Semaphore(max(1, mine_workers))
+
+    # spawn: forking a process that already runs LLM client threads is unsafe
+    with ProcessPoolExecutor(max_workers=max(1, mine_workers), mp_context=mp.get_context("spawn")) as miners:
+
+        async def mine(job: BatchJob):
+            # The slot is held until the queue takes the workbook: a full queue pauses mining
+            async with slots:
+                try:
+                    seconds, error = await loop.run_in_executor(miners, _mine, job.path), None
+                except Exception as e:
+                    seconds, error = 0.0, f"mining: {type(e).__name__}: {e}"
+                await queue.put((job, seconds, error))
+
+        async def produce():
+            await asyncio.gather(*(mine(job) for job in jobs))
+            for _ in range(convert_workers):
+                await queue.put(None)
+
+        async def consume():
+            while (item := await queue.get()) is not None:
+                job, mine_s, error = item
+                if error is None:
+                    result = await asyncio.to_thread(_convert, job, overrides, recursion_limit, job.path in restart)
+                else:
+                    result = {"status": "error", "iterations": 0, "run_id": None, "error": error, "convert_s": 0.0,
+                              "input_tokens": 0, "output_tokens": 0, "llm_calls": 0, "cached_calls": 0}
+                record = {"workbook": job.path, "key": job.key, "mine_s": round(mine_s, 2),
+                          "wall_s": round(mine_s + result["convert_s"], 2), "finished": time.time(), **result}
+                ledger.append(record)
+                log(f"[{record['status']:>12}] {os.path.basename(job.path)}: {record['iterations']} iterations, "
+                    f"{record['wall_s']:.1f}s, {record['input_tokens'] + record['output_tokens']:,} tokens")
+
+        await asyncio.gather(produce(), *(consume() for _ in range(convert_workers)))
+
+
+# --- Summary ---
+def write_summary(records: List[Dict[str, Any]], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=SUMMARY_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def format_table(records: List[Dict[str, Any]]) -> str:
+    columns = ["workbook", "status", "iterations", "wall_s", "input_tokens", "output_tokens"]
+    rows = [[os.path.basename(str(r["workbook"]))] + [str(r.get(c, "")) for c in columns[1:]] for r in records]
+    widths = [max([len(c)] + [len(row[i]) for row in rows]) for i, c in enumerate(columns)]
+    lines = ["  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in [columns] + rows]
+    counts: Dict[str, int] = {}
+    for r in records:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    tokens = sum(r.get("input_tokens", 0) + r.get("output_tokens", 0) for r in records)
+    lines.append(f"{len(records)} workbooks: " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items()))
+                 + f"; {tokens:,} tokens")
+    return "\n".join(lines)
+
+
+def convert_batch(source: str, out_dir: str = os.path.join(".runs", "batch"), mine_workers: int = 2,
+                  convert_workers: int = 4, queue_size: Optional[int] = None, retry_failed: bool = False,
+                  overrides: Optional[Dict[str, Any]] = None, recursion_limit: int = 100,
+                  log=print) -> List[Dict[str, Any]]:
+    """
+    Converts every workbook of `source` (directory or manifest) that has no final
+    status in <out_dir>/ledger.jsonl yet. `overrides` go into every AgentState
+    (e.g. {"speculative_k": 3}). Returns the summary rows of all workbooks of
+    `source`, including the ones finished by earlier runs.
+    """
+    ledger = Ledger(out_dir)
+    jobs = [BatchJob(os.path.abspath(p), file_key(p)) for p in discover(source)]
+    done = ledger.records()
+    todo = pending(jobs, done, retry_failed)
+    # Retried tests_failed / invalid runs start over; crashed ones resume from their checkpoint
+    restart = {job.path for job in todo if done.get(job.path, {}).get("status") in FINAL_STATUSES}
+    log(f"{len(jobs)} workbooks, {len(jobs) - len(todo)} already done, {len(todo)} to convert")
+    if todo:
+        asyncio.run(_run(todo, ledger, mine_workers, convert_workers, queue_size or 2 * convert_workers,
+                         overrides or {}, recursion_limit, restart, log))
+
+    done = ledger.records()
+    records = [done[job.path] for job in jobs if job.path in done]
+    write_summary(records, os.path.join(out_dir, "summary.csv"))
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert many Excel workbooks with the ExelMINER agent.")
+    parser.add_argument("source", help="directory of .xlsx files, or a manifest (.json list / one path per line)")
+    parser.add_argument("--out", default=os.path.join(".runs", "batch"), help="ledger + summary.csv directory")
+    parser.add_argument("--mine-workers", type=int, default=2)
+    parser.add_argument("--convert-workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=None, help="mined workbooks waiting for conversion")
+    parser.add_argument("--retry-failed", action="store_true", help="also redo tests_failed / invalid workbooks")
+    parser.add_argument("--speculative-k", type=int, default=1)
+    args = parser.parse_args()
+
+    summary = convert_batch(args.source, args.out, args.mine_workers, args.convert_workers, args.queue_size,
+                            args.retry_failed, {"speculative_k": args.speculative_k})
+    print(format_table(summary))
+    print(f"Summary: {os.path.join(args.out, 'summary.csv')}")
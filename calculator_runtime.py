@@ -0,0 +1,180 @@
+import time
+from collections.abc import MutableMapping
+from typing import Dict, List, Any, Iterator, Optional, NamedTuple
+
+import pandas as pd
+
+
+# --- MEMOIZED CALCULATOR RUNTIME ---
+# Base class for the generated ExcelCalculator(df, all_data). Properties declared
+# with @formula_property are computed once and cached. Each cached value remembers
+# which input frames it read (self.df and the all_data sheets, including those read
+# by other formula properties it used), and it is recomputed when one of them is
+# replaced by a different DataFrame. In-place edits of a frame are not tracked:
+# assign a new frame, or call invalidate().
+#
+#   class ExcelCalculator(CalculatorBase):
+#       @formula_property
+#       def total_sales(self):
+#           return self.all_data['Sales']['Price_Adjusted'].sum()
+
+ACTIVE_SHEET = None   # input key of `self.df` in the dependency records
+
+
+class _Entry(NamedTuple):
+    value: Any
+    inputs: Dict[Optional[str], Any]   # sheet (None = self.df) -> frame object that was read
+
+
+class _TrackedData(MutableMapping):
+    """View over the caller's all_data dict that records which sheets a formula reads."""
+
+    def __init__(self, data: Dict[str, pd.DataFrame], owner: "CalculatorBase"):
+        self.data = data
+        self._owner = owner
+
+    def __getitem__(self, sheet: str) -> pd.DataFrame:
+        frame = self.data[sheet]
+        self._owner._record({sheet: frame})
+        return frame
+
+    def __setitem__(self, sheet: str, frame: pd.DataFrame):
+        self.data[sheet] = frame
+
+    def __delitem__(self, sheet: str):
+        del self.data[sheet]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"_TrackedData({list(self.data)})"
+
+
+class formula_property:
+    """Like @property, but memoized and timed by CalculatorBase."""
+
+    def __init__(self, fget):
+        self.fget = fget
+        self.name = fget.__name__
+        self.__doc__ = fget.__doc__
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if not isinstance(obj, CalculatorBase):
+            # Installed into a class that does not use the runtime: plain property
+            return self.fget(obj)
+        return obj._formula_value(self.name, self.fget)
+
+
+class CalculatorBase:
+    """
+    Keeps the (df, all_data) interface of the generated calculators. Subclasses may
+    set `self.df` / `self.all_data` in their own __init__ without calling super().
+    """
+
+    def __init__(self, df: pd.DataFrame, all_data: Dict[str, pd.DataFrame]):
+        self.df = df
+        self.all_data = all_data
+
+    # --- tracked inputs ---
+
+    @property
+    def df(self) -> pd.DataFrame:
+        frame = self.__dict__.get("_df")
+        self._record({ACTIVE_SHEET: frame})
+        return frame
+
+    @df.setter
+    def df(self, frame: pd.DataFrame):
+        self.__dict__["_df"] = frame
+
+    @property
+    def all_data(self) -> _TrackedData:
+        return self.__dict__.get("_all_data")
+
+    @all_data.setter
+    def all_data(self, data: Dict[str, pd.DataFrame]):
+        if isinstance(data, _TrackedData):
+            data = data.data
+        # No copy: replacing a sheet in the caller's dict is seen by the cache
+        self.__dict__["_all_data"] = _TrackedData(data, self)
+
+    def _state(self) -> Dict[str, Any]:
+        state = self.__dict__.get("_formula_state")
+        if state is None:
+            state = self.__dict__["_formula_state"] = {"cache": {}, "stats": {}, "reads": [], "timers": []}
+        return state
+
+    def _record(self, inputs: Dict[Optional[str], Any]):
+        reads = self._state()["reads"]
+        if reads:
+            reads[-1].update(inputs)
+
+    def _current(self, sheet: Optional[str]) -> Any:
+        if sheet is ACTIVE_SHEET:
+            return self.__dict__.get("_df")
+        return self.__dict__["_all_data"].data.get(sheet)
+
+    def _fresh(self, entry: _Entry) -> bool:
+        return all(self._current(sheet) is frame for sheet, frame in entry.inputs.items())
+
+    # --- memoization ---
+
+    def _formula_value(self, name: str, fget) -> Any:
+        state = self._state()
+        stats = state["stats"].setdefault(name, {"computes": 0, "hits": 0, "seconds": 0.0, "self_seconds": 0.0})
+        entry = state["cache"].get(name)
+        if entry is not None and self._fresh(entry):
+            stats["hits"] += 1
+            # A caller that uses this value depends on the same inputs
+            self._record(entry.inputs)
+            return entry.value
+
+        state["reads"].append({})
+        state["timers"].append(0.0)   # time spent in nested formula properties
+        start = time.perf_counter()
+        try:
+            value = fget(self)
+        finally:
+            elapsed = time.perf_counter() - start
+            inputs = state["reads"].pop()
+            nested = state["timers"].pop()
+        if state["timers"]:
+            state["timers"][-1] += elapsed
+
+        stats["computes"] += 1
+        stats["seconds"] += elapsed
+        stats["self_seconds"] += elapsed - nested
+        state["cache"][name] = _Entry(value, inputs)
+        self._record(inputs)
+        return value
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drops one cached formula (or all of them), e.g. after editing a frame in place."""
+        cache = self._state()["cache"]
+        if name is None:
+            cache.clear()
+        else:
+            cache.pop(name, None)
+
+    def formula_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        {property: {"computes", "hits", "seconds", "self_seconds"}}, most expensive first.
+        `seconds` includes the formula properties a property used; `self_seconds` does not.
+        """
+        stats = self._state()["stats"]
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["self_seconds"]))
+
+    def slowest_formulas(self, n: int = 5) -> List[str]:
+        return [
+            f"{name}: {s['self_seconds'] * 1000:.2f} ms over {s['computes']} computes, {s['hits']} cache hits"
+            for name, s in list(self.formula_stats().items())[:n]
+        ]
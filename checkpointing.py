@@ -0,0 +1,331 @@
+import os
+import zlib
+import random
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+
+# --- DURABLE GRAPH CHECKPOINTS ---
+# A conversion that died after `mine`, or halfway through the generator/validator
+# loop, used to start from zero: mining and every LLM call were paid again. The
+# graphs are now compiled with a SQLite checkpointer, so the state is saved after
+# every node and a run can be resumed from its last completed node:
+#
+#   agent = workflow.compile(checkpointer=SqliteCheckpointer(".checkpoints/agent.sqlite"))
+#   final = run_or_resume(agent, {"excel_path": path, "run_id": run_id}, thread_id=run_id)
+#   # process killed? the same call continues with the node that was interrupted
+#
+# Checkpoints stay small:
+#   * LangGraph versions every state field (channel) separately; a checkpoint row
+#     only holds the versions, and a value is stored when its field changes
+#   * values live in a content-addressed `payloads` table and are referenced by
+#     hash: `metadata` and `generated_code` are stored once even when several
+#     checkpoints, node writes or runs of the same workbook carry them
+#   * payloads of PAYLOAD_COMPRESS_BYTES or more are zlib-compressed
+
+PAYLOAD_COMPRESS_BYTES = 1024
+EMPTY = "empty"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    checkpoint BLOB NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS channels (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    ref TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    """LangGraph checkpoint saver on one SQLite file; values are stored by reference (see above)."""
+
+    def __init__(self, path: str = os.path.join(".checkpoints", "graph.sqlite"), serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation: graphs may run in several threads
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # --- Payloads ---
+    def _store(self, db: sqlite3.Connection, value: Any) -> str:
+        kind, data = self.serde.dumps_typed(value)
+        ref = hashlib.sha256(kind.encode() + b"|" + data).hexdigest()
+        if len(data) >= PAYLOAD_COMPRESS_BYTES:
+            kind, data = f"z:{kind}", zlib.compress(data, 6)
+        db.execute("INSERT OR IGNORE INTO payloads VALUES (?, ?, ?)", (ref, kind, data))
+        return ref
+
+    def _pack(self, value: Any) -> bytes:
+        # Checkpoint / metadata rows: "<type>\n<serialized bytes>" (channel values excluded, so small)
+        kind, data = self.serde.dumps_typed(value)
+        return kind.encode() + b"\n" + data
+
+    def _unpack(self, blob: bytes) -> Any:
+        kind, _, data = bytes(blob).partition(b"\n")
+        return self.serde.loads_typed((kind.decode(), data))
+
+    def _load(self, kind: str, data: bytes) -> Any:
+        if kind.startswith("z:"):
+            kind, data = kind[2:], zlib.decompress(data)
+        return self.serde.loads_typed((kind, data))
+
+    def _fetch(self, db: sqlite3.Connection, refs: List[str]) -> Dict[str, Any]:
+        wanted = sorted(set(refs) - {EMPTY})
+        values = {}
+        for start in range(0, len(wanted), 500):
+            chunk = wanted[start:start + 500]
+            rows = db.execute(f"SELECT ref, type, data FROM payloads WHERE ref IN ({','.join('?' * len(chunk))})",
+                              chunk)
+            values.update({ref: self._load(kind, data) for ref, kind, data in rows})
+        return values
+
+    # --- Reads ---
+    def _tuple(self, db: sqlite3.Connection, thread_id: str, ns: str, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, checkpoint_blob, metadata_blob = row
+        checkpoint: Checkpoint = self._unpack(checkpoint_blob)
+        versions = checkpoint["channel_versions"]
+        refs = {}
+        for channel, version in versions.items():
+            found = db.execute("SELECT ref FROM channels WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? "
+                               "AND version = ?", (thread_id, ns, channel, str(version))).fetchone()
+            if found is not None and found[0] != EMPTY:
+                refs[channel] = found[0]
+        writes = db.execute("SELECT task_id, idx, channel, ref, task_path FROM writes WHERE thread_id = ? AND "
+                            "checkpoint_ns = ? AND checkpoint_id = ?", (thread_id, ns, checkpoint_id)).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[4], w[0], w[1]))
+        values = self._fetch(db, list(refs.values()) + [w[3] for w in writes])
+
+        def config(cid: str) -> RunnableConfig:
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=config(checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": {c: values[r] for c, r in refs.items()}},
+            metadata=self._unpack(metadata_blob),
+            parent_config=config(parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, values.get(ref)) for task_id, _, channel, ref, _ in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        db = self._connect()
+        try:
+            if checkpoint_id:
+                row = db.execute("SELECT checkpoint_id, parent_id, checkpoint, metadata FROM checkpoints WHERE "
+                                 "thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                                 (thread_id, ns, checkpoint_id)).fetchone()
+            else:
+                # Checkpoint ids are time-ordered: the largest is the latest
+                row = db.execute("SELECT checkpoint_id, parent_id, checkpoint, metadata FROM checkpoints WHERE "
+                                 "thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                                 (thread_id, ns)).fetchone()
+            return self._tuple(db, thread_id, ns, row) if row else None
+        finally:
+            db.close()
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint, metadata FROM checkpoints"
+        where, args = [], []
+        if config:
+            where.append("thread_id = ?")
+            args.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                args.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                args.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            args.append(get_checkpoint_id(before))
+        query += (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY checkpoint_id DESC"
+        db = self._connect()
+        try:
+            rows = db.execute(query, args).fetchall()
+            for thread_id, ns, *row in rows:
+                if limit is not None and limit <= 0:
+                    break
+                metadata = self._unpack(row[3])
+                if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                if limit is not None:
+                    limit -= 1
+                yield self._tuple(db, thread_id, ns, tuple(row))
+        finally:
+            db.close()
+
+    # --- Writes ---
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    for channel, version in new_versions.items():
+                        ref = self._store(db, values[channel]) if channel in values else EMPTY
+                        db.execute("INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?)",
+                                   (thread_id, ns, channel, str(version), ref))
+                    db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                               (thread_id, ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                                self._pack(stored), self._pack(get_checkpoint_metadata(config, metadata))))
+            finally:
+                db.close()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    for idx, (channel, value) in enumerate(writes):
+                        idx = WRITES_IDX_MAP.get(channel, idx)
+                        # Special writes (errors, interrupts) replace; regular ones are written once
+                        verb = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+                        db.execute(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (thread_id, ns, checkpoint_id, task_id, idx, channel,
+                                    self._store(db, value), task_path))
+            finally:
+                db.close()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    for table in ("checkpoints", "channels", "writes"):
+                        db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                    # Payloads nothing refers to any more
+                    db.execute("DELETE FROM payloads WHERE ref NOT IN (SELECT ref FROM channels) "
+                               "AND ref NOT IN (SELECT ref FROM writes)")
+            finally:
+                db.close()
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        # Same scheme as LangGraph's InMemorySaver: zero-padded counter + random tie breaker
+        current_v = 0 if current is None else current if isinstance(current, int) else int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # The graphs are invoked synchronously; the async API just delegates
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None):
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    # --- Reporting ---
+    def stats(self) -> Dict[str, Any]:
+        db = self._connect()
+        try:
+            threads, checkpoints = db.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints").fetchone()
+            payloads, size = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM payloads").fetchone()
+        finally:
+            db.close()
+        return {"threads": threads, "checkpoints": checkpoints, "payloads": payloads, "payload_bytes": size}
+
+
+# --- Resume API ---
+def thread_config(thread_id: str, **configurable) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, **configurable}}
+
+
+def run_status(graph, thread_id: str) -> Dict[str, Any]:
+    """{"exists", "finished", "next": nodes still to run, "step"} of a thread's latest checkpoint."""
+    snapshot = graph.get_state(thread_config(thread_id))
+    exists = snapshot.created_at is not None
+    return {"exists": exists, "finished": exists and not snapshot.next, "next": list(snapshot.next),
+            "step": (snapshot.metadata or {}).get("step")}
+
+
+def run_or_resume(graph, inputs: Optional[Dict[str, Any]], thread_id: str, restart: bool = False,
+                  recursion_limit: int = 100) -> Dict[str, Any]:
+    """
+    Starts `inputs` on `thread_id`, or, when that thread has an unfinished checkpoint,
+    continues it with the node that was running when it stopped (`inputs` are then
+    ignored). A finished thread returns its final state unless `restart` is set.
+    Every node's checkpoint is written before the next node starts (durability="sync").
+    """
+    config = {**thread_config(thread_id), "recursion_limit": recursion_limit}
+    status = run_status(graph, thread_id)
+    if status["exists"] and restart:
+        graph.checkpointer.delete_thread(thread_id)
+    elif status["exists"] and status["finished"]:
+        return graph.get_state(config).values
+    elif status["exists"]:
+        print(f"Resuming {thread_id} at step {status['step']}: {', '.join(status['next'])}")
+        return graph.invoke(None, config, durability="sync")
+    return graph.invoke(inputs, config, durability="sync")
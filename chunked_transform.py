@@ -0,0 +1,302 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dependency_graph import PlanStep, compile_plan
+from formula_evaluator import FormulaEvaluator, WorkbookEvaluator
+from formula_parser import CellRef, RangeRef, Call, parse_formula
+from header_index import HeaderIndex
+from incremental import row_wise
+from workbook_scanner import WorkbookScanner
+
+
+# --- CHUNKED OUT-OF-CORE TRANSFORM ---
+# Streaming mode for fact sheets too large for memory. One sheet (e.g. Sales) is
+# read as a generator of row batches while the lookup sheets stay resident:
+#   * its formula columns must be row-wise (see incremental.row_wise); the generated
+#     ExcelModel methods run on each batch and the batch is written out (CSV/Parquet)
+#   * formulas of other sheets may only read the streamed sheet through SUM / COUNT /
+#     COUNTA / AVERAGE / MIN / MAX over its ranges. Those are kept as running
+#     reductions; after the last batch the formulas are evaluated natively with the
+#     reduced values substituted (e.g. =SUM(Sales!D2:D6) on Financials).
+# Batch frames are indexed by data position (Excel row - 2), like the in-memory sheets.
+
+class ChunkingError(ValueError):
+    """The workbook logic needs the whole streamed sheet at once (not row-wise / not a reduction)."""
+
+
+REDUCTIONS = ("SUM", "COUNT", "COUNTA", "AVERAGE", "MIN", "MAX")
+
+
+class RunningReduction:
+    """SUM/COUNT/COUNTA/AVERAGE/MIN/MAX over ranges of the streamed sheet, fed batch by batch."""
+
+    def __init__(self, call: Call, columns: List[Tuple[Any, int, Optional[int], bool]]):
+        self.call = call
+        self.columns = columns   # (header, first position, last position or None, whole column)
+        self.total, self.numbers, self.filled = 0.0, 0, 0
+        self.low, self.high = np.inf, -np.inf
+
+    def update(self, batch: pd.DataFrame):
+        positions = batch.index.to_numpy()
+        for header, first, last, _ in self.columns:
+            if header not in batch.columns:
+                continue
+            inside = positions >= first
+            if last is not None:
+                inside &= positions <= last
+            values = batch[header].to_numpy()[inside]
+            if not len(values):
+                continue
+            if values.dtype.kind in "fiu":
+                numbers = values[~np.isnan(values)] if values.dtype.kind == "f" else values
+            else:
+                # Excel reductions skip text, blanks and booleans inside ranges
+                numbers = np.array([v for v in values if isinstance(v, (int, float, np.number))
+                                    and not isinstance(v, (bool, np.bool_)) and v == v], dtype=np.float64)
+            self.filled += int(pd.notna(values).sum())
+            self.numbers += len(numbers)
+            if len(numbers):
+                self.total += float(numbers.sum())
+                self.low, self.high = min(self.low, float(numbers.min())), max(self.high, float(numbers.max()))
+
+    @property
+    def value(self) -> float:
+        name = self.call.name
+        if name == "SUM":
+            return self.total
+        if name == "COUNT":
+            return float(self.numbers)
+        if name == "COUNTA":
+            # Whole-column references include the header cells
+            return float(self.filled + sum(1 for *_, whole in self.columns if whole))
+        if name == "AVERAGE":
+            return self.total / self.numbers if self.numbers else np.nan
+        if not self.numbers:
+            return 0.0
+        return self.low if name == "MIN" else self.high
+
+
+class _ReducedEvaluator(FormulaEvaluator):
+    """Native evaluator where the streamed-sheet reductions are replaced by their totals."""
+
+    def __init__(self, sheets, column_name, reductions: Dict[Call, RunningReduction]):
+        super().__init__(sheets, column_name)
+        self.reductions = reductions
+
+    def _value(self, node) -> Any:
+        if isinstance(node, Call) and node in self.reductions:
+            return self.reductions[node].value
+        return super()._value(node)
+
+
+class ChunkedTransform:
+    """
+    Runs the mined logic with `sheet` streamed in batches.
+    `model` is the generated ExcelModel (its calculate_* methods take `sheets`).
+    """
+
+    def __init__(self, model: Any, metadata: Dict[str, Any], header_index: HeaderIndex, sheet: str):
+        self.model = model
+        self.metadata = metadata
+        self.header_index = header_index
+        self.sheet = sheet
+        self.plan = compile_plan(metadata)
+        self._formulas = {f"{s}.{f['column']}": f for s, meta in metadata.items() for f in meta.get("formulas", [])}
+
+        self.row_steps = [step for step in self.plan.order if step.sheet == sheet]
+        self.post_steps = [step for step in self.plan.order if step.sheet != sheet]
+        streamed = {step.node for step in self.row_steps}
+        for step in self.row_steps:
+            if not row_wise(sheet, self._formulas[step.node]):
+                raise ChunkingError(f"{step.node} is not row-wise and cannot be computed per batch")
+            if any(d in self._formulas and d not in streamed for d in step.depends_on):
+                raise ChunkingError(f"{step.node} needs formula results of other sheets (two passes)")
+
+        # Reductions over the streamed sheet, keyed by their (hashable) formula node
+        self.reductions: Dict[Call, RunningReduction] = {}
+        self._reduced_steps = set()
+        for step in self.post_steps:
+            for formula in self._formula_texts(self._formulas[step.node]):
+                if self._collect(parse_formula(formula), step):
+                    self._reduced_steps.add(step.node)
+        self.rows_written = 0
+
+    @staticmethod
+    def _formula_texts(formula_meta: Dict[str, Any]) -> List[str]:
+        return [r["formula"] for r in formula_meta.get("regimes", [])] or [formula_meta["formula"]]
+
+    def _streamed_ref(self, node) -> bool:
+        return isinstance(node, (CellRef, RangeRef)) and node.sheet == self.sheet
+
+    def _collect(self, node, step: PlanStep) -> bool:
+        """Registers the reductions of one formula tree; True if it reads the streamed sheet."""
+        if self._streamed_ref(node):
+            raise ChunkingError(f"{step.node} reads {self.sheet} outside of {'/'.join(REDUCTIONS)}")
+        if isinstance(node, Call) and node.name in REDUCTIONS and any(self._streamed_ref(a) for a in node.args):
+            if not all(isinstance(a, RangeRef) and a.sheet == self.sheet for a in node.args):
+                raise ChunkingError(f"{step.node}: {node.name} mixes {self.sheet} ranges with other arguments")
+            columns = [
+                (self.header_index.header(self.sheet, col),
+                 0 if a.row1 is None else max(a.row1, 2) - 2,
+                 None if a.row2 is None else a.row2 - 2,
+                 a.row1 is None)
+                for a in node.args for col in a.columns
+            ]
+            if any(header is None for header, *_ in columns):
+                raise ChunkingError(f"{step.node}: {node.name} reads a headerless column of {self.sheet}")
+            self.reductions.setdefault(node, RunningReduction(node, columns))
+            return True
+        children = node.args if isinstance(node, Call) else [
+            v for v in (node if isinstance(node, tuple) else ()) if isinstance(v, tuple)]
+        found = False
+        for child in children:
+            found |= self._collect(child, step)
+        return found
+
+    # --- execution ---
+
+    def run(self, batches: Iterable[pd.DataFrame], resident: Dict[str, pd.DataFrame],
+            writer: Optional["BatchWriter"] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Streams the batches through the row-wise formulas (writing each one out) and
+        returns the resident and derived sheets with their formula columns filled in.
+        """
+        sheets = dict(resident)
+        for batch in batches:
+            sheets[self.sheet] = batch
+            for step in self.row_steps:
+                batch[step.column] = getattr(self.model, step.method_name)(sheets)
+            for reduction in self.reductions.values():
+                reduction.update(batch)
+            if writer is not None:
+                writer.write(batch)
+            self.rows_written += len(batch)
+        sheets.pop(self.sheet, None)
+        if writer is not None:
+            writer.close()
+
+        for name, n_rows in self.plan.derived_sheets.items():
+            sheets.setdefault(name, pd.DataFrame(index=pd.RangeIndex(n_rows)))
+        sheets = {name: frame.copy() for name, frame in sheets.items()}
+        evaluator = _ReducedEvaluator(sheets, self.header_index.header, self.reductions)
+        for step in self.post_steps:
+            if step.node in self._reduced_steps:
+                self._evaluate(evaluator, step, sheets)
+            else:
+                sheets[step.sheet][step.column] = getattr(self.model, step.method_name)(sheets)
+            evaluator.invalidate(step.sheet, step.column)
+        return sheets
+
+    def _evaluate(self, evaluator: FormulaEvaluator, step: PlanStep, sheets: Dict[str, pd.DataFrame]):
+        frame = sheets[step.sheet]
+        column = np.full(len(frame), np.nan, dtype=object)
+        for first_row, n_rows, formula in WorkbookEvaluator._regimes(self._formulas[step.node]):
+            positions = np.arange(first_row - 2, min(first_row - 2 + (n_rows or len(frame)), len(frame)))
+            value = evaluator.evaluate(formula, step.sheet, positions, first_row, single=n_rows == 1)
+            column[positions] = value if isinstance(value, np.ndarray) else [value] * len(positions)
+        frame[step.column] = pd.Series(column, index=frame.index).infer_objects()
+
+
+# --- BATCH SOURCES ---
+
+def excel_batches(file_path: str, sheet: str, header_index: HeaderIndex,
+                  batch_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Row batches of one worksheet, streamed from the .xlsx XML (never fully parsed)."""
+    headers = header_index[sheet].by_index
+    columns = list(headers.values())
+    records, positions = [], []
+    for row_num, cells in WorkbookScanner(file_path).iter_rows(sheet, min_row=2):
+        row = dict.fromkeys(columns)
+        for cell in cells:
+            if cell.col in headers:
+                row[headers[cell.col]] = cell.value
+        records.append(row)
+        positions.append(row_num - 2)
+        if len(records) >= batch_rows:
+            yield pd.DataFrame.from_records(records, index=positions, columns=columns).infer_objects()
+            records, positions = [], []
+    if records:
+        yield pd.DataFrame.from_records(records, index=positions, columns=columns).infer_objects()
+
+
+def csv_batches(file_path: str, batch_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    # read_csv chunks keep a running RangeIndex, i.e. data positions
+    yield from pd.read_csv(file_path, chunksize=batch_rows)
+
+
+def parquet_batches(file_path: str, batch_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet batches need pyarrow (pip install pyarrow)") from e
+    start = 0
+    for record_batch in pq.ParquetFile(file_path).iter_batches(batch_size=batch_rows):
+        batch = record_batch.to_pandas()
+        batch.index = pd.RangeIndex(start, start + len(batch))
+        start += len(batch)
+        yield batch
+
+
+def load_resident_sheets(file_path: str, exclude: str) -> Dict[str, pd.DataFrame]:
+    """Every sheet except the streamed one, read eagerly (they are the small lookup sheets)."""
+    names = [name for name in WorkbookScanner(file_path).sheetnames if name != exclude]
+    frames = pd.read_excel(file_path, sheet_name=names)
+    return {str(name).strip(): frame for name, frame in frames.items()}
+
+
+# --- BATCH WRITERS ---
+
+class BatchWriter(ABC):
+    @abstractmethod
+    def write(self, batch: pd.DataFrame):
+        """Appends one transformed batch to the output."""
+
+    def close(self):
+        pass
+
+
+class CsvBatchWriter(BatchWriter):
+    def __init__(self, path: str):
+        self.path = path
+        self._header = True
+
+    def write(self, batch: pd.DataFrame):
+        batch.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+        self._header = False
+
+
+class ParquetBatchWriter(BatchWriter):
+    """One row group per batch; later batches are cast to the first batch's schema."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from e
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self._writer = None
+
+    def write(self, batch: pd.DataFrame):
+        table = self._pa.Table.from_pandas(batch, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(path: str) -> BatchWriter:
+    """Writer chosen by extension: .parquet / .pq, anything else is CSV."""
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        return ParquetBatchWriter(path)
+    return CsvBatchWriter(path)
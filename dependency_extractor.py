@@ -0,0 +1,127 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple, NamedTuple
+
+from openpyxl.utils import get_column_letter
+
+from formula_index import to_r1c1
+from header_index import HeaderIndex
+
+
+# --- PRECOMPILED DEPENDENCY EXTRACTOR ---
+# Replaces "new Tokenizer per formula + re.findall('[A-Z]+') per operand".
+# A formula is first normalized to relative R1C1 (so every row of a filled-down
+# column is the SAME string), the normalized text is parsed once with a
+# precompiled reference grammar and memoized, and the cached relative references
+# are then anchored at the cell's row/column. Function names, booleans, sheet
+# names and string literals can never be mistaken for column letters.
+
+R1C1_REF_RE = re.compile(r"""
+      (?P<string>"(?:[^"]|"")*")                                               # string literal: skipped
+    | (?:(?P<sheet>'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?
+      (?:
+          (?<![\w$.])(?P<r1>R(?:\[-?\d+\]|\d+)?)(?P<c1>C(?:\[-?\d+\]|\d+)?)
+          (?::(?P<r2>R(?:\[-?\d+\]|\d+)?)(?P<c2>C(?:\[-?\d+\]|\d+)?))?(?![\w(])  # cell or range
+        | (?<![\w$.])(?P<wc1>C(?:\[-?\d+\]|\d+)?):(?P<wc2>C(?:\[-?\d+\]|\d+)?)(?![\w(])  # whole columns
+      )
+""", re.VERBOSE)
+
+AXIS_RE = re.compile(r"[RC](?:\[(-?\d+)\]|(\d+))?")
+
+
+class Reference(NamedTuple):
+    sheet: str
+    column: str                # column letter, e.g. "D"
+    first_row: Optional[int]   # None for whole-column references (G:G)
+    last_row: Optional[int]
+    row_offset: Optional[int]  # single cell with a relative row: its distance from the formula's row (B1 in row 2 -> -1)
+
+    @property
+    def row_local(self) -> bool:
+        """Reads the formula cell's own row (=C2*D2 in row 2), so the formula can run row by row."""
+        return self.row_offset == 0
+
+    @property
+    def rows(self) -> str:
+        if self.first_row is None:
+            return ":"
+        return str(self.first_row) if self.first_row == self.last_row else f"{self.first_row}:{self.last_row}"
+
+
+def _axis(spec: str) -> Tuple[bool, int]:
+    """'R[-1]' -> (relative, -1); 'R5' -> (absolute, 5); 'R' -> (relative, 0)."""
+    relative, absolute = AXIS_RE.fullmatch(spec).groups()
+    if absolute is not None:
+        return False, int(absolute)
+    return True, int(relative or 0)
+
+
+@lru_cache(maxsize=8192)
+def _parse_shape(shape: str) -> Tuple[tuple, ...]:
+    """
+    Parses a relative-R1C1 formula once. Returns hashable tuples
+    (sheet, row_from, row_to, col_from, col_to) where each axis is (relative, n) or None.
+    """
+    refs = []
+    for match in R1C1_REF_RE.finditer(shape):
+        if match.group("string"):
+            continue
+        sheet = match.group("sheet")
+        sheet = sheet.strip("'").replace("''", "'") if sheet else None
+        if match.group("wc1"):
+            refs.append((sheet, None, None, _axis(match.group("wc1")), _axis(match.group("wc2"))))
+        elif match.group("r1"):
+            r1, c1 = _axis(match.group("r1")), _axis(match.group("c1"))
+            r2 = _axis(match.group("r2")) if match.group("r2") else r1
+            c2 = _axis(match.group("c2")) if match.group("c2") else c1
+            refs.append((sheet, r1, r2, c1, c2))
+    return tuple(refs)
+
+
+def _anchor(axis: Tuple[bool, int], origin: int) -> int:
+    relative, n = axis
+    return origin + n if relative else n
+
+
+def extract_references(formula: str, current_sheet: str, row: int = 2, col: int = 1) -> List[Reference]:
+    """
+    Structured references of `formula` entered at (row, col) of `current_sheet`.
+    Multi-column ranges expand to one Reference per column; order follows the formula.
+    """
+    references = []
+    seen = set()
+    for sheet, r1, r2, c1, c2 in _parse_shape(to_r1c1(formula, row, col)):
+        first_row = _anchor(r1, row) if r1 else None
+        last_row = _anchor(r2, row) if r2 else None
+        if first_row is not None and last_row < first_row:
+            first_row, last_row = last_row, first_row
+        row_offset = r1[1] if r1 is not None and r1 == r2 and r1[0] else None
+
+        first_col, last_col = sorted((_anchor(c1, col), _anchor(c2, col)))
+        for col_idx in range(max(first_col, 1), last_col + 1):
+            ref = Reference(sheet or current_sheet, get_column_letter(col_idx), first_row, last_row, row_offset)
+            if ref not in seen:
+                seen.add(ref)
+                references.append(ref)
+    return references
+
+
+def references_to_metadata(references: List[Reference], header_index: HeaderIndex) -> List[Dict[str, Any]]:
+    """JSON-friendly form with header names resolved, as stored in the mined metadata."""
+    resolved = []
+    for ref in references:
+        header = header_index.header(ref.sheet, ref.column)
+        resolved.append({
+            "sheet": ref.sheet,
+            "column": header if header is not None else ref.column,
+            "excel_col": ref.column,
+            "rows": ref.rows,
+            "row_local": ref.row_local,
+            "row_offset": ref.row_offset,
+        })
+    return resolved
+
+
+def cache_info():
+    """Hit/miss statistics of the shape cache."""
+    return _parse_shape.cache_info()
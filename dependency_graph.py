@@ -0,0 +1,206 @@
+import ast
+from typing import Dict, List, Any, Tuple, Iterable, NamedTuple
+
+
+# --- WORKBOOK -> DAG COMPILER ---
+# Turns the mined `depends_on` lists into a column-level dependency graph and a
+# topological execution plan grouped into levels (columns of one level do not
+# depend on each other and may run in parallel). The plan is rendered straight
+# into `ExcelModel.transform`, so ordering no longer depends on the LLM.
+
+class CycleError(ValueError):
+    """The formulas reference each other in a loop (Excel would report a circular reference)."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__("Circular reference between formula columns: " + " -> ".join(cycle))
+
+
+class PlanStep(NamedTuple):
+    sheet: str
+    column: str
+    method_name: str
+    depends_on: Tuple[str, ...]  # formula-column node ids only ("Sheet.Column")
+
+    @property
+    def node(self) -> str:
+        return f"{self.sheet}.{self.column}"
+
+
+class ExecutionPlan:
+    def __init__(self, levels: List[List[PlanStep]], derived_sheets: Dict[str, int]):
+        self.levels = levels
+        # Sheets made only of formulas (absent from the input data) -> rows to create
+        self.derived_sheets = derived_sheets
+
+    @property
+    def order(self) -> List[PlanStep]:
+        return [step for level in self.levels for step in level]
+
+    def describe(self) -> str:
+        """Human/LLM readable plan, one line per level."""
+        return "\n".join(
+            f"Level {i}: " + ", ".join(f"{step.method_name} -> {step.node}" for step in level)
+            for i, level in enumerate(self.levels, 1)
+        )
+
+    def without(self, method_names: Iterable[str]) -> "ExecutionPlan":
+        """The plan minus the steps of `method_names` and every step that reads their columns."""
+        method_names = set(method_names)
+        dropped, levels = set(), []
+        for level in self.levels:
+            kept = []
+            for step in level:
+                if step.method_name in method_names or dropped & set(step.depends_on):
+                    dropped.add(step.node)
+                else:
+                    kept.append(step)
+            if kept:
+                levels.append(kept)
+        return ExecutionPlan(levels, self.derived_sheets)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "levels": [[step._asdict() for step in level] for level in self.levels],
+            "derived_sheets": self.derived_sheets,
+        }
+
+    def render_transform(self, indent: str = "    ") -> str:
+        """Source of the `transform` method that executes the plan level by level."""
+        body = [
+            "def transform(self, all_sheets_dict):",
+            '    """',
+            "    Generated from the workbook dependency DAG (do not edit by hand).",
+            *(f"    {line}" for line in self.describe().splitlines()),
+            '    """',
+            "    # Work on copies: callers compare the result against the frames they passed in",
+            "    sheets = {name: df.copy() for name, df in all_sheets_dict.items()}",
+        ]
+        for sheet, n_rows in self.derived_sheets.items():
+            body += [
+                f"    if {sheet!r} not in sheets:",
+                f"        sheets[{sheet!r}] = pd.DataFrame(index=pd.RangeIndex({n_rows}))",
+            ]
+        for i, level in enumerate(self.levels, 1):
+            body.append(f"    # Level {i}")
+            for step in level:
+                body.append(f"    sheets[{step.sheet!r}][{step.column!r}] = self.{step.method_name}(sheets)")
+        body.append("    return sheets")
+        return "\n".join(indent + line for line in body) + "\n"
+
+
+def _formula_rows(formula_meta: Dict[str, Any]) -> int:
+    rows = formula_meta.get("rows")
+    if not rows:
+        return 1
+    first, _, last = str(rows).partition(":")
+    return int(last or first) - int(first) + 1
+
+
+def compile_plan(metadata: Dict[str, Any]) -> ExecutionPlan:
+    """
+    Builds the plan from {sheet: {"formulas": [...], "raw_inputs": [...]}} metadata.
+    Raw input columns are sources and never appear as steps. Raises CycleError.
+    """
+    steps: Dict[str, PlanStep] = {}
+    position: Dict[str, int] = {}
+    derived_sheets: Dict[str, int] = {}
+
+    for sheet, meta in metadata.items():
+        for formula_meta in meta.get("formulas", []):
+            step = PlanStep(sheet, formula_meta["column"], formula_meta["method_name"], tuple(formula_meta["depends_on"]))
+            # Duplicate headers collapse onto one node; the left-most column wins
+            if step.node not in steps:
+                position[step.node] = len(position)
+                steps[step.node] = step
+        if meta.get("formulas") and not meta.get("raw_inputs"):
+            derived_sheets[sheet] = max(_formula_rows(f) for f in meta["formulas"])
+
+    # Only edges between formula columns matter for scheduling
+    steps = {
+        node: step._replace(depends_on=tuple(d for d in step.depends_on if d in steps and d != node))
+        for node, step in steps.items()
+    }
+    pending = {node: len(set(step.depends_on)) for node, step in steps.items()}
+    dependents: Dict[str, List[str]] = {node: [] for node in steps}
+    for node, step in steps.items():
+        for dep in set(step.depends_on):
+            dependents[dep].append(node)
+
+    # Kahn's algorithm, one frontier at a time -> levels
+    levels = []
+    frontier = sorted((n for n, count in pending.items() if count == 0), key=position.get)
+    while frontier:
+        levels.append([steps[n] for n in frontier])
+        next_frontier = []
+        for node in frontier:
+            for dependent in dependents[node]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    next_frontier.append(dependent)
+        frontier = sorted(next_frontier, key=position.get)
+
+    scheduled = sum(len(level) for level in levels)
+    if scheduled != len(steps):
+        raise CycleError(_find_cycle(steps, {n for n, count in pending.items() if count > 0}))
+    return ExecutionPlan(levels, derived_sheets)
+
+
+def _find_cycle(steps: Dict[str, PlanStep], blocked: set) -> List[str]:
+    """Walks dependencies among unscheduled nodes until one repeats."""
+    node = min(blocked)
+    path: List[str] = []
+    seen: Dict[str, int] = {}
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = next(d for d in steps[node].depends_on if d in blocked)
+    return path[seen[node]:] + [node]
+
+
+def install_methods(code: str, methods: Dict[str, str], class_name: str) -> str:
+    """
+    Replaces (or adds) the named methods of `class_name` with the given sources
+    (already indented one level). Code that does not parse is returned unchanged
+    so the validator reports the real error.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+
+    cls = next((n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == class_name), None)
+    if cls is None or not methods:
+        return code
+
+    lines = code.splitlines(keepends=True)
+    drop = set()
+    for node in cls.body:
+        if isinstance(node, ast.FunctionDef) and node.name in methods:
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            drop.update(range(start - 1, node.end_lineno))
+
+    head = [line for i, line in enumerate(lines[:cls.end_lineno]) if i not in drop]
+    if head and not head[-1].endswith("\n"):
+        head[-1] += "\n"
+    added = "".join("\n" + source for source in methods.values())
+    return "".join(head) + added + "".join(lines[cls.end_lineno:])
+
+
+def ensure_import(code: str, statement: str) -> str:
+    """Adds an import line after the module's top-level imports unless it is already there."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    if any(line.strip() == statement for line in code.splitlines()):
+        return code
+    imports = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    lines = code.splitlines(keepends=True)
+    at = imports[-1].end_lineno if imports else 0
+    return "".join(lines[:at]) + statement + "\n" + "".join(lines[at:])
+
+
+def install_transform(code: str, plan: ExecutionPlan, class_name: str = "ExcelModel") -> str:
+    """Replaces (or adds) `transform` in the generated class with the plan-driven one."""
+    return install_methods(code, {"transform": plan.render_transform()}, class_name)
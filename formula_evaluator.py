@@ -0,0 +1,613 @@
+import math
+import re
+from typing import Dict, List, Any, Optional, Tuple, Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from dependency_graph import compile_plan
+from formula_parser import (
+    Number, Text, Bool, Empty, CellRef, RangeRef, Unary, Binary, Call,
+    FormulaSyntaxError, parse_formula,
+)
+from header_index import HeaderIndex
+
+
+# --- NATIVE VECTORIZED EXCEL EVALUATOR ---
+# Evaluates the mined formulas column-at-a-time over NumPy arrays, in dependency
+# order, for ANY input frames. Gives ground truth without Excel or cached values
+# (files written by pandas/openpyxl carry none). Independent of the transpiler on
+# purpose: it interprets the formula tree with Excel semantics (blank cells are 0
+# in arithmetic, text compares case-insensitively, lookups take the first match,
+# errors become NaN).
+
+class EvaluationError(ValueError):
+    """The formula uses a construct the evaluator does not implement."""
+
+
+class _Block(NamedTuple):
+    """Cells of a range: one array per column. `per_row` blocks hold one row per evaluated row."""
+    columns: List[np.ndarray]
+    per_row: bool = False
+    whole: bool = False   # whole-column reference (includes the header cell)
+
+
+NUMERIC_KINDS = "fiub"
+CRITERIA_RE = re.compile(r"^(<=|>=|<>|<|>|=)?(.*)$", re.DOTALL)
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _is_numeric(value: Any) -> bool:
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in NUMERIC_KINDS
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _to_number(value: Any, blank_zero: bool = False) -> Any:
+    """Numeric view of a value; text that is not a number becomes NaN (#VALUE!)."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in NUMERIC_KINDS:
+            numbers = value.astype(np.float64)
+        else:
+            numbers = pd.to_numeric(pd.Series(value, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        return np.where(np.isnan(numbers), 0.0, numbers) if blank_zero else numbers
+    if _is_blank(value):
+        return 0.0 if blank_zero else math.nan
+    if isinstance(value, (bool, np.bool_)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _text(value: Any) -> str:
+    if _is_blank(value):
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _to_text(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return np.array([_text(v) for v in value], dtype=object)
+    return _text(value)
+
+
+def _numeric_cells(column: np.ndarray) -> np.ndarray:
+    """Numbers of a range column; text, booleans and blanks are ignored like SUM/MIN/MAX do."""
+    if column.dtype.kind in "fiu":
+        values = column.astype(np.float64)
+        return values[~np.isnan(values)]
+    return np.array([v for v in column if _is_numeric(v) and not _is_blank(v)], dtype=np.float64)
+
+
+def _cell_numbers(column: np.ndarray) -> np.ndarray:
+    """Float view of a range column with NaN wherever the cell is not a number."""
+    if column.dtype.kind in NUMERIC_KINDS:
+        return column.astype(np.float64)
+    return np.array([float(v) if _is_numeric(v) else np.nan for v in column], dtype=np.float64)
+
+
+def _lookup_keys(values: Any) -> Any:
+    """Normalized keys: numbers as float, text lower-cased (Excel matching is case-insensitive)."""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in NUMERIC_KINDS:
+            return values.astype(np.float64)
+        # Normalize each distinct value once (factorize runs in C), then gather
+        codes, uniques = pd.factorize(values)
+        normalized = np.array([_lookup_keys(u) for u in uniques] + [np.nan], dtype=object)
+        return normalized[codes]
+    if isinstance(values, str):
+        return values.lower()
+    return float(values) if _is_numeric(values) else values
+
+
+class FormulaEvaluator:
+    """
+    Evaluates formulas against `sheets` ({sheet: DataFrame}, data row r = position r - 2).
+    `column_name(sheet, col_idx)` maps a cell's column to the DataFrame column.
+    """
+
+    def __init__(self, sheets: Dict[str, pd.DataFrame], column_name: Callable[[str, int], Optional[Any]]):
+        self.sheets = sheets
+        self.column_name = column_name
+        self._arrays: Dict[Tuple[str, Any], np.ndarray] = {}
+
+    def column(self, sheet: str, col: int) -> np.ndarray:
+        name = self.column_name(sheet, col)
+        key = (sheet, name)
+        if key not in self._arrays:
+            frame = self.sheets.get(sheet)
+            if frame is None or name is None or name not in frame.columns:
+                # Headerless or absent columns read as blank cells
+                length = 0 if frame is None else len(frame)
+                self._arrays[key] = np.full(length, np.nan)
+            else:
+                self._arrays[key] = frame[name].to_numpy()
+        return self._arrays[key]
+
+    def invalidate(self, sheet: str, name: Any):
+        self._arrays.pop((sheet, name), None)
+
+    def evaluate(self, formula: str, sheet: str, positions: np.ndarray, first_row: int,
+                 single: bool = False) -> Any:
+        """
+        Value of `formula` (as entered in `first_row`) for the data rows at `positions`.
+        Returns a scalar or an array with one value per position.
+        """
+        try:
+            tree = parse_formula(formula)
+        except FormulaSyntaxError as e:
+            raise EvaluationError(str(e)) from e
+        self._sheet, self._positions, self._first_row, self._single = sheet, positions, first_row, single
+        value = self._value(tree)
+        if isinstance(value, _Block):
+            raise EvaluationError("Formula returns an array")
+        return value
+
+    # --- references ---
+
+    def _take(self, column: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        valid = (positions >= 0) & (positions < len(column))
+        if valid.all():
+            return column[positions]
+        out = np.full(len(positions), np.nan, dtype=column.dtype if column.dtype.kind == "f" else object)
+        out[valid] = column[positions[valid]]
+        return out
+
+    def _cell(self, ref: CellRef) -> Any:
+        sheet = ref.sheet or self._sheet
+        column = self.column(sheet, ref.col)
+        if ref.row_abs or (self._single and ref.row != self._first_row):
+            pos = ref.row - 2
+            return column[pos] if 0 <= pos < len(column) else None
+        return self._take(column, self._positions + (ref.row - self._first_row))
+
+    def _range(self, ref: RangeRef) -> _Block:
+        sheet = ref.sheet or self._sheet
+        if ref.row1 is None:
+            return _Block([self.column(sheet, c) for c in ref.columns], whole=True)
+        if (ref.row1_abs and ref.row2_abs) or self._single:
+            start, stop = max(ref.row1, 2) - 2, ref.row2 - 1
+            return _Block([self.column(sheet, c)[start:stop] for c in ref.columns])
+        if ref.row1 == ref.row2 and not ref.row1_abs and not ref.row2_abs:
+            positions = self._positions + (ref.row1 - self._first_row)
+            return _Block([self._take(self.column(sheet, c), positions) for c in ref.columns], per_row=True)
+        raise EvaluationError("Sliding or expanding ranges are not supported")
+
+    # --- expressions ---
+
+    def _value(self, node) -> Any:
+        if isinstance(node, Number):
+            return node.value
+        if isinstance(node, Text):
+            return node.value
+        if isinstance(node, Bool):
+            return node.value
+        if isinstance(node, Empty):
+            return None
+        if isinstance(node, CellRef):
+            return self._cell(node)
+        if isinstance(node, RangeRef):
+            block = self._range(node)
+            # A single cell of the current row behaves like a cell reference
+            if block.per_row and len(block.columns) == 1:
+                return block.columns[0]
+            return block
+        if isinstance(node, Unary):
+            operand = _to_number(self._scalar_or_row(node.operand), blank_zero=self._is_ref(node.operand))
+            return -operand if node.op == "-" else operand / 100
+        if isinstance(node, Binary):
+            return self._binary(node)
+        if isinstance(node, Call):
+            handler = getattr(self, f"_fn_{node.name.replace('.', '_').lower()}", None)
+            if handler is None:
+                raise EvaluationError(f"Function {node.name} is not supported")
+            return handler(node.args)
+        raise EvaluationError(f"Unsupported syntax: {type(node).__name__}")
+
+    @staticmethod
+    def _is_ref(node) -> bool:
+        return isinstance(node, (CellRef, RangeRef))
+
+    def _scalar_or_row(self, node) -> Any:
+        value = self._value(node)
+        if isinstance(value, _Block):
+            raise EvaluationError("Range used as a value")
+        return value
+
+    def _number(self, node) -> Any:
+        return _to_number(self._scalar_or_row(node), blank_zero=self._is_ref(node))
+
+    def _binary(self, node: Binary) -> Any:
+        if node.op == "&":
+            left, right = _to_text(self._scalar_or_row(node.left)), _to_text(self._scalar_or_row(node.right))
+            if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+                return np.char.add(np.asarray(left, dtype=str), np.asarray(right, dtype=str)).astype(object)
+            return left + right
+        if node.op in ("=", "<>", "<", ">", "<=", ">="):
+            return self._compare(node.op, self._scalar_or_row(node.left), self._scalar_or_row(node.right))
+
+        left, right = self._number(node.left), self._number(node.right)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            if node.op == "+":
+                return left + right
+            if node.op == "-":
+                return left - right
+            if node.op == "*":
+                return left * right
+            if node.op == "^":
+                return np.power(left, right)
+            # Division by zero is #DIV/0! -> NaN like every other error
+            result = np.divide(left, right)
+            return np.where(np.asarray(right) == 0, np.nan, result) if isinstance(result, np.ndarray) else (
+                math.nan if right == 0 else float(result))
+
+    def _compare(self, op: str, left: Any, right: Any) -> Any:
+        if _is_numeric(left) and _is_numeric(right):
+            return self._apply(op, _to_number(left, True), _to_number(right, True))
+        scalar = not isinstance(left, np.ndarray) and not isinstance(right, np.ndarray)
+        n = 1 if scalar else len(self._positions)
+        left_arr = left if isinstance(left, np.ndarray) else np.full(n, left, dtype=object)
+        right_arr = right if isinstance(right, np.ndarray) else np.full(n, right, dtype=object)
+        # Excel ordering across types: numbers < text < booleans; blanks take the other side's type
+        ranks, keys = [], []
+        for arr, other in ((left_arr, right_arr), (right_arr, left_arr)):
+            rank = np.empty(n, dtype=np.int8)
+            key = np.empty(n, dtype=object)
+            for i, (v, o) in enumerate(zip(arr, other)):
+                if _is_blank(v):
+                    v = "" if isinstance(o, str) else (False if isinstance(o, (bool, np.bool_)) else 0.0)
+                if isinstance(v, (bool, np.bool_)):
+                    rank[i], key[i] = 2, bool(v)
+                elif isinstance(v, str):
+                    rank[i], key[i] = 1, v.lower()
+                else:
+                    rank[i], key[i] = 0, float(v)
+            ranks.append(rank)
+            keys.append(key)
+        same = ranks[0] == ranks[1]
+        by_rank = self._apply(op, ranks[0], ranks[1])
+        by_value = np.array([self._apply(op, a, b) if s else False for a, b, s in zip(keys[0], keys[1], same)],
+                            dtype=bool)
+        result = np.where(same, by_value, by_rank)
+        return bool(result[0]) if scalar else result
+
+    @staticmethod
+    def _apply(op: str, left: Any, right: Any) -> Any:
+        if op == "=":
+            return left == right
+        if op == "<>":
+            return left != right
+        if op == "<":
+            return left < right
+        if op == ">":
+            return left > right
+        if op == "<=":
+            return left <= right
+        return left >= right
+
+    def _truth(self, node) -> Any:
+        value = self._scalar_or_row(node)
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind == "b":
+                return value
+            return _to_number(value, blank_zero=True) != 0
+        return bool(_to_number(value, blank_zero=True))
+
+    def _broadcast(self, value: Any) -> np.ndarray:
+        if isinstance(value, np.ndarray):
+            return value
+        return np.full(len(self._positions), value, dtype=object if not _is_numeric(value) else np.float64)
+
+    # --- functions ---
+
+    def _fn_if(self, args) -> Any:
+        if not 2 <= len(args) <= 3:
+            raise EvaluationError("IF takes 2 or 3 arguments")
+        condition = self._truth(args[0])
+        then = self._scalar_or_row(args[1]) if not isinstance(args[1], Empty) else 0.0
+        other = self._scalar_or_row(args[2]) if len(args) == 3 and not isinstance(args[2], Empty) else False
+        if not isinstance(condition, np.ndarray):
+            return then if condition else other
+        then, other = self._broadcast(then), self._broadcast(other)
+        if then.dtype.kind in NUMERIC_KINDS and other.dtype.kind in NUMERIC_KINDS:
+            return np.where(condition, then, other)
+        return np.where(condition, then.astype(object), other.astype(object))
+
+    def _fn_iferror(self, args) -> Any:
+        if len(args) != 2:
+            raise EvaluationError("IFERROR takes 2 arguments")
+        value, fallback = self._scalar_or_row(args[0]), self._scalar_or_row(args[1])
+        if not isinstance(value, np.ndarray):
+            return fallback if _is_blank(value) or (_is_numeric(value) and math.isinf(value)) else value
+        if value.dtype.kind in NUMERIC_KINDS:
+            errors = ~np.isfinite(value.astype(np.float64))
+        else:
+            errors = np.array([_is_blank(v) for v in value], dtype=bool)
+        return np.where(errors, self._broadcast(fallback), value)
+
+    def _fn_and(self, args) -> Any:
+        result = True
+        for arg in args:
+            result = np.logical_and(result, self._truth(arg))
+        return result
+
+    def _fn_or(self, args) -> Any:
+        result = False
+        for arg in args:
+            result = np.logical_or(result, self._truth(arg))
+        return result
+
+    def _fn_not(self, args) -> Any:
+        return np.logical_not(self._truth(args[0]))
+
+    def _fn_abs(self, args) -> Any:
+        return np.abs(self._number(args[0]))
+
+    def _fn_round(self, args) -> Any:
+        value, digits = self._number(args[0]), _to_number(self._scalar_or_row(args[1]), True)
+        scale = np.power(10.0, digits)
+        # Halves away from zero, like Excel
+        return np.sign(value) * np.floor(np.abs(value) * scale + 0.5) / scale
+
+    def _parts(self, args) -> List[Tuple[Any, Any, Any, Any]]:
+        """(sum, count, min, max) of each argument; ranges contribute only their numeric cells."""
+        parts = []
+        for arg in args:
+            value = self._value(arg)
+            if isinstance(value, _Block) and value.per_row:
+                cells = np.column_stack([_cell_numbers(c) for c in value.columns])
+                parts.append((np.nansum(cells, axis=1), np.sum(~np.isnan(cells), axis=1),
+                              np.fmin.reduce(cells, axis=1), np.fmax.reduce(cells, axis=1)))
+            elif isinstance(value, _Block):
+                cells = np.concatenate([_numeric_cells(c) for c in value.columns])
+                if cells.size:
+                    parts.append((cells.sum(), cells.size, cells.min(), cells.max()))
+                else:
+                    parts.append((0.0, 0, math.nan, math.nan))
+            else:
+                number = _to_number(value, blank_zero=self._is_ref(arg))
+                parts.append((number, 1, number, number))
+        return parts
+
+    def _fn_sum(self, args) -> Any:
+        return sum(part[0] for part in self._parts(args))
+
+    def _fn_count(self, args) -> Any:
+        return sum(part[1] for part in self._parts(args))
+
+    def _fn_average(self, args) -> Any:
+        parts = self._parts(args)
+        total, count = sum(p[0] for p in parts), sum(p[1] for p in parts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.divide(total, count)
+        return np.where(count == 0, np.nan, average) if isinstance(average, np.ndarray) else (
+            float(average) if count else math.nan)
+
+    def _extreme(self, args, position: int, pairwise) -> Any:
+        result = math.nan
+        for part in self._parts(args):
+            result = pairwise(result, part[position])
+        # MIN/MAX over no numbers at all is 0 in Excel
+        return np.where(np.isnan(result), 0.0, result) if isinstance(result, np.ndarray) else (
+            0.0 if math.isnan(result) else float(result))
+
+    def _fn_min(self, args) -> Any:
+        return self._extreme(args, 2, np.fmin)
+
+    def _fn_max(self, args) -> Any:
+        return self._extreme(args, 3, np.fmax)
+
+    def _fn_counta(self, args) -> Any:
+        total = 0
+        for arg in args:
+            value = self._value(arg)
+            if isinstance(value, _Block) and value.per_row:
+                total = total + sum((~pd.isna(c)).astype(int) for c in value.columns)
+            elif isinstance(value, _Block):
+                # Whole columns include their (non-empty) header cell
+                total += sum(int((~pd.isna(c)).sum()) + value.whole for c in value.columns)
+            elif isinstance(value, np.ndarray):
+                total = total + (~pd.isna(value)).astype(int)
+            else:
+                total += not _is_blank(value)
+        return total
+
+    def _block(self, node, function: str) -> _Block:
+        value = self._value(node)
+        if not isinstance(value, _Block) or value.per_row:
+            raise EvaluationError(f"{function} needs a fixed range")
+        return value
+
+    def _match_positions(self, keys: Any, lookup: np.ndarray, exact: bool) -> Any:
+        """0-based positions of `keys` in `lookup` (first match); NaN when not found."""
+        if exact:
+            index = pd.Series(np.arange(len(lookup), dtype=np.float64), index=_lookup_keys(lookup))
+            index = index[~index.index.duplicated()]
+            if isinstance(keys, np.ndarray):
+                return index.reindex(_lookup_keys(keys)).to_numpy()
+            return index.get(_lookup_keys(keys), math.nan)
+        # Approximate: largest value <= key in an ascending column
+        numbers = _to_number(lookup)
+        found = np.searchsorted(numbers, _to_number(keys), side="right") - 1
+        return np.where(found < 0, np.nan, found).astype(np.float64) if isinstance(found, np.ndarray) else (
+            math.nan if found < 0 else float(found))
+
+    def _gather(self, column: np.ndarray, positions: Any) -> Any:
+        if isinstance(positions, np.ndarray):
+            found = ~np.isnan(positions)
+            out = np.full(len(positions), np.nan, dtype=column.dtype if column.dtype.kind == "f" else object)
+            out[found] = column[positions[found].astype(np.int64)]
+            return out
+        return math.nan if math.isnan(positions) else column[int(positions)]
+
+    def _fn_vlookup(self, args) -> Any:
+        if not 3 <= len(args) <= 4:
+            raise EvaluationError("VLOOKUP takes 3 or 4 arguments")
+        keys, table = self._scalar_or_row(args[0]), self._block(args[1], "VLOOKUP")
+        col_index = int(_to_number(self._scalar_or_row(args[2])))
+        exact = len(args) == 4 and not isinstance(args[3], Empty) and not self._truth(args[3])
+        if not 1 <= col_index <= len(table.columns):
+            raise EvaluationError("VLOOKUP column index outside the table")
+        return self._gather(table.columns[col_index - 1], self._match_positions(keys, table.columns[0], exact))
+
+    def _fn_match(self, args) -> Any:
+        keys, lookup = self._scalar_or_row(args[0]), self._block(args[1], "MATCH")
+        match_type = _to_number(self._scalar_or_row(args[2])) if len(args) == 3 else 1.0
+        if match_type not in (0.0, 1.0) or len(lookup.columns) != 1:
+            raise EvaluationError("Only MATCH over one column with match_type 0 or 1 is supported")
+        return self._match_positions(keys, lookup.columns[0], match_type == 0) + 1
+
+    def _fn_index(self, args) -> Any:
+        table = self._block(args[0], "INDEX")
+        rows = _to_number(self._scalar_or_row(args[1]))
+        column = int(_to_number(self._scalar_or_row(args[2]))) if len(args) == 3 else 1
+        if len(table.columns) > 1 and len(args) == 2:
+            raise EvaluationError("INDEX over several columns needs a column number")
+        if not 1 <= column <= len(table.columns):
+            raise EvaluationError("INDEX column number outside the range")
+        if np.any(np.asarray(rows) == 0):
+            raise EvaluationError("INDEX with row 0 (a whole column) is not supported")
+        # Rows outside the range are Excel's #REF!: NaN, never a wrapped-around position
+        height = len(table.columns[0])
+        if isinstance(rows, np.ndarray):
+            rows = np.where((rows >= 1) & (rows <= height), rows, np.nan)
+        elif not 1 <= rows <= height:
+            rows = math.nan
+        return self._gather(table.columns[column - 1], rows - 1)
+
+    def _criteria_mask(self, values: np.ndarray, criteria: Any) -> np.ndarray:
+        """SUMIF-style criteria: 5, "Done", ">=10", "<>x", "A*" (wildcards)."""
+        op = "="
+        if isinstance(criteria, str):
+            op, operand = CRITERIA_RE.match(criteria).groups()
+            op = op or "="
+            if op in ("=", "<>") and ("*" in operand or "?" in operand):
+                pattern = re.compile("^" + re.escape(operand).replace(r"\*", ".*").replace(r"\?", ".") + "$",
+                                     re.IGNORECASE | re.DOTALL)
+                matched = np.array([isinstance(v, str) and bool(pattern.match(v)) for v in values], dtype=bool)
+                return matched if op == "=" else ~matched
+            try:
+                criteria = float(operand)
+            except ValueError:
+                criteria = operand
+        if _is_numeric(criteria):
+            # NaN (text, blank) never satisfies a comparison and is always "<>"
+            with np.errstate(invalid="ignore"):
+                return self._apply(op, _cell_numbers(values), float(criteria))
+        criteria = str(criteria).lower()
+        texts = [v.lower() if isinstance(v, str) else None for v in values]
+        if op == "<>":
+            return np.array([t != criteria for t in texts], dtype=bool)
+        return np.array([t is not None and self._apply(op, t, criteria) for t in texts], dtype=bool)
+
+    def _conditional(self, function: str, target: Optional[_Block], pairs) -> Any:
+        """SUMIF(S)/COUNTIF(S): scalar criteria filter, per-row criteria group and look up."""
+        mask, keyed, size = None, [], 0
+        for range_node, criteria_node in pairs:
+            values = self._block(range_node, function).columns[0]
+            size = len(values)
+            criteria = self._scalar_or_row(criteria_node)
+            if isinstance(criteria, np.ndarray):
+                keyed.append((values, criteria))
+                continue
+            matched = self._criteria_mask(values, criteria)
+            mask = matched if mask is None else mask & matched
+        mask = np.ones(size, dtype=bool) if mask is None else mask
+        # Counting is summing ones
+        amounts = np.ones(size) if target is None else _cell_numbers(target.columns[0])[:size]
+        if not keyed:
+            return float(np.nansum(amounts[mask]))
+
+        frame = pd.DataFrame({f"k{i}": _lookup_keys(values[mask]) for i, (values, _) in enumerate(keyed)})
+        frame["amount"] = amounts[mask]
+        totals = frame.groupby(list(frame.columns[:-1]), dropna=False)["amount"].sum()
+        lookup = [_lookup_keys(criteria) for _, criteria in keyed]
+        index = pd.Index(lookup[0]) if len(lookup) == 1 else pd.MultiIndex.from_arrays(lookup)
+        return totals.reindex(index).fillna(0).to_numpy(dtype=np.float64)
+
+    def _fn_sumif(self, args) -> Any:
+        target = self._block(args[2] if len(args) == 3 else args[0], "SUMIF")
+        return self._conditional("SUMIF", target, [(args[0], args[1])])
+
+    def _fn_countif(self, args) -> Any:
+        return self._conditional("COUNTIF", None, [(args[0], args[1])])
+
+    def _fn_sumifs(self, args) -> Any:
+        return self._conditional("SUMIFS", self._block(args[0], "SUMIFS"), list(zip(args[1::2], args[2::2])))
+
+    def _fn_countifs(self, args) -> Any:
+        return self._conditional("COUNTIFS", None, list(zip(args[0::2], args[1::2])))
+
+
+# --- WORKBOOK EVALUATION ---
+
+class WorkbookEvaluator:
+    """
+    Recomputes every mined formula column of the notebook metadata over input frames,
+    following the dependency plan. `evaluate(sheets)` returns new frames; inputs are untouched.
+    """
+
+    def __init__(self, metadata: Dict[str, Any], header_index: HeaderIndex):
+        self.metadata = metadata
+        self.header_index = header_index
+        self.plan = compile_plan(metadata)
+        # Duplicate headers collapse onto one plan step; like the plan, the left-most column wins
+        self._formulas: Dict[str, Dict[str, Any]] = {}
+        for sheet, meta in metadata.items():
+            for formula_meta in meta.get("formulas", []):
+                self._formulas.setdefault(f"{sheet}.{formula_meta['column']}", formula_meta)
+
+    @staticmethod
+    def _regimes(formula_meta: Dict[str, Any]) -> List[Tuple[int, Optional[int], str]]:
+        """(first_row, rows, formula) per regime; rows is None for a column filled down to the end."""
+        def span(rows: str) -> Tuple[int, int]:
+            first, _, last = rows.partition(":")
+            return int(first), int(last or first) - int(first) + 1
+
+        if "regimes" not in formula_meta:
+            first_row, n_rows = span(str(formula_meta.get("rows") or "2:3"))
+            return [(first_row, 1 if n_rows == 1 else None, formula_meta["formula"])]
+        return [(*span(str(r["rows"])), r["formula"]) for r in formula_meta["regimes"]]
+
+    def evaluate(self, sheets: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        sheets = {name: df.copy() for name, df in sheets.items()}
+        for sheet, n_rows in self.plan.derived_sheets.items():
+            sheets.setdefault(sheet, pd.DataFrame(index=pd.RangeIndex(n_rows)))
+
+        def column_name(sheet: str, col: int) -> Optional[Any]:
+            # Headerless and repeated headers ("Value_2" twice) only exist positionally in
+            # frames read with pd.read_excel ("Unnamed: 6", "Value_2.1")
+            header = self.header_index.header(sheet, col)
+            if header is not None and self.header_index[sheet].index(header) == col:
+                return header
+            frame = sheets.get(sheet)
+            return frame.columns[col - 1] if frame is not None and col <= len(frame.columns) else header
+
+        evaluator = FormulaEvaluator(sheets, column_name)
+
+        for step in self.plan.order:
+            frame = sheets[step.sheet]
+            regimes = self._regimes(self._formulas[step.node])
+            if len(regimes) == 1 and regimes[0][1] is None:
+                # Filled-down column: every data row of the input frame
+                first_row, _, formula = regimes[0]
+                value = evaluator.evaluate(formula, step.sheet, np.arange(len(frame)), first_row)
+                frame[step.column] = value if isinstance(value, np.ndarray) else [value] * len(frame)
+            else:
+                column = np.full(len(frame), np.nan, dtype=object)
+                for first_row, n_rows, formula in regimes:
+                    positions = np.arange(first_row - 2, min(first_row - 2 + (n_rows or len(frame)), len(frame)))
+                    value = evaluator.evaluate(formula, step.sheet, positions, first_row, single=n_rows == 1)
+                    column[positions] = value if isinstance(value, np.ndarray) else [value] * len(positions)
+                frame[step.column] = pd.Series(column, index=frame.index).infer_objects()
+            evaluator.invalidate(step.sheet, step.column)
+        return sheets
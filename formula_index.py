@@ -0,0 +1,103 @@
+import re
+from typing import Dict, List, Optional, Iterator, NamedTuple
+
+from openpyxl.utils import column_index_from_string
+
+
+# --- R1C1 FORMULA-DEDUP INDEX ---
+# A column filled down in Excel holds one formula per row (=C2*D2, =C3*D3, ...),
+# but in relative R1C1 form they are all the same text (=RC[-2]*RC[-1]).
+# The index groups every formula cell by that shape into contiguous row ranges
+# ("regimes"), so the miner handles each distinct formula once and can still
+# say exactly where a column's logic changes.
+
+A1_REF_RE = re.compile(r"""
+      (?P<string>"(?:[^"]|"")*")                                  # string literal: untouched
+    | (?P<sheet>'(?:[^']|'')*'!|[A-Za-z_][\w.]*!)                 # sheet prefix: untouched
+    | (?<![\w$.])(?P<c1_abs>\$?)(?P<c1>[A-Z]{1,3}):(?P<c2_abs>\$?)(?P<c2>[A-Z]{1,3})(?![\w(])   # whole column G:G
+    | (?<![\w$.])(?P<col_abs>\$?)(?P<col>[A-Z]{1,3})(?P<row_abs>\$?)(?P<row>\d+)(?![\w(!])     # cell $A$1
+""", re.VERBOSE)
+
+
+def _r1c1_col(letters: str, absolute: bool, origin_col: int) -> str:
+    idx = column_index_from_string(letters)
+    if absolute:
+        return f"C{idx}"
+    offset = idx - origin_col
+    return f"C[{offset}]" if offset else "C"
+
+
+def _r1c1_row(row: int, absolute: bool, origin_row: int) -> str:
+    if absolute:
+        return f"R{row}"
+    offset = row - origin_row
+    return f"R[{offset}]" if offset else "R"
+
+
+def to_r1c1(formula: str, row: int, col: int) -> str:
+    """Rewrites every A1 reference of `formula` (entered at row/col) in relative R1C1 notation."""
+    def convert(match):
+        if match.group("string") or match.group("sheet"):
+            return match.group(0)
+        if match.group("c1"):
+            return (f"{_r1c1_col(match.group('c1'), bool(match.group('c1_abs')), col)}:"
+                    f"{_r1c1_col(match.group('c2'), bool(match.group('c2_abs')), col)}")
+        return (_r1c1_row(int(match.group("row")), bool(match.group("row_abs")), row)
+                + _r1c1_col(match.group("col"), bool(match.group("col_abs")), col))
+
+    return A1_REF_RE.sub(convert, formula)
+
+
+class FormulaRegime(NamedTuple):
+    column: int
+    r1c1: str
+    first_row: int
+    last_row: int
+    formula: str  # A1 text as written in first_row
+
+    @property
+    def rows(self) -> int:
+        return self.last_row - self.first_row + 1
+
+
+class FormulaIndex:
+    """
+    Per-sheet index fed one formula cell at a time, in row order (the order the
+    scanner streams them). Consecutive rows of a column with the same R1C1 shape
+    extend the current regime; a different shape or a gap starts a new one.
+    """
+
+    def __init__(self):
+        # col -> list of [r1c1, first_row, last_row, formula]
+        self._regimes: Dict[int, List[list]] = {}
+
+    def add(self, row: int, col: int, formula: str):
+        shape = to_r1c1(formula, row, col)
+        regimes = self._regimes.setdefault(col, [])
+        if regimes and regimes[-1][0] == shape and regimes[-1][2] == row - 1:
+            regimes[-1][2] = row
+        else:
+            regimes.append([shape, row, row, formula])
+
+    @property
+    def columns(self) -> List[int]:
+        return sorted(self._regimes)
+
+    def column_regimes(self, col: int) -> List[FormulaRegime]:
+        return [FormulaRegime(col, *regime) for regime in self._regimes.get(col, [])]
+
+    def first_formula(self, col: int) -> Optional[str]:
+        regimes = self._regimes.get(col)
+        return regimes[0][3] if regimes else None
+
+    def shapes(self) -> Dict[str, List[FormulaRegime]]:
+        """Distinct formula shapes of the sheet -> every regime using that shape."""
+        grouped: Dict[str, List[FormulaRegime]] = {}
+        for col in self.columns:
+            for regime in self.column_regimes(col):
+                grouped.setdefault(regime.r1c1, []).append(regime)
+        return grouped
+
+    def __iter__(self) -> Iterator[FormulaRegime]:
+        for col in self.columns:
+            yield from self.column_regimes(col)
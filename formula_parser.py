@@ -0,0 +1,239 @@
+import re
+from functools import lru_cache
+from typing import List, Any, Optional, Tuple, NamedTuple, Union
+
+from openpyxl.utils import column_index_from_string
+
+
+# --- EXCEL FORMULA PARSER ---
+# Small recursive-descent parser for the formula subset our templates use.
+# Produces a tuple-based AST shared by the pandas transpiler and the native
+# evaluator. Parsed trees are memoized per formula text.
+
+class FormulaSyntaxError(ValueError):
+    """The formula text could not be parsed."""
+
+
+class Number(NamedTuple):
+    value: float
+
+
+class Text(NamedTuple):
+    value: str
+
+
+class Bool(NamedTuple):
+    value: bool
+
+
+class Empty(NamedTuple):
+    """An omitted function argument, e.g. the last one of VLOOKUP(A2,B:C,2,)."""
+
+
+class CellRef(NamedTuple):
+    sheet: Optional[str]
+    col: int
+    row: int
+    col_abs: bool
+    row_abs: bool
+
+
+class RangeRef(NamedTuple):
+    sheet: Optional[str]
+    col1: int
+    col2: int
+    row1: Optional[int]   # None for whole columns (A:C)
+    row2: Optional[int]
+    row1_abs: bool
+    row2_abs: bool
+
+    @property
+    def columns(self) -> range:
+        return range(self.col1, self.col2 + 1)
+
+
+class Unary(NamedTuple):
+    op: str
+    operand: Any
+
+
+class Binary(NamedTuple):
+    op: str
+    left: Any
+    right: Any
+
+
+class Call(NamedTuple):
+    name: str
+    args: Tuple[Any, ...]
+
+
+Node = Union[Number, Text, Bool, Empty, CellRef, RangeRef, Unary, Binary, Call]
+
+
+TOKEN_RE = re.compile(r"""
+      (?P<ws>\s+)
+    | (?P<string>"(?:[^"]|"")*")
+    | (?P<ref>
+          (?:(?P<sheet>'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?
+          (?:
+              (?P<c1_abs>\$?)(?P<c1>[A-Za-z]{1,3})(?P<r1_abs>\$?)(?P<r1>\d+)
+              (?::(?P<c2_abs>\$?)(?P<c2>[A-Za-z]{1,3})(?P<r2_abs>\$?)(?P<r2>\d+))?
+            | \$?(?P<wc1>[A-Za-z]{1,3}):\$?(?P<wc2>[A-Za-z]{1,3})
+          )
+          (?![\w(])
+      )
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<func>[A-Za-z_][\w.]*)\s*\(
+    | (?P<bool>TRUE|FALSE)(?![\w(])
+    | (?P<op><>|<=|>=|[-+*/^&=<>%(),])
+""", re.VERBOSE | re.IGNORECASE)
+
+# Lowest to highest; unary minus and % bind tighter than ^ like in Excel
+COMPARISON_OPS = ("=", "<>", "<", ">", "<=", ">=")
+
+
+def _tokenize(formula: str) -> List[Tuple[str, Any]]:
+    tokens = []
+    pos = 0
+    while pos < len(formula):
+        match = TOKEN_RE.match(formula, pos)
+        if not match:
+            raise FormulaSyntaxError(f"Unexpected text at position {pos}: {formula[pos:pos + 15]!r}")
+        pos = match.end()
+        # lastgroup is the outermost alternative that matched (inner ref groups close first)
+        kind = match.lastgroup
+        if kind == "ws":
+            continue
+        if kind == "ref":
+            tokens.append(("ref", _reference(match)))
+        elif kind == "string":
+            tokens.append(("string", match.group("string")[1:-1].replace('""', '"')))
+        elif kind == "number":
+            tokens.append(("number", float(match.group("number"))))
+        elif kind == "func":
+            tokens.append(("func", match.group("func").upper()))
+        elif kind == "bool":
+            tokens.append(("bool", match.group("bool").upper() == "TRUE"))
+        else:
+            tokens.append(("op", match.group("op")))
+    return tokens
+
+
+def _reference(match) -> Union[CellRef, RangeRef]:
+    sheet = match.group("sheet")
+    sheet = sheet.strip("'").replace("''", "'") if sheet and sheet.startswith("'") else sheet
+    if match.group("wc1"):
+        col1, col2 = sorted((column_index_from_string(match.group("wc1").upper()),
+                             column_index_from_string(match.group("wc2").upper())))
+        return RangeRef(sheet, col1, col2, None, None, True, True)
+
+    col1 = column_index_from_string(match.group("c1").upper())
+    row1 = int(match.group("r1"))
+    if not match.group("c2"):
+        return CellRef(sheet, col1, row1, bool(match.group("c1_abs")), bool(match.group("r1_abs")))
+    col2 = column_index_from_string(match.group("c2").upper())
+    row2 = int(match.group("r2"))
+    row1_abs, row2_abs = bool(match.group("r1_abs")), bool(match.group("r2_abs"))
+    if row2 < row1:
+        row1, row2, row1_abs, row2_abs = row2, row1, row2_abs, row1_abs
+    return RangeRef(sheet, min(col1, col2), max(col1, col2), row1, row2, row1_abs, row2_abs)
+
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, Any]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Tuple[Optional[str], Any]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self) -> Tuple[str, Any]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, op: str):
+        kind, value = self.take()
+        if kind != "op" or value != op:
+            raise FormulaSyntaxError(f"Expected {op!r}, got {value!r}")
+
+    def binary(self, ops, operand):
+        node = operand()
+        while self.peek()[0] == "op" and self.peek()[1] in ops:
+            node = Binary(self.take()[1], node, operand())
+        return node
+
+    def comparison(self):
+        return self.binary(COMPARISON_OPS, self.concat)
+
+    def concat(self):
+        return self.binary(("&",), self.additive)
+
+    def additive(self):
+        return self.binary(("+", "-"), self.term)
+
+    def term(self):
+        return self.binary(("*", "/"), self.power)
+
+    def power(self):
+        return self.binary(("^",), self.unary)
+
+    def unary(self):
+        if self.peek() in (("op", "-"), ("op", "+")):
+            op = self.take()[1]
+            operand = self.unary()
+            return operand if op == "+" else Unary("-", operand)
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while self.peek() == ("op", "%"):
+            self.take()
+            node = Unary("%", node)
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return Number(value)
+        if kind == "string":
+            return Text(value)
+        if kind == "bool":
+            return Bool(value)
+        if kind == "ref":
+            return value
+        if kind == "func":
+            return Call(value, self.arguments())
+        if (kind, value) == ("op", "("):
+            node = self.comparison()
+            self.expect(")")
+            return node
+        raise FormulaSyntaxError(f"Unexpected token {value!r}")
+
+    def arguments(self) -> Tuple[Any, ...]:
+        args = []
+        if self.peek() == ("op", ")"):
+            self.take()
+            return ()
+        while True:
+            if self.peek() in (("op", ","), ("op", ")")):
+                args.append(Empty())
+            else:
+                args.append(self.comparison())
+            kind, value = self.take()
+            if (kind, value) == ("op", ")"):
+                return tuple(args)
+            if (kind, value) != ("op", ","):
+                raise FormulaSyntaxError(f"Expected ',' or ')' in argument list, got {value!r}")
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(formula: str) -> Node:
+    """'=A2*2' -> Binary('*', CellRef(None, 1, 2, False, False), Number(2.0))."""
+    text = formula[1:] if formula.startswith("=") else formula
+    parser = _Parser(_tokenize(text))
+    node = parser.comparison()
+    if parser.pos != len(parser.tokens):
+        raise FormulaSyntaxError(f"Unexpected trailing token {parser.peek()[1]!r}")
+    return node
@@ -0,0 +1,557 @@
+import re
+from typing import Dict, List, Any, Optional, Tuple, Callable, NamedTuple
+
+from formula_parser import (
+    Number, Text, Bool, Empty, CellRef, RangeRef, Unary, Binary, Call,
+    FormulaSyntaxError, parse_formula,
+)
+from header_index import HeaderIndex
+
+
+# --- DETERMINISTIC FORMULA -> PANDAS TRANSPILER ---
+# Fast path in front of the LLM: common Excel shapes (arithmetic, SUM/AVERAGE/MIN/MAX,
+# IF, IFERROR, VLOOKUP and INDEX/MATCH with exact match, SUMIF(S)/COUNTIF(S), COUNTA,
+# ROUND) are turned into vectorized pandas/NumPy expressions directly. Anything else raises
+# UnsupportedFormula and is left to the LLM.
+
+class UnsupportedFormula(ValueError):
+    """The formula uses something the transpiler does not handle; the LLM has to write it."""
+
+
+class _Expr(NamedTuple):
+    code: str
+    # scalar | row (one value per data row of the formula's sheet) |
+    # range (fixed block of cells) | rowblock (several columns of the same row)
+    kind: str
+    frame: str = ""                 # range/rowblock: code of the (row-sliced) frame
+    columns: Tuple[Any, ...] = ()   # range/rowblock: column names
+
+
+BINARY_OPS = {"+": "+", "-": "-", "*": "*", "/": "/", "^": "**",
+              "=": "==", "<>": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+TEXT_FN = "lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v)"
+CRITERIA_RE = re.compile(r"^(<=|>=|<>|<|>|=)?(.*)$", re.DOTALL)
+
+
+def _literal(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+class FormulaTranspiler:
+    """
+    `column_name(sheet, col_idx)` gives the DataFrame column of a cell (None = no header),
+    `frame(sheet)` the code that evaluates to that sheet's DataFrame in the generated method.
+    Data row r of a sheet is positional row r - 2 of its DataFrame (row 1 holds the headers).
+    """
+
+    def __init__(self, column_name: Callable[[str, int], Optional[Any]], frame: Callable[[str], str]):
+        self.column_name = column_name
+        self.frame = frame
+        self._bindings: Dict[str, str] = {}   # hoisted code -> local variable name
+
+    def _compile(self, formula: str, sheet: str, first_row: int, n_rows: int, column: Optional[Any]) -> _Expr:
+        """
+        Expression computing `formula` for a whole column whose first formula sits in `first_row`.
+        `n_rows` = 1 means a single cell (its relative ranges are then fixed blocks).
+        """
+        try:
+            tree = parse_formula(formula)
+        except FormulaSyntaxError as e:
+            raise UnsupportedFormula(str(e)) from e
+        self._sheet, self._first_row, self._single = sheet, first_row, n_rows == 1
+        self._column = column
+        expr = self._emit(tree)
+        if expr.kind in ("range", "rowblock"):
+            raise UnsupportedFormula("Formula returns an array")
+        return expr
+
+    # --- references ---
+
+    def _name(self, sheet: str, col: int) -> Any:
+        name = self.column_name(sheet, col)
+        if name is None:
+            raise UnsupportedFormula(f"No header for column {col} of {sheet}")
+        return name
+
+    def _cell(self, ref: CellRef) -> _Expr:
+        sheet = ref.sheet or self._sheet
+        name = self._name(sheet, ref.col)
+        frame = self.frame(sheet)
+        if ref.row < 2:
+            raise UnsupportedFormula("Reference into the header row")
+        if ref.row_abs or (self._single and ref.row != self._first_row):
+            return _Expr(f"{frame}[{name!r}].iloc[{ref.row - 2}]", "scalar")
+
+        offset = ref.row - self._first_row
+        if sheet == self._sheet and name == self._column:
+            raise UnsupportedFormula("Recursive reference to the formula's own column")
+        code = f"{frame}[{name!r}]"
+        return _Expr(f"{code}.shift({-offset})" if offset else code, "row")
+
+    def _range(self, ref: RangeRef) -> _Expr:
+        sheet = ref.sheet or self._sheet
+        names = tuple(self._name(sheet, c) for c in ref.columns)
+        frame = self.frame(sheet)
+        fixed = ref.row1 is None or (ref.row1_abs and ref.row2_abs) or self._single
+        if fixed:
+            if ref.row1 is not None:
+                frame = f"{frame}.iloc[{max(ref.row1, 2) - 2}:{ref.row2 - 1}]"
+            code = f"{frame}[{names[0]!r}]" if len(names) == 1 else f"{frame}[{list(names)!r}]"
+            return _Expr(code, "range", frame, names)
+
+        # Same relative row on both ends: a horizontal slice of the formula's own row
+        if ref.row1 == ref.row2 and not ref.row1_abs and not ref.row2_abs:
+            if len(names) == 1:
+                return self._cell(CellRef(ref.sheet, ref.col1, ref.row1, False, False))
+            offset = ref.row1 - self._first_row
+            code = f"{frame}[{list(names)!r}]" + (f".shift({-offset})" if offset else "")
+            return _Expr(code, "rowblock", frame, names)
+        raise UnsupportedFormula("Sliding or expanding range")
+
+    # --- expressions ---
+
+    def _emit(self, node) -> _Expr:
+        if isinstance(node, Number):
+            return _Expr(_literal(node.value), "scalar")
+        if isinstance(node, Text):
+            return _Expr(repr(node.value), "scalar")
+        if isinstance(node, Bool):
+            return _Expr(repr(node.value), "scalar")
+        if isinstance(node, CellRef):
+            return self._cell(node)
+        if isinstance(node, RangeRef):
+            return self._range(node)
+        if isinstance(node, Unary):
+            operand = self._value(node.operand)
+            code = f"(-{operand.code})" if node.op == "-" else f"({operand.code} / 100)"
+            return _Expr(code, operand.kind)
+        if isinstance(node, Binary):
+            return self._binary(node)
+        if isinstance(node, Call):
+            handler = getattr(self, f"_fn_{node.name.replace('.', '_').lower()}", None)
+            if handler is None:
+                raise UnsupportedFormula(f"Function {node.name} is not supported")
+            return handler(node.args)
+        raise UnsupportedFormula(f"Unsupported syntax: {type(node).__name__}")
+
+    def _value(self, node) -> _Expr:
+        """A scalar or per-row operand (ranges are only valid as function arguments)."""
+        expr = self._emit(node)
+        if expr.kind == "rowblock" or expr.kind == "range":
+            raise UnsupportedFormula("Range used as a value")
+        return expr
+
+    def _binary(self, node: Binary) -> _Expr:
+        left, right = self._value(node.left), self._value(node.right)
+        kind = "row" if "row" in (left.kind, right.kind) else "scalar"
+        if node.op == "&":
+            return _Expr(f"({self._as_text(node.left, left)} + {self._as_text(node.right, right)})", kind)
+        return _Expr(f"({left.code} {BINARY_OPS[node.op]} {right.code})", kind)
+
+    @staticmethod
+    def _as_text(node, expr: _Expr) -> str:
+        if isinstance(node, Text) or (isinstance(node, Binary) and node.op == "&"):
+            return expr.code
+        # Excel shows whole numbers without ".0" when they are joined into text
+        if expr.kind == "row":
+            return f"{expr.code}.map({TEXT_FN})"
+        return f"({TEXT_FN})({expr.code})"
+
+    def _index(self) -> str:
+        return f"{self.frame(self._sheet)}.index"
+
+    # --- functions ---
+
+    def _aggregate(self, args, scalar_fn: str, row_fn: str) -> List[_Expr]:
+        parts = []
+        for arg in args:
+            expr = self._emit(arg)
+            if expr.kind == "range":
+                code = f"{expr.code}.{scalar_fn}()" if len(expr.columns) == 1 else f"{expr.code}.{scalar_fn}().{scalar_fn}()"
+                parts.append(_Expr(code, "scalar"))
+            elif expr.kind == "rowblock":
+                parts.append(_Expr(f"{expr.code}.{row_fn}(axis=1)", "row"))
+            else:
+                parts.append(expr)
+        if not parts:
+            raise UnsupportedFormula("Aggregate without arguments")
+        return parts
+
+    @staticmethod
+    def _kind(parts: List[_Expr]) -> str:
+        return "row" if any(p.kind == "row" for p in parts) else "scalar"
+
+    def _fn_sum(self, args) -> _Expr:
+        parts = self._aggregate(args, "sum", "sum")
+        if len(parts) == 1:
+            return parts[0]
+        return _Expr("(" + " + ".join(p.code for p in parts) + ")", self._kind(parts))
+
+    def _fn_min(self, args) -> _Expr:
+        return self._extreme(self._aggregate(args, "min", "min"), "np.fmin")
+
+    def _fn_max(self, args) -> _Expr:
+        return self._extreme(self._aggregate(args, "max", "max"), "np.fmax")
+
+    def _extreme(self, parts: List[_Expr], fn: str) -> _Expr:
+        code = parts[0].code
+        for part in parts[1:]:
+            code = f"{fn}({code}, {part.code})"
+        return _Expr(code, self._kind(parts))
+
+    def _fn_average(self, args) -> _Expr:
+        if len(args) == 1:
+            expr = self._emit(args[0])
+            if expr.kind == "range":
+                code = f"{expr.code}.mean()" if len(expr.columns) == 1 else f"{expr.code}.stack().mean()"
+                return _Expr(code, "scalar")
+            if expr.kind == "rowblock":
+                return _Expr(f"{expr.code}.mean(axis=1)", "row")
+            return expr
+        parts = [self._value(arg) for arg in args]
+        return _Expr("((" + " + ".join(p.code for p in parts) + f") / {len(parts)})", self._kind(parts))
+
+    def _fn_if(self, args) -> _Expr:
+        if not 2 <= len(args) <= 3:
+            raise UnsupportedFormula("IF takes 2 or 3 arguments")
+        cond = self._value(args[0])
+        then = self._value(Number(0) if isinstance(args[1], Empty) else args[1])
+        other = self._value(Bool(False) if len(args) == 2 or isinstance(args[2], Empty) else args[2])
+        if cond.kind == then.kind == other.kind == "scalar":
+            return _Expr(f"({then.code} if {cond.code} else {other.code})", "scalar")
+        return _Expr(f"pd.Series(np.where({cond.code}, {then.code}, {other.code}), index={self._index()})", "row")
+
+    def _fn_round(self, args) -> _Expr:
+        if len(args) != 2 or not isinstance(args[1], Number):
+            raise UnsupportedFormula("ROUND needs a literal number of digits")
+        value = self._value(args[0])
+        scale = f"10.0 ** {_literal(args[1].value)}"
+        # Excel rounds halves away from zero (np.round would round them to even)
+        return _Expr(f"(lambda v: np.sign(v) * np.floor(np.abs(v) * {scale} + 0.5) / {scale})({value.code})",
+                     value.kind)
+
+    def _bind(self, code: str, hint: str) -> str:
+        """Local variable holding `code`, assigned once at the top of the generated method."""
+        if code not in self._bindings:
+            base = re.sub(r"\W+", "_", str(hint)).strip("_").lower() or "lookup"
+            name, n = f"{base}_rows", 2
+            while name in self._bindings.values():
+                name, n = f"{base}_rows_{n}", n + 1
+            self._bindings[code] = name
+        return self._bindings[code]
+
+    def _lookup(self, key: _Expr, keys: str, values: str, table: str) -> _Expr:
+        """
+        First-match lookup through lookup_runtime: the table's key column is hashed once
+        per method and the match positions are shared by every lookup with the same keys.
+        """
+        rows = self._bind(f"LookupIndex({keys}).match({key.code})", table)
+        return _Expr(f"{rows}.take({values})", "row" if key.kind == "row" else "scalar")
+
+    def _fn_vlookup(self, args) -> _Expr:
+        if len(args) != 4 or isinstance(args[3], Empty) or args[3] not in (Bool(False), Number(0)):
+            raise UnsupportedFormula("Only exact-match VLOOKUP (4th argument FALSE) is supported")
+        if not isinstance(args[2], Number):
+            raise UnsupportedFormula("VLOOKUP column index must be a literal")
+        key, table = self._value(args[0]), self._emit(args[1])
+        col_index = int(args[2].value)
+        if table.kind != "range" or not 2 <= col_index <= len(table.columns):
+            raise UnsupportedFormula("VLOOKUP table must be a fixed range containing the result column")
+        key_col, value_col = table.columns[0], table.columns[col_index - 1]
+        return self._lookup(key, f"{table.frame}[{key_col!r}]", f"{table.frame}[{value_col!r}]",
+                            args[1].sheet or self._sheet)
+
+    def _fn_index(self, args) -> _Expr:
+        # Only the INDEX(values, MATCH(key, keys, 0)) idiom
+        if len(args) != 2 or not isinstance(args[1], Call) or args[1].name != "MATCH":
+            raise UnsupportedFormula("Only INDEX(range, MATCH(key, range, 0)) is supported")
+        match_args = args[1].args
+        if len(match_args) != 3 or match_args[2] != Number(0):
+            raise UnsupportedFormula("Only exact MATCH (match_type 0) is supported")
+        values, keys = self._emit(args[0]), self._emit(match_args[1])
+        if values.kind != "range" or keys.kind != "range" or len(values.columns) != 1 or len(keys.columns) != 1:
+            raise UnsupportedFormula("INDEX/MATCH ranges must be single fixed columns")
+        return self._lookup(self._value(match_args[0]), keys.code, values.code,
+                            match_args[1].sheet or self._sheet)
+
+    def _fn_iferror(self, args) -> _Expr:
+        # Vectorized errors show up as NaN (lookup misses) or +/-inf (division by zero)
+        if len(args) != 2:
+            raise UnsupportedFormula("IFERROR takes 2 arguments")
+        value, fallback = self._value(args[0]), self._value(args[1])
+        if value.kind != "row":
+            raise UnsupportedFormula("IFERROR over a single cell")
+        return _Expr(f"{value.code}.replace([np.inf, -np.inf], np.nan).fillna({fallback.code})", "row")
+
+    def _fn_counta(self, args) -> _Expr:
+        parts = []
+        for arg in args:
+            expr = self._emit(arg)
+            if expr.kind != "range":
+                raise UnsupportedFormula("COUNTA over single cells")
+            count = f"{expr.code}.notna().sum()" + ("" if len(expr.columns) == 1 else ".sum()")
+            # Whole columns include the (non-empty) header cell
+            whole = isinstance(arg, RangeRef) and arg.row1 is None
+            parts.append(f"({count} + {len(expr.columns)})" if whole else count)
+        if not parts:
+            raise UnsupportedFormula("COUNTA without arguments")
+        return _Expr(" + ".join(parts) if len(parts) == 1 else "(" + " + ".join(parts) + ")", "scalar")
+
+    def _single_column(self, node, function: str) -> _Expr:
+        expr = self._emit(node)
+        if expr.kind != "range" or len(expr.columns) != 1:
+            raise UnsupportedFormula(f"{function} ranges must be single fixed columns")
+        return expr
+
+    def _criteria(self, values: _Expr, criteria) -> Tuple[Optional[str], Optional[_Expr]]:
+        """(mask code, None) for literal criteria, (None, key) for per-cell equality criteria."""
+        if isinstance(criteria, Number):
+            return f"({values.code} == {_literal(criteria.value)})", None
+        if isinstance(criteria, Text):
+            op, operand = CRITERIA_RE.match(criteria.value).groups()
+            if "*" in operand or "?" in operand:
+                raise UnsupportedFormula("Wildcard criteria are not supported")
+            try:
+                operand = _literal(float(operand))
+            except ValueError:
+                operand = repr(operand)
+            return f"({values.code} {BINARY_OPS[op or '=']} {operand})", None
+        key = self._value(criteria)
+        if key.kind == "scalar":
+            return f"({values.code} == {key.code})", None
+        return None, key
+
+    def _conditional(self, function: str, target: Optional[_Expr], pairs) -> _Expr:
+        """SUMIF(S)/COUNTIF(S): literal criteria become masks, per-row criteria a grouped lookup."""
+        masks, keyed = [], []
+        for values_node, criteria in pairs:
+            values = self._single_column(values_node, function)
+            mask, key = self._criteria(values, criteria)
+            if mask:
+                masks.append(mask)
+            else:
+                keyed.append((values, key))
+
+        combined = masks[0] if len(masks) == 1 else f"({' & '.join(masks)})"
+        mask = f"[{combined}.to_numpy()]" if masks else ""
+        if not keyed:
+            if target is None:
+                return _Expr(f"{combined}.sum()", "scalar")
+            return _Expr(f"{target.code}{mask}.sum()", "scalar")
+
+        by = ", ".join(f"{values.code}{mask}.to_numpy()" for values, _ in keyed)
+        if target is None:
+            grouped = f"{keyed[0][0].code}{mask}.groupby([{by}]).size()"
+        else:
+            grouped = f"{target.code}{mask}.groupby([{by}]).sum()"
+        if len(keyed) == 1:
+            return _Expr(f"{keyed[0][1].code}.map({grouped}).fillna(0)", "row")
+        keys = ", ".join(f"np.asarray({key.code})" for _, key in keyed)
+        return _Expr(f"pd.Series({grouped}.reindex(pd.MultiIndex.from_arrays([{keys}])).fillna(0).to_numpy(), "
+                     f"index={self._index()})", "row")
+
+    def _fn_sumif(self, args) -> _Expr:
+        if len(args) not in (2, 3):
+            raise UnsupportedFormula("SUMIF takes 2 or 3 arguments")
+        target = self._single_column(args[2] if len(args) == 3 else args[0], "SUMIF")
+        return self._conditional("SUMIF", target, [(args[0], args[1])])
+
+    def _fn_countif(self, args) -> _Expr:
+        if len(args) != 2:
+            raise UnsupportedFormula("COUNTIF takes 2 arguments")
+        return self._conditional("COUNTIF", None, [(args[0], args[1])])
+
+    def _fn_sumifs(self, args) -> _Expr:
+        if len(args) < 3 or len(args) % 2 == 0:
+            raise UnsupportedFormula("SUMIFS takes a sum range and criteria pairs")
+        target = self._single_column(args[0], "SUMIFS")
+        return self._conditional("SUMIFS", target, list(zip(args[1::2], args[2::2])))
+
+    def _fn_countifs(self, args) -> _Expr:
+        if len(args) < 2 or len(args) % 2:
+            raise UnsupportedFormula("COUNTIFS takes criteria pairs")
+        return self._conditional("COUNTIFS", None, list(zip(args[0::2], args[1::2])))
+
+    def transpile_column(self, regimes: List[Dict[str, Any]], sheet: str, column: Any) -> List[str]:
+        """
+        Body lines (unindented) computing a whole column from its regimes
+        ([{"rows": "2:40", "formula": ...}, ...]); each row range gets its own expression.
+        """
+        self._bindings = {}
+        if len(regimes) == 1:
+            first_row, n_rows = _row_span(regimes[0].get("rows"))
+            expr = self._compile(regimes[0]["formula"], sheet, first_row, n_rows, column)
+            return self._hoisted() + [f"return {expr.code}"]
+
+        lines = [f"result = pd.Series(np.nan, index={self.frame(sheet)}.index, dtype=object)"]
+        for regime in regimes:
+            first_row, n_rows = _row_span(regime["rows"])
+            expr = self._compile(regime["formula"], sheet, first_row, n_rows, column)
+            start, stop = first_row - 2, first_row - 2 + n_rows
+            # Formulas may hold line breaks (Alt+Enter): keep the comment on one line
+            lines.append(f"# rows {regime['rows']}: {' '.join(regime['formula'].split())}")
+            if expr.kind == "row":
+                lines.append(f"result.iloc[{start}:{stop}] = np.asarray({expr.code})[{start}:{stop}]")
+            else:
+                lines.append(f"result.iloc[{start}:{stop}] = {expr.code}")
+        lines = self._hoisted() + lines
+        lines.append("return result.infer_objects()")
+        return lines
+
+    def _hoisted(self) -> List[str]:
+        return [f"{name} = {code}" for code, name in self._bindings.items()]
+
+
+# --- METHOD RENDERING ---
+
+# Generated code that uses transpiled lookups needs this import (see dependency_graph.ensure_import)
+RUNTIME_IMPORT = "from lookup_runtime import LookupIndex"
+CALCULATOR_RUNTIME_IMPORT = "from calculator_runtime import CalculatorBase, formula_property"
+
+# Classes the transpiled methods are installed into when no LLM code is needed at all
+MODEL_SCAFFOLD = """import pandas as pd
+import numpy as np
+from lookup_runtime import LookupIndex
+
+
+class ExcelModel:
+    def __init__(self):
+        pass
+"""
+
+CALCULATOR_SCAFFOLD = """import pandas as pd
+import numpy as np
+from typing import Dict
+from calculator_runtime import CalculatorBase, formula_property
+from lookup_runtime import LookupIndex
+
+
+class ExcelCalculator(CalculatorBase):
+    def __init__(self, df: pd.DataFrame, all_data: Dict[str, pd.DataFrame]):
+        self.df = df
+        self.all_data = all_data
+"""
+
+def _row_span(rows: Optional[str]) -> Tuple[int, int]:
+    """'2:40' -> (first row, number of rows); a missing span means a filled-down column."""
+    if not rows:
+        return 2, 2
+    first, _, last = str(rows).partition(":")
+    return int(first), int(last or first) - int(first) + 1
+
+
+def _regimes(meta: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if "regimes" in meta:
+        if any("formula" not in r for r in meta["regimes"]):
+            raise UnsupportedFormula("Regimes without formula text")
+        return meta["regimes"]
+    return [{"rows": meta.get("rows"), "formula": meta["formula"]}]
+
+
+def _indent(lines: List[str]) -> str:
+    return "".join(f"        {line}\n" for line in lines)
+
+
+def _doc(text: str) -> str:
+    """`text` escaped for a triple-quoted docstring: backslashes, quote runs and a trailing quote."""
+    return re.sub(r'"(?=")|"$', r'\\"', text.replace("\\", "\\\\"))
+
+
+def transpile_model_methods(metadata: Dict[str, Any], header_index: HeaderIndex,
+                            skip: Optional[set] = None) -> Tuple[Dict[str, str], List[str]]:
+    """
+    `calculate_*(self, sheets)` methods for the ExcelModel of Excel_miner_5_0.ipynb.
+    Returns ({method_name: source}, [method names left for the LLM]).
+    `skip` = method names that must go to the LLM anyway (e.g. they failed validation).
+    """
+    transpiler = FormulaTranspiler(header_index.header, lambda sheet: f"sheets[{sheet!r}]")
+    methods, remaining = {}, []
+    for sheet, meta in metadata.items():
+        for formula_meta in meta.get("formulas", []):
+            name = formula_meta["method_name"]
+            if name in methods or name in remaining:
+                continue
+            try:
+                if name in (skip or ()):
+                    raise UnsupportedFormula("Left to the LLM")
+                body = transpiler.transpile_column(_regimes(formula_meta), sheet, formula_meta["column"])
+            except UnsupportedFormula:
+                remaining.append(name)
+                continue
+            depends_on = ", ".join(formula_meta.get("depends_on", [])) or "raw inputs only"
+            methods[name] = (
+                f"    def {name}(self, sheets):\n"
+                f'        """\n'
+                f"        Excel: {_doc(formula_meta['formula'])}\n"
+                f"        Depends on: {_doc(depends_on)}\n"
+                f"        Transpiled from the formula (no LLM).\n"
+                f'        """\n'
+                + _indent(body)
+            )
+    return methods, remaining
+
+
+def transpile_calculator_properties(sheet_name: str, logic: Dict[str, Any],
+                                    header_index: HeaderIndex) -> Tuple[Dict[str, str], List[str]]:
+    """
+    `@formula_property` methods (memoized, see calculator_runtime) for the
+    ExcelCalculator(df, all_data) of ExelMINER_Agent.py.
+    Columns are the sanitized identifiers the miner reports; the active sheet is `self.df`.
+    Returns ({property_name: source}, [logic columns left for the LLM]).
+    """
+    def column_name(sheet, col):
+        return header_index[sheet].identifier(col) if sheet in header_index else None
+
+    def frame(sheet):
+        return "self.df" if sheet == sheet_name else f"self.all_data[{sheet!r}]"
+
+    transpiler = FormulaTranspiler(column_name, frame)
+    properties, remaining = {}, []
+    for column, rule in logic.items():
+        try:
+            if "formula" not in rule:
+                raise UnsupportedFormula("Mined before formula text was recorded")
+            body = transpiler.transpile_column(_regimes(rule), sheet_name, column)
+        except UnsupportedFormula:
+            remaining.append(column)
+            continue
+        properties[column.lower()] = (
+            f"    @formula_property\n"
+            f"    def {column.lower()}(self):\n"
+            f'        """Excel: {_doc(rule["formula"])} (transpiled, no LLM)"""\n'
+            + _indent(body)
+        )
+    return properties, remaining
+
+
+def transpile_calculator(metadata: Dict[str, Any], header_index: HeaderIndex) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Properties for every sheet's logic. ExcelCalculator is one class for all sheets, so a
+    property name claimed by two sheets is left to the LLM. Remaining items are "Sheet.Column".
+    """
+    properties, owners, remaining = {}, {}, []
+    for sheet, meta in metadata.items():
+        sheet_properties, sheet_remaining = transpile_calculator_properties(sheet, meta.get("logic", {}), header_index)
+        remaining += [f"{sheet}.{column}" for column in sheet_remaining]
+        for name, source in sheet_properties.items():
+            if name in owners:
+                remaining += [f"{owners[name]}.{name}", f"{sheet}.{name}"]
+                properties.pop(name, None)
+                continue
+            owners[name] = sheet
+            properties[name] = source
+    return properties, remaining
+
+
+def properties_named(text: str, metadata: Dict[str, Any]) -> List[str]:
+    """
+    "Sheet.Column" of every calculator property `text` (an error log) names, as
+    `total_sales`, `self.total_sales` or in a test name such as `test_total_sales`.
+    """
+    named = []
+    for sheet, meta in metadata.items():
+        for column in meta.get("logic", {}):
+            pattern = rf"(?<![A-Za-z0-9_])(?:test_)?{re.escape(column.lower())}(?![A-Za-z0-9_])"
+            if re.search(pattern, text, re.IGNORECASE):
+                named.append(f"{sheet}.{column}")
+    return named
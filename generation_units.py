@@ -0,0 +1,274 @@
+import os
+import re
+import ast
+import json
+import hashlib
+import threading
+import textwrap
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dependency_graph import ExecutionPlan, ensure_import, install_methods, install_transform
+from formula_transpiler import MODEL_SCAFFOLD, transpile_model_methods
+from header_index import HeaderIndex
+from prompt_encoder import encode_metadata
+from validation_history import render_failure
+
+
+# --- PER-FORMULA GENERATION UNITS ---
+# The generator used to ask the LLM for the FULL script on every retry, with all
+# metadata and all existing code in the prompt, even when one column out of fifty
+# failed. Now every formula method is a unit with its own state:
+#
+#   status: "pending" (not validated yet) | "passed" | "failed"
+#   origin: "transpiler" | "cache" | "llm"  (None = no source yet)
+#
+# Only units without source or that failed validation go to the LLM, with just
+# their own formulas, inputs, previous attempt and error. The returned methods are
+# spliced into the model, so prompt size follows the number of failures instead of
+# the workbook size. Methods that passed are stored in a UnitCache keyed by the
+# formula signature and are reused by later runs without an LLM call.
+#
+#   units = GenerationUnits(metadata, state.get("units"))
+#   units.seed(load_header_index(template), unit_cache)
+#   todo = units.needs_llm()                 -> prompt with units.prompt_context(todo, header_index)
+#   units.accept(llm_response, todo)
+#   code = units.assemble(plan)            (methods still without source are left out: units.unsourced())
+#   ... validator -> units.record({method_name: None | error}, unit_cache)
+
+VERSION = "1"
+
+
+def unit_key(sheet: str, formula_meta: Dict[str, Any]) -> str:
+    """Everything that decides what the method must compute (not where it sits in the sheet)."""
+    signature = {field: formula_meta.get(field) for field in
+                 ("column", "method_name", "formula", "rows", "dtype", "depends_on", "references", "regimes")}
+    payload = json.dumps({"sheet": sheet, **signature}, sort_keys=True, default=str)
+    return hashlib.sha256(f"unit|{VERSION}|{payload}".encode()).hexdigest()
+
+
+class UnitCache:
+    """Validated method sources on disk: <cache_dir>/<unit key>.json -> {"source", "imports"}."""
+
+    def __init__(self, cache_dir: str = ".unit_cache"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, source: str, imports: List[str]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"source": source, "imports": imports}, fh)
+        os.replace(tmp_path, path)
+
+    def discard(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+def _error_text(error: Any) -> str:
+    # Validator verdicts are structured records (validation_history): rendered here, for the prompt
+    return render_failure(error) if isinstance(error, dict) else str(error)
+
+
+def _response_code(content: str) -> str:
+    """The python block of an LLM answer (or the whole answer when it has no fence)."""
+    code_match = re.search(r"```python\s+(.*?)\s+```", content, re.DOTALL)
+    return code_match.group(1) if code_match else content
+
+
+class GenerationUnits:
+    """One unit per formula method of the ExcelModel; the state is plain dicts (fits the graph state)."""
+
+    def __init__(self, metadata: Dict[str, Any], units: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.metadata = metadata
+        self.units: Dict[str, Dict[str, Any]] = {name: dict(unit) for name, unit in (units or {}).items()}
+        self.formulas: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for sheet, meta in metadata.items():
+            for formula_meta in meta.get("formulas", []):
+                name = formula_meta["method_name"]
+                if name in self.formulas:
+                    continue
+                self.formulas[name] = (sheet, formula_meta)
+                key = unit_key(sheet, formula_meta)
+                if self.units.get(name, {}).get("key") != key:
+                    # New formula (or the workbook changed it): start from scratch
+                    self.units[name] = {"sheet": sheet, "column": formula_meta["column"], "key": key,
+                                        "status": "pending", "origin": None, "source": None,
+                                        "imports": [], "attempts": 0, "error": None}
+        for name in set(self.units) - set(self.formulas):
+            del self.units[name]
+
+    def to_state(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(unit) for name, unit in self.units.items()}
+
+    # --- Sources ---
+    def seed(self, header_index: HeaderIndex, cache: Optional[UnitCache] = None):
+        """Fills units that have no source yet: validated cache entry first, then the transpiler."""
+        empty = [name for name, unit in self.units.items() if unit["source"] is None]
+        for name in list(empty):
+            entry = cache.get(self.units[name]["key"]) if cache else None
+            if entry:
+                self.units[name].update(source=entry["source"], imports=entry["imports"], origin="cache")
+                empty.remove(name)
+        if not empty:
+            return
+        # Units that already went through the LLM are not handed back to the transpiler
+        skip = {name for name, unit in self.units.items() if unit["origin"] == "llm" or name not in empty}
+        transpiled, _ = transpile_model_methods(self.metadata, header_index, skip=skip)
+        for name, source in transpiled.items():
+            self.units[name].update(source=source, imports=[], origin="transpiler")
+
+    def unsourced(self) -> List[str]:
+        """Methods nothing has been generated for yet (neither cache, transpiler nor LLM)."""
+        return [name for name, unit in self.units.items() if unit["source"] is None]
+
+    def needs_llm(self) -> List[str]:
+        return [name for name, unit in self.units.items() if unit["source"] is None or unit["status"] == "failed"]
+
+    def prompt_context(self, names: List[str], header_index: Optional[HeaderIndex] = None) -> str:
+        """
+        Only what the listed methods need, compactly encoded (see prompt_encoder): their
+        formulas, the inputs they read, and for failed units the last attempt and its error.
+        """
+        text = encode_metadata(self.metadata, only=names, header_index=header_index)
+        attempts = [
+            f"--- {name}: {_error_text(self.units[name]['error'])}\n{self.units[name]['source'] or '(no source)'}"
+            for name in names if self.units[name]["status"] == "failed"
+        ]
+        if attempts:
+            text += "\nPREVIOUS ATTEMPTS AND THEIR VALIDATION ERRORS:\n" + "\n".join(attempts)
+        return text
+
+    def accept(self, content: str, names: List[str]) -> List[str]:
+        """
+        Takes the listed methods out of an LLM answer (inside `class ExcelModel` or top
+        level) and stores them as new, not yet validated sources. Returns the names the
+        answer did not contain; those keep their failed state with a note.
+        """
+        code = _response_code(content)
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            for name in names:
+                self._reject(name, f"The answer did not parse: {e}")
+            return list(names)
+
+        lines = code.splitlines(keepends=True)
+        imports = [ast.get_source_segment(code, node) for node in tree.body
+                   if isinstance(node, (ast.Import, ast.ImportFrom))]
+        found = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) and node.name in names and node.name not in found:
+                start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                found[node.name] = textwrap.indent(textwrap.dedent("".join(lines[start - 1:node.end_lineno])), "    ")
+
+        missing = []
+        for name in names:
+            if name not in found:
+                self._reject(name, "The previous answer did not contain this method.")
+                missing.append(name)
+                continue
+            unit = self.units[name]
+            unit.update(source=found[name].rstrip("\n") + "\n", imports=imports, origin="llm", status="pending",
+                        error=None, attempts=unit["attempts"] + 1)
+        return missing
+
+    def _reject(self, name: str, error: str):
+        unit = self.units[name]
+        unit.update(status="failed", error=error, attempts=unit["attempts"] + 1)
+
+    # --- Validation ---
+    def record(self, results: Dict[str, Optional[str]], cache: Optional[UnitCache] = None,
+               plan: Optional[ExecutionPlan] = None):
+        """
+        {method name: None (passed), error text or a validation_history failure record}
+        from the validator. With `plan`, a
+        method downstream of a failed one gets no verdict (its inputs were wrong, so its
+        own mismatch proves nothing) and keeps its source for the next round.
+        """
+        failed, blocked = set(), set()
+        if plan is not None:
+            by_node = {step.node: step.method_name for step in plan.order}
+            for step in plan.order:
+                if {by_node[d] for d in step.depends_on} & failed:
+                    blocked.add(step.method_name)
+                    failed.add(step.method_name)
+                elif results.get(step.method_name) is not None:
+                    failed.add(step.method_name)
+        for name, error in results.items():
+            unit = self.units.get(name)
+            if unit is None or name in blocked:
+                continue
+            if error is None:
+                unit.update(status="passed", error=None)
+                if cache and unit["origin"] == "llm":
+                    cache.put(unit["key"], unit["source"], unit["imports"])
+            else:
+                unit.update(status="failed", error=error)
+                if cache and unit["origin"] == "cache":
+                    cache.discard(unit["key"])
+
+    def summary(self) -> str:
+        counts: Dict[str, int] = {}
+        for unit in self.units.values():
+            label = f"{unit['status']} ({unit['origin'] or 'no source'})"
+            counts[label] = counts.get(label, 0) + 1
+        return ", ".join(f"{n} {label}" for label, n in sorted(counts.items()))
+
+    # --- Assembly ---
+    def assemble(self, plan: ExecutionPlan) -> str:
+        """
+        The ExcelModel script: scaffold + every unit's method + the plan-driven transform.
+        Methods without a source are left out, together with the plan steps that read
+        their columns; the validator reports them as missing.
+        """
+        methods = {name: unit["source"] for name, unit in self.units.items() if unit["source"] is not None}
+        plan = plan.without(self.unsourced())
+        code = MODEL_SCAFFOLD
+        for statement in dict.fromkeys(s for unit in self.units.values() for s in unit["imports"]):
+            code = ensure_import(code, statement)
+        return install_transform(install_methods(code, methods, "ExcelModel"), plan)
+
+
+def run_steps(model: Any, plan: ExecutionPlan,
+              all_sheets_dict: Dict[str, pd.DataFrame]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    Executes the plan one method at a time, like the generated `transform`, but a
+    method that raises is reported under its own name and leaves a NaN column, so
+    one broken formula does not hide the state of all the others.
+    """
+    sheets = {name: df.copy() for name, df in all_sheets_dict.items()}
+    for sheet, n_rows in plan.derived_sheets.items():
+        if sheet not in sheets:
+            sheets[sheet] = pd.DataFrame(index=pd.RangeIndex(n_rows))
+    errors = {}
+    for step in plan.order:
+        try:
+            sheets[step.sheet][step.column] = getattr(model, step.method_name)(sheets)
+        except Exception as e:
+            errors[step.method_name] = f"{type(e).__name__}: {e}"
+            sheets[step.sheet][step.column] = np.nan
+    return sheets, errors
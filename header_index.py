@@ -0,0 +1,112 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Union
+
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+from workbook_scanner import WorkbookScanner
+
+
+# --- SHARED HEADER INDEX ---
+# One row-1 read per sheet, shared by every consumer of the workbook (both miners,
+# the dependency resolver, the metadata cache). Replaces the two separate
+# implementations (`_get_header_map` and the `ws.cell(row=1, column=c)` loop).
+
+def sanitize_identifier(header: Any) -> str:
+    """DataFrame column name used by the generated code: non [A-Za-z0-9_] -> '_'."""
+    return re.sub(r'[^a-zA-Z0-9_]', '_', str(header))
+
+
+class SheetHeaders:
+    """
+    O(1) lookups in every direction for one sheet:
+    letter -> header, index -> header, header -> letter, plus cached identifier forms.
+    Plain dicts only, so instances pickle cheaply into worker processes.
+    """
+
+    def __init__(self, sheet_name: str, headers: Dict[int, Any], max_column: int = 0):
+        self.sheet_name = sheet_name
+        # Non-empty header cells only, like get_all_sheet_headers always returned
+        self.by_index: Dict[int, Any] = dict(sorted(headers.items()))
+        self.max_column = max(max_column, max(self.by_index, default=0))
+        self.by_letter: Dict[str, Any] = {get_column_letter(i): h for i, h in self.by_index.items()}
+        self._letter_of: Dict[Any, str] = {}
+        for letter, header in self.by_letter.items():
+            # Duplicate headers resolve to their first (left-most) column
+            self._letter_of.setdefault(header, letter)
+        self._identifiers: Dict[int, str] = {}
+        self._method_names: Dict[Any, str] = {}
+
+    def header(self, key: Union[int, str]) -> Optional[Any]:
+        """Header of a column given as 1-based index or letter."""
+        return self.by_index.get(key) if isinstance(key, int) else self.by_letter.get(key)
+
+    def letter(self, header: Any) -> Optional[str]:
+        return self._letter_of.get(header)
+
+    def index(self, header: Any) -> Optional[int]:
+        letter = self._letter_of.get(header)
+        return column_index_from_string(letter) if letter else None
+
+    def identifier(self, col_idx: int) -> str:
+        """Sanitized column name; falsy headers (empty, 0) become Col_<n> like the miner always did."""
+        if col_idx not in self._identifiers:
+            self._identifiers[col_idx] = sanitize_identifier(self.by_index.get(col_idx) or f"Col_{col_idx}")
+        return self._identifiers[col_idx]
+
+    def method_name(self, header: Any) -> str:
+        """Name of the generated `calculate_*` method for a formula column."""
+        if header not in self._method_names:
+            self._method_names[header] = f"calculate_{str(header).lower().replace(' ', '_')}"
+        return self._method_names[header]
+
+    def column_map(self) -> Dict[str, str]:
+        """letter -> sanitized identifier for every column up to the sheet's right edge."""
+        return {get_column_letter(i): self.identifier(i) for i in range(1, self.max_column + 1)}
+
+    def __repr__(self):
+        return f"SheetHeaders({self.sheet_name!r}, {self.by_index!r})"
+
+
+class HeaderIndex:
+    def __init__(self, sheets: Dict[str, SheetHeaders]):
+        self.sheets = sheets
+
+    @classmethod
+    def from_scanner(cls, scanner: WorkbookScanner) -> "HeaderIndex":
+        sheets = {}
+        for sheet_name in scanner.sheetnames:
+            cells, max_column = scanner.read_header(sheet_name)
+            headers = {c.col: c.value for c in cells if c.value}
+            sheets[sheet_name] = SheetHeaders(sheet_name, headers, max_column)
+        return cls(sheets)
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self.sheets)
+
+    def __getitem__(self, sheet_name: str) -> SheetHeaders:
+        return self.sheets[sheet_name]
+
+    def __contains__(self, sheet_name: str) -> bool:
+        return sheet_name in self.sheets
+
+    def header(self, sheet_name: str, key: Union[int, str]) -> Optional[Any]:
+        sheet = self.sheets.get(sheet_name)
+        return sheet.header(key) if sheet else None
+
+    def as_dict(self) -> Dict[str, Dict[int, Any]]:
+        """{sheet: {col_idx: header}} - the shape get_all_sheet_headers has always returned."""
+        return {name: dict(sheet.by_index) for name, sheet in self.sheets.items()}
+
+
+@lru_cache(maxsize=32)
+def _load_header_index(file_path: str, mtime_ns: int, size: int) -> HeaderIndex:
+    return HeaderIndex.from_scanner(WorkbookScanner(file_path))
+
+
+def load_header_index(file_path: str) -> HeaderIndex:
+    """Header index of a workbook, built once per file version and shared in-process."""
+    stat = os.stat(file_path)
+    return _load_header_index(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,181 @@
+from typing import Dict, List, Any, Optional, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from dependency_graph import ExecutionPlan, PlanStep, compile_plan
+
+
+# --- INCREMENTAL RECALCULATION ---
+# Re-running ExcelModel.transform after one input changed recomputes (and copies)
+# the whole workbook. IncrementalTransform keeps the frames of the last run and,
+# given a changeset, recomputes only the formula columns downstream of the changed
+# inputs (from the mined `depends_on` graph). When a formula only reads its own
+# row, such as =C2*D2 or =VLOOKUP(B2, Products!$A$2:$C$5, 3, FALSE), only the
+# changed rows are recomputed.
+#
+#   inc = IncrementalTransform(ExcelModel(), metadata)
+#   sheets = inc.run(all_sheets_dict)
+#   all_sheets_dict["Tax"] = new_tax_df
+#   sheets = inc.update(all_sheets_dict, [Change("Tax", "Tax_Rate")])
+
+class Change(NamedTuple):
+    sheet: str
+    column: str
+    # None = every row (or rows were added/removed); otherwise a boolean mask or
+    # positional row numbers of the sheet's DataFrame
+    rows: Any = None
+
+    @property
+    def node(self) -> str:
+        return f"{self.sheet}.{self.column}"
+
+
+def _first_row(formula_meta: Dict[str, Any]) -> Optional[int]:
+    rows = formula_meta.get("rows")
+    return int(str(rows).partition(":")[0]) if rows else None
+
+
+def row_wise(sheet: str, formula_meta: Dict[str, Any]) -> bool:
+    """
+    True when each output row only reads the same row of its own sheet (plus fixed
+    cells/ranges of other sheets), so a subset of rows can be recomputed on its own.
+    """
+    first_row = _first_row(formula_meta)
+    if first_row is None or "regimes" in formula_meta or "references" not in formula_meta:
+        return False
+    for ref in formula_meta["references"]:
+        if ref["sheet"] != sheet:
+            # Other sheets must be read as fixed blocks, not row by row
+            if ref.get("row_offset") is not None:
+                return False
+        elif not ref["row_local"]:
+            return False
+    return True
+
+
+class IncrementalTransform:
+    """Keeps the last transform result and patches it for a changeset."""
+
+    def __init__(self, model: Any, metadata: Dict[str, Any], plan: Optional[ExecutionPlan] = None):
+        self.model = model
+        self.metadata = metadata
+        self.plan = plan or compile_plan(metadata)
+        # Full depends_on (raw inputs included) and row-wise flag per formula node
+        self._inputs: Dict[str, List[str]] = {}
+        self._row_wise: Dict[str, bool] = {}
+        for sheet, meta in metadata.items():
+            for formula_meta in meta.get("formulas", []):
+                node = f"{sheet}.{formula_meta['column']}"
+                if node not in self._inputs:
+                    self._inputs[node] = list(formula_meta.get("depends_on", []))
+                    self._row_wise[node] = row_wise(sheet, formula_meta)
+        self.sheets: Optional[Dict[str, pd.DataFrame]] = None
+        self.last_recomputed: Dict[str, Optional[int]] = {}   # node -> rows recomputed (None = all)
+
+    def run(self, all_sheets_dict: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Full transform; its result becomes the base of later updates."""
+        self.sheets = self.model.transform(all_sheets_dict)
+        self.last_recomputed = {step.node: None for step in self.plan.order}
+        return self.sheets
+
+    def affected(self, changes: List[Change]) -> Dict[str, Optional[np.ndarray]]:
+        """
+        {formula node: boolean row mask, or None for every row} in plan order.
+        Row masks only survive through row-wise formulas of the same sheet.
+        """
+        changed: Dict[str, Optional[np.ndarray]] = {}
+        for change in changes:
+            mask = self._mask(change)
+            if change.node in changed:
+                previous = changed[change.node]
+                mask = None if previous is None or mask is None else previous | mask
+            changed[change.node] = mask
+
+        affected: Dict[str, Optional[np.ndarray]] = {}
+        for step in self.plan.order:
+            hits = [d for d in self._inputs.get(step.node, []) if d in changed]
+            if not hits:
+                continue
+            mask = None
+            if self._row_wise[step.node] and all(
+                    d.startswith(f"{step.sheet}.") and changed[d] is not None for d in hits):
+                mask = np.logical_or.reduce([changed[d] for d in hits])
+            affected[step.node] = mask
+            changed[step.node] = mask
+        return affected
+
+    def update(self, all_sheets_dict: Dict[str, pd.DataFrame], changes: List[Change]) -> Dict[str, pd.DataFrame]:
+        """
+        Applies the changed input columns (values taken from `all_sheets_dict`) to the
+        last result and recomputes the affected formula columns. The returned frames are
+        the working copies of this object: copy them before editing.
+        """
+        if self.sheets is None:
+            return self.run(all_sheets_dict)
+
+        sheets = self.sheets
+        applied, reshaped = [], set()
+        for change in changes:
+            new = all_sheets_dict[change.sheet]
+            old = sheets.get(change.sheet)
+            if change.sheet in reshaped:
+                continue
+            if old is None or not old.index.equals(new.index):
+                # Rows added/removed: take the new frame; every formula column it holds
+                # is recomputed in full
+                sheets[change.sheet] = new.copy()
+                reshaped.add(change.sheet)
+                applied += [Change(change.sheet, c) for c in new.columns]
+                applied += [Change(change.sheet, f["column"])
+                            for f in self.metadata.get(change.sheet, {}).get("formulas", [])]
+                continue
+            mask = self._mask(change)
+            if mask is None:
+                sheets[change.sheet][change.column] = new[change.column]
+            else:
+                sheets[change.sheet].loc[mask, change.column] = new.loc[mask, change.column]
+            applied.append(change._replace(rows=mask))
+
+        affected = self.affected(applied)
+        for sheet in reshaped:
+            for f in self.metadata.get(sheet, {}).get("formulas", []):
+                affected.setdefault(f"{sheet}.{f['column']}", None)
+
+        self.last_recomputed = {}
+        for step in self.plan.order:
+            if step.node not in affected:
+                continue
+            mask = affected[step.node]
+            self._recompute(step, mask)
+            self.last_recomputed[step.node] = None if mask is None else int(mask.sum())
+        return sheets
+
+    def _recompute(self, step: PlanStep, mask: Optional[np.ndarray]):
+        sheets = self.sheets
+        method = getattr(self.model, step.method_name)
+        if mask is None:
+            sheets[step.sheet][step.column] = method(sheets)
+            return
+        if not mask.any():
+            return
+        frame = sheets[step.sheet]
+        # Row-wise formula: run it on the changed rows only (index labels are kept)
+        subset = dict(sheets)
+        subset[step.sheet] = frame[mask]
+        values = method(subset)
+        frame.loc[mask, step.column] = values if np.ndim(values) == 0 else np.asarray(
+            values.reindex(frame.index[mask]) if isinstance(values, pd.Series) else values)
+
+    def _mask(self, change: Change) -> Optional[np.ndarray]:
+        if change.rows is None:
+            return None
+        frame = (self.sheets or {}).get(change.sheet)
+        if frame is None:
+            return None
+        rows = np.asarray(change.rows)
+        if rows.dtype == bool:
+            return rows if len(rows) == len(frame) else None
+        mask = np.zeros(len(frame), dtype=bool)
+        mask[rows.astype(np.int64)] = True
+        return mask
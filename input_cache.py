@@ -0,0 +1,155 @@
+import os
+import json
+import shutil
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from metadata_cache import MetadataCache
+
+
+# --- COLUMNAR INPUT CACHE ---
+# The validator used to re-parse the test workbook with pd.read_excel on every
+# iteration. The first load now converts each sheet into one .npy file per column
+# (numbers and dates as-is, everything else as int32 codes + an array of distinct
+# values). Later loads memory-map the files: numeric columns are used in place
+# (copy-on-write pages, so frames stay writable and the cache is never modified).
+#
+#   .input_cache/sources.json          -> {absolute xlsx path: {key, size, mtime}}
+#   .input_cache/<key>/manifest.json   -> sheets, columns, dtypes, row counts
+#   .input_cache/<key>/<sheet>/<n>.npy -> column n
+#
+# The key is the content hash of the workbook (like MetadataCache.workbook_key), so
+# an edited workbook can never be served from a stale cache. A changed file is
+# reported and its old entry removed.
+
+VERSION = "1"
+NUMERIC_KINDS = "biufmM"
+
+
+class InputCache:
+    def __init__(self, cache_dir: str = ".input_cache"):
+        self.cache_dir = cache_dir
+        self.last_status: Optional[str] = None   # "hit" | "built" | "rebuilt (workbook changed)"
+
+    # --- Keys ---
+    def _sources(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.cache_dir, "sources.json"), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _store_sources(self, sources: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, "sources.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(sources, fh, indent=1)
+        os.replace(tmp_path, path)
+
+    def key(self, file_path: str) -> str:
+        """Content key of the workbook; an unchanged size + mtime skips re-hashing the file."""
+        stat = os.stat(file_path)
+        known = self._sources().get(os.path.abspath(file_path))
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime_ns:
+            return known["key"]
+        return MetadataCache.workbook_key(file_path, "inputs", VERSION)
+
+    # --- Public API ---
+    def load(self, file_path: str) -> Dict[str, pd.DataFrame]:
+        """All sheets of `file_path` as pd.read_excel(sheet_name=None) would return them."""
+        source = os.path.abspath(file_path)
+        sources = self._sources()
+        key = self.key(file_path)
+        entry_dir = os.path.join(self.cache_dir, key)
+
+        sheets = self._read(entry_dir)
+        if sheets is not None:
+            self.last_status = "hit"
+        else:
+            previous = sources.get(source, {}).get("key")
+            self.last_status = "built" if previous in (None, key) else "rebuilt (workbook changed)"
+            # Identical workbooks under other paths share the entry; only drop it when unused
+            if previous not in (None, key) and not any(
+                    other != source and known["key"] == previous for other, known in sources.items()):
+                shutil.rmtree(os.path.join(self.cache_dir, previous), ignore_errors=True)
+            frames = pd.read_excel(file_path, sheet_name=None)
+            self._write(entry_dir, frames)
+            sheets = self._read(entry_dir)
+
+        stat = os.stat(file_path)
+        sources[source] = {"key": key, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        self._store_sources(sources)
+        return sheets
+
+    def invalidate(self, file_path: str):
+        """Drops the cached copy of one workbook (the next load re-parses the xlsx)."""
+        sources = self._sources()
+        known = sources.pop(os.path.abspath(file_path), None)
+        if known:
+            shutil.rmtree(os.path.join(self.cache_dir, known["key"]), ignore_errors=True)
+            self._store_sources(sources)
+
+    # --- Storage ---
+    @staticmethod
+    def _write(entry_dir: str, frames: Dict[Any, pd.DataFrame]):
+        tmp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        manifest: List[Dict[str, Any]] = []
+        for sheet_no, (sheet, frame) in enumerate(frames.items()):
+            sheet_dir = os.path.join(tmp_dir, str(sheet_no))
+            os.makedirs(sheet_dir)
+            # Names may be non-strings (numeric headers); keep them exactly
+            np.save(os.path.join(sheet_dir, "names.npy"), np.array(list(frame.columns) + [None], dtype=object)[:-1],
+                    allow_pickle=True)
+            columns = []
+            for n in range(frame.shape[1]):
+                series = frame.iloc[:, n]
+                if series.dtype.kind in NUMERIC_KINDS and isinstance(series.dtype, np.dtype):
+                    np.save(os.path.join(sheet_dir, f"{n}.npy"), series.to_numpy())
+                    columns.append({"kind": "array", "dtype": str(series.dtype)})
+                else:
+                    codes, uniques = pd.factorize(series.to_numpy(dtype=object))
+                    np.save(os.path.join(sheet_dir, f"{n}.npy"), codes.astype(np.int32))
+                    np.save(os.path.join(sheet_dir, f"{n}.values.npy"), np.asarray(uniques, dtype=object),
+                            allow_pickle=True)
+                    columns.append({"kind": "codes", "dtype": str(series.dtype)})
+            manifest.append({"sheet": sheet, "dir": str(sheet_no), "rows": len(frame), "columns": columns,
+                             "names_dtype": str(frame.columns.dtype)})
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=1, default=str)
+        # Atomic rename: a half-written entry is never picked up (another thread may
+        # have finished the same entry first, which is just as good)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _read(entry_dir: str) -> Optional[Dict[str, pd.DataFrame]]:
+        try:
+            with open(os.path.join(entry_dir, "manifest.json"), encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+        sheets = {}
+        for sheet in manifest:
+            sheet_dir = os.path.join(entry_dir, sheet["dir"])
+            names = np.load(os.path.join(sheet_dir, "names.npy"), allow_pickle=True)
+            data = {}
+            for n, column in enumerate(sheet["columns"]):
+                # mmap_mode="c": pages are shared with the file until something writes to them
+                values = np.load(os.path.join(sheet_dir, f"{n}.npy"), mmap_mode="c").view(np.ndarray)
+                if column["kind"] == "codes":
+                    uniques = np.load(os.path.join(sheet_dir, f"{n}.values.npy"), allow_pickle=True)
+                    decoded = np.append(uniques, np.nan).astype(object)[values]
+                    values = pd.array(decoded, dtype=column["dtype"]) if column["dtype"] != "object" else decoded
+                data[n] = values
+            frame = pd.DataFrame(data, index=pd.RangeIndex(sheet["rows"]), copy=False)
+            frame.columns = pd.Index(list(names), dtype=sheet["names_dtype"])
+            sheets[sheet["sheet"]] = frame
+        return sheets
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterator
+
+from langchain_core.messages import AIMessage
+
+
+# --- PERSISTENT LLM RESPONSE CACHE ---
+# Rerunning the same workbook used to send the same prompts again (temperature=0,
+# fixed seed) and pay full latency and cost every time. Responses are now stored in
+# SQLite under sha256(model parameters + prompt):
+#
+#   .llm_cache/responses.sqlite -> key, content, created, last_used, latency, size
+#
+# Entries older than `ttl_seconds` are never served and are purged on write; when
+# the stored text grows past `max_bytes` the least recently used entries go first.
+# The directory and database are only created by the first stored response, so
+# building a cache (at import time, in the agent) leaves no trace on disk.
+# CachedLLM wraps a chat model and keeps the invoke / ainvoke / bind surface the
+# graph nodes already use:
+#
+#   llm = CachedLLM(ChatOpenAI(model="gpt-4o", temperature=0), LLMCache())
+#   llm.invoke(prompt)                      # second run with the same prompt: no API call
+#   llm.bind(temperature=0.3, seed=1)       # bound parameters are part of the key
+#   llm.invoke(prompt, stop=["```"])        # ... and so are per-call arguments
+#   print(llm.cache.summary())              # "3 hits (saved 41.2s), 1 miss (9.8s live)"
+#
+# Token spend is metered per unit of work (e.g. one workbook of a batch) with a
+# context variable, so concurrent conversions in other threads are not mixed in:
+#
+#   with metered() as usage:
+#       agent.invoke(...)
+#   usage -> {"calls": 3, "cached_calls": 1, "input_tokens": 5120, "output_tokens": 1433}
+
+VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    latency REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+class LLMCache:
+    def __init__(self, cache_dir: str = ".llm_cache", ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, "responses.sqlite")
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0   # latency the hits would have cost (as measured when stored)
+        self.live_seconds = 0.0    # latency of the calls that went to the API
+        self._lock = threading.Lock()
+        self._ready = False        # directory + table exist
+
+    def _connect(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        """None while nothing was ever stored, unless `create` (writes) asks for the database."""
+        if not self._ready:
+            if not create and not os.path.exists(self.path):
+                return None
+            os.makedirs(self.cache_dir, exist_ok=True)
+        # One short-lived connection per operation: nodes may call from worker threads
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        if not self._ready:
+            with db:
+                db.execute(SCHEMA)
+            self._ready = True
+        return db
+
+    # --- Keys ---
+    @staticmethod
+    def key(params: Dict[str, Any], prompt: Any, kwargs: Optional[Dict[str, Any]] = None) -> str:
+        """`kwargs`: per-call arguments of invoke (stop, config, ...), they can change the answer too."""
+        request = {"params": params, "prompt": prompt}
+        if kwargs:
+            request["kwargs"] = kwargs
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(f"llm|{VERSION}|{payload}".encode()).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    # --- Storage ---
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        db = self._connect()
+        if db is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            with db:
+                row = db.execute("SELECT content, created, latency FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        finally:
+            db.close()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[2]
+        return row[0]
+
+    def put(self, key: str, content: str, latency: float):
+        now = time.time()
+        with self._lock:
+            self.live_seconds += latency
+        db = self._connect(create=True)
+        try:
+            with db:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, content, now, now, latency, len(content.encode("utf-8"))))
+                self._evict(db, now)
+        finally:
+            db.close()
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        if self.ttl_seconds is not None:
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first until the cache fits again
+        drop = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            drop.append((key,))
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", drop)
+
+    def clear(self):
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            with db:
+                db.execute("DELETE FROM responses")
+        finally:
+            db.close()
+
+    # --- Reporting ---
+    def stats(self) -> Dict[str, Any]:
+        entries, size = 0, 0
+        db = self._connect()
+        if db is not None:
+            try:
+                entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            finally:
+                db.close()
+        return {"hits": self.hits, "misses": self.misses, "saved_seconds": round(self.saved_seconds, 2),
+                "live_seconds": round(self.live_seconds, 2), "entries": entries, "bytes": size}
+
+    def summary(self) -> str:
+        return (f"{self.hits} hits (saved {self.saved_seconds:.1f}s), "
+                f"{self.misses} misses ({self.live_seconds:.1f}s live)")
+
+
+# --- Token metering ---
+_meter: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_token_meter", default=None)
+_meter_lock = threading.Lock()
+
+
+@contextmanager
+def metered() -> Iterator[Dict[str, int]]:
+    """Counts the LLM calls made in this context (threads started with a copy of it included)."""
+    usage = {"calls": 0, "cached_calls": 0, "input_tokens": 0, "output_tokens": 0}
+    token = _meter.set(usage)
+    try:
+        yield usage
+    finally:
+        _meter.reset(token)
+
+
+def _record(response: Any = None):
+    usage = _meter.get()
+    if usage is None:
+        return
+    tokens = getattr(response, "usage_metadata", None) or {}
+    with _meter_lock:
+        if response is None:
+            # Answered from the cache: no tokens spent
+            usage["cached_calls"] += 1
+            return
+        usage["calls"] += 1
+        usage["input_tokens"] += tokens.get("input_tokens", 0)
+        usage["output_tokens"] += tokens.get("output_tokens", 0)
+
+
+def model_params(llm: Any) -> Dict[str, Any]:
+    """Model name + sampling parameters of a LangChain chat model (what decides the answer)."""
+    params = getattr(llm, "_identifying_params", None)
+    return dict(params) if params else {"model": type(llm).__name__}
+
+
+class CachedLLM:
+    """Chat model wrapper: identical (parameters, prompt) pairs are answered from the LLMCache."""
+
+    def __init__(self, llm: Any, cache: LLMCache, params: Optional[Dict[str, Any]] = None):
+        self.llm = llm
+        self.cache = cache
+        self.params = params if params is not None else model_params(llm)
+
+    def bind(self, **kwargs) -> "CachedLLM":
+        return CachedLLM(self.llm.bind(**kwargs), self.cache, {**self.params, **kwargs})
+
+    def invoke(self, prompt: Any, **kwargs) -> Any:
+        key = self.cache.key(self.params, prompt, kwargs)
+        content = self.cache.get(key)
+        if content is not None:
+            _record()
+            return AIMessage(content=content)
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt, **kwargs)
+        self.cache.put(key, response.content, time.perf_counter() - start)
+        _record(response)
+        return response
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> Any:
+        key = self.cache.key(self.params, prompt, kwargs)
+        content = self.cache.get(key)
+        if content is not None:
+            _record()
+            return AIMessage(content=content)
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(prompt, **kwargs)
+        self.cache.put(key, response.content, time.perf_counter() - start)
+        _record(response)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else (model_name, with_structured_output, ...) is the wrapped model's
+        return getattr(self.llm, name)
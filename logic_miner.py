@@ -0,0 +1,120 @@
+import re
+from typing import Dict, List, Any, Optional
+
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+from formula_index import FormulaIndex
+from header_index import HeaderIndex, SheetHeaders, load_header_index
+from metadata_cache import MetadataCache
+from parallel_mining import mine_in_parallel
+from schema_engine import ColumnarSchema
+from workbook_scanner import WorkbookScanner
+
+
+# --- SINGLE-PASS LOGIC/SCHEMA MINER (used by ExelMINER_Agent.py) ---
+# Kept free of import-time side effects (no LLM client, no graph) so that
+# worker processes can import it cheaply when sheets are mined in parallel.
+
+class IndustryLogicMiner:
+    # Bump whenever the mined output changes shape, so cached metadata is not reused
+    VERSION = "6"
+
+    def __init__(self, file_path: str, cache: Optional[MetadataCache] = None, max_workers: Optional[int] = 1,
+                 sample_rate: float = 1.0):
+        self.file_path = file_path
+        self.cache = cache
+        # Fraction of data rows fed to the schema engine (1.0 = whole column)
+        self.sample_rate = sample_rate
+        # 1 = mine sheets in-process, N = process pool of N workers, None = one per CPU
+        self.max_workers = max_workers
+        # One streaming reader gives formulas AND cached values for every cell
+        self.scanner = WorkbookScanner(file_path)
+
+    def _map_formula(self, formula: str, header_map: Dict[str, str]) -> Dict[str, str]:
+        if not isinstance(formula, str): return {"raw": "", "semantic": ""}
+        row_match = re.search(r'\d+', formula)
+        row_num = row_match.group(0) if row_match else ""
+        raw_pattern = formula.replace(row_num, "{n}") if row_num else formula
+
+        def to_header(match):
+            col = match.group(1)
+            return f"df['{header_map.get(col, col)}']"
+
+        semantic_pattern = re.sub(r'\$?([A-Z]+)\$?\d+', to_header, formula)
+        return {"excel_pattern": raw_pattern, "python_semantic": semantic_pattern}
+
+    def _mine_sheet(self, sheet_name: str, headers: Optional[SheetHeaders] = None) -> Dict[str, Any]:
+        headers = headers or load_header_index(self.file_path)[sheet_name]
+        header_map = headers.column_map()
+        formula_index = FormulaIndex()
+        column_schema = ColumnarSchema(sample_rate=self.sample_rate)
+
+        # Single streaming pass over the data rows (headers come from the shared index):
+        # every formula -> R1C1 index, every (sampled) value -> columnar schema.
+        for row_num, cells in self.scanner.iter_rows(sheet_name, min_row=2):
+            # 1. LOGIC: formula text of the cells
+            for cell in cells:
+                if cell.formula:
+                    formula_index.add(row_num, cell.col, cell.formula)
+
+            # 2. SCHEMA: cached (calculated) values of the same cells
+            column_schema.add_row(row_num, cells)
+
+        column_names = {column_index_from_string(letter): name for letter, name in header_map.items()}
+        return {
+            "logic": self._build_rules(formula_index, header_map),
+            "schema": column_schema.summary(column_names),
+        }
+
+    def _build_rules(self, formula_index: FormulaIndex, header_map: Dict[str, str]) -> Dict[str, Any]:
+        # Each distinct R1C1 shape is mapped once per column, however many cells share it
+        # (relative shapes read other columns once filled right, so the column is in the key)
+        mapped_shapes: Dict[Any, Dict[str, str]] = {}
+
+        def mapped(regime):
+            key = (regime.r1c1, regime.column)
+            if key not in mapped_shapes:
+                mapped_shapes[key] = self._map_formula(regime.formula, header_map)
+            return mapped_shapes[key]
+
+        vector_rules = {}
+        # Columns in order of their first formula (row-major), like the original row scan
+        columns = sorted(formula_index.columns, key=lambda c: (formula_index.column_regimes(c)[0].first_row, c))
+        for col_idx in columns:
+            col_letter = get_column_letter(col_idx)
+            header_name = header_map.get(col_letter) or f"Col_{col_idx}"
+            if header_name in vector_rules:
+                continue
+
+            regimes = formula_index.column_regimes(col_idx)
+            vector_rules[header_name] = {
+                "excel_col": col_letter,
+                **mapped(regimes[0]),
+                # Exact text and row span, for the deterministic transpiler
+                "formula": regimes[0].formula,
+                "rows": f"{regimes[0].first_row}:{regimes[-1].last_row}",
+            }
+            # The column's logic changes part-way down: report every row range
+            if len(regimes) > 1:
+                vector_rules[header_name]["regimes"] = [
+                    {"rows": f"{r.first_row}:{r.last_row}", **mapped(r), "formula": r.formula} for r in regimes
+                ]
+        return vector_rules
+
+    def _mine_sheets(self, sheet_names: List[str]) -> Dict[str, Any]:
+        # Headers are read once for the workbook and shipped to the workers
+        return mine_in_parallel(_mine_sheet_task, self.file_path, sheet_names, max_workers=self.max_workers,
+                                sample_rate=self.sample_rate, header_index=load_header_index(self.file_path))
+
+    def extract_full_context(self) -> Dict[str, Any]:
+        if self.cache is None:
+            return self._mine_sheets(self.scanner.sheetnames)
+        # Only sheets whose content changed since the last run are mined again
+        return self.cache.get_or_mine(self.file_path, f"logic_schema@{self.sample_rate}", self.VERSION, self._mine_sheets)
+
+
+def _mine_sheet_task(file_path: str, sheet_name: str, sample_rate: float = 1.0,
+                     header_index: Optional[HeaderIndex] = None) -> Dict[str, Any]:
+    """Process-pool entry point: each worker opens its own scanner on the same file."""
+    headers = header_index[sheet_name] if header_index else None
+    return IndustryLogicMiner(file_path, sample_rate=sample_rate)._mine_sheet(sheet_name, headers)
@@ -0,0 +1,97 @@
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# --- FIRST-MATCH LOOKUP RUNTIME ---
+# Imported by the generated ExcelModel / ExcelCalculator code for VLOOKUP and
+# INDEX/MATCH columns instead of chaining DataFrame.merge calls. The key column of
+# a lookup table is hashed once (first occurrence wins, like Excel), and values
+# are fetched with positional `take` gathers. The looked-up frame is never copied
+# or widened, and duplicate keys in the table can never add rows.
+#
+#   products = LookupIndex(products_df['ProductID'])
+#   base_price = products.match(sales_df['ProductID']).take(products_df['BasePrice'])
+
+NUMERIC_KINDS = "fiub"
+
+
+def normalize_keys(values: Any) -> Any:
+    """Lookup keys as Excel compares them: numbers as float, text case-insensitive."""
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy()
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in NUMERIC_KINDS:
+            return values.astype(np.float64)
+        # Normalize each distinct value once (factorize runs in C), then gather
+        codes, uniques = pd.factorize(values)
+        normalized = np.array([normalize_keys(u) for u in uniques] + [np.nan], dtype=object)
+        return normalized[codes]
+    if isinstance(values, str):
+        return values.lower()
+    if isinstance(values, (int, float, np.number)) and not isinstance(values, (bool, np.bool_)):
+        return float(values)
+    return values
+
+
+class Matches:
+    """Row positions of some lookup keys in one table (-1 = not found, Excel's #N/A)."""
+
+    def __init__(self, positions: Any, index: Optional[pd.Index] = None):
+        self.positions = positions   # int array for a column of keys, int for a single key
+        self.index = index           # index of the looked-up keys (None for a single key)
+
+    @property
+    def found(self) -> Any:
+        return self.positions >= 0
+
+    def take(self, values: Any) -> Any:
+        """Gathers `values` (a column of the lookup table) at the matched rows; misses are NaN."""
+        values = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+        if self.index is None:
+            return values[self.positions] if self.positions >= 0 else np.nan
+        if values.dtype.kind in "iub":
+            values = values.astype(np.float64)
+        elif values.dtype.kind != "f":
+            values = values.astype(object)
+        out = values.take(np.maximum(self.positions, 0)) if len(values) else (
+            np.full(len(self.positions), np.nan, dtype=values.dtype))
+        out[self.positions < 0] = np.nan
+        return pd.Series(out, index=self.index)
+
+
+class LookupIndex:
+    """Hash index over the key column of a lookup table, built once and reused per lookup."""
+
+    def __init__(self, keys: Any):
+        normalized = pd.Index(normalize_keys(np.asarray(keys.to_numpy() if hasattr(keys, "to_numpy") else keys)))
+        # First occurrence wins; blank keys never match anything
+        first = ~normalized.duplicated() & ~normalized.isna()
+        self._keys = normalized[first]
+        self._rows = np.flatnonzero(first)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def match(self, keys: Any) -> Matches:
+        """Positions of `keys` (a Series/array of lookup values, or one value) in the table."""
+        if np.ndim(keys) == 0:
+            key = normalize_keys(keys)
+            try:
+                loc = self._keys.get_loc(key)
+            except (KeyError, TypeError):
+                return Matches(-1)
+            return Matches(int(self._rows[loc]))
+        index = keys.index if isinstance(keys, pd.Series) else pd.RangeIndex(len(keys))
+        found = self._keys.get_indexer(normalize_keys(np.asarray(keys)))
+        positions = np.where(found >= 0, self._rows[np.maximum(found, 0)] if len(self._rows) else -1, -1)
+        return Matches(positions, index)
+
+    def lookup(self, keys: Any, values: Any) -> Any:
+        return self.match(keys).take(values)
+
+
+def vlookup(keys: Any, table: pd.DataFrame, key_column: Any, value_column: Any) -> Any:
+    """Exact-match VLOOKUP of `keys` against `table[key_column]`, returning `table[value_column]`."""
+    return LookupIndex(table[key_column]).lookup(keys, table[value_column])
@@ -0,0 +1,123 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import zipfile
+from typing import Dict, List, Any, Optional, Callable
+
+from header_index import load_header_index
+from workbook_scanner import WorkbookScanner
+
+
+# --- CONTENT-ADDRESSED METADATA CACHE ---
+# Mined metadata is stored on disk under two kinds of keys:
+#   workbooks/<hash>.json -> manifest: ordered sheet names + the sheet key of each
+#   sheets/<hash>.json    -> the mined dict of ONE sheet
+# The workbook key is a hash of the file bytes, so an unchanged file is a single
+# lookup. When the file changed, every sheet gets its own content key and only
+# sheets whose XML (or referenced strings) changed are mined again.
+
+SHARED_STRING_REF = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+
+class MetadataCache:
+    def __init__(self, cache_dir: str = ".miner_cache"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    # --- Keys ---
+    @staticmethod
+    def workbook_key(file_path: str, kind: str, version: str) -> str:
+        digest = hashlib.sha256(f"{kind}|{version}|".encode())
+        with open(file_path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def sheet_keys(scanner: WorkbookScanner, kind: str, version: str, cross_sheet: bool = False) -> Dict[str, str]:
+        """
+        One key per sheet from its raw XML plus the shared strings it actually uses,
+        so appending strings for another sheet does not invalidate this one.
+        `cross_sheet=True` also folds every sheet's header row in, for miners whose
+        output depends on other sheets (e.g. dependency names resolved via headers).
+        """
+        context = repr(load_header_index(scanner.file_path).as_dict()).encode() if cross_sheet else b""
+
+        strings = scanner.shared_strings
+        date_styles = repr(sorted(scanner.date_styles)).encode()
+        keys = {}
+        with zipfile.ZipFile(scanner.file_path) as zf:
+            for sheet_name in scanner.sheetnames:
+                xml = zf.read(scanner.sheet_path(sheet_name))
+                digest = hashlib.sha256(f"{kind}|{version}|{sheet_name}|".encode())
+                digest.update(xml)
+                for idx in sorted({int(i) for i in SHARED_STRING_REF.findall(xml)}):
+                    digest.update(f"\x00{idx}\x00{strings[idx]}".encode())
+                digest.update(date_styles)
+                digest.update(context)
+                keys[sheet_name] = digest.hexdigest()
+        return keys
+
+    # --- Storage ---
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.cache_dir, bucket, f"{key}.json")
+
+    def _load(self, bucket: str, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(bucket, key), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, bucket: str, key: str, value: Any):
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(value, fh, default=str)
+        # Atomic rename: concurrent runs never see a half-written entry
+        os.replace(tmp_path, path)
+
+    # --- Public API ---
+    def get_or_mine(self, file_path: str, kind: str, version: str,
+                    mine_sheets: Callable[[List[str]], Dict[str, Any]],
+                    cross_sheet: bool = False) -> Dict[str, Any]:
+        """
+        Returns the metadata dict for `file_path`, calling `mine_sheets(names)` only
+        for the sheets that are not cached. `kind` separates metadata shapes
+        ("logic/schema" vs "formulas/raw_inputs"); `version` is the miner version.
+        """
+        wb_key = self.workbook_key(file_path, kind, version)
+        manifest = self._load("workbooks", wb_key)
+        if manifest is not None:
+            cached = {name: self._load("sheets", key) for name, key in manifest}
+            if all(v is not None for v in cached.values()):
+                self.hits += len(cached)
+                return cached
+
+        keys = self.sheet_keys(WorkbookScanner(file_path), kind, version, cross_sheet=cross_sheet)
+        metadata = {name: self._load("sheets", key) for name, key in keys.items()}
+        stale = [name for name, value in metadata.items() if value is None]
+        self.hits += len(metadata) - len(stale)
+        self.misses += len(stale)
+
+        if stale:
+            mined = mine_sheets(stale)
+            for name in stale:
+                # Round-trip through JSON so a fresh result looks exactly like a cached one
+                metadata[name] = json.loads(json.dumps(mined[name], default=str))
+                self._store("sheets", keys[name], metadata[name])
+
+        self._store("workbooks", wb_key, list(keys.items()))
+        return metadata
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,142 @@
+from typing import Dict, List, Any, Optional, Tuple
+
+from openpyxl.utils import get_column_letter
+
+from dependency_extractor import Reference, extract_references, references_to_metadata
+from formula_index import FormulaIndex
+from header_index import HeaderIndex, SheetHeaders, load_header_index
+from metadata_cache import MetadataCache
+from parallel_mining import mine_in_parallel
+from schema_engine import ColumnarSchema
+from workbook_scanner import WorkbookScanner
+
+
+# --- FORMULA / RAW-INPUT METADATA EXTRACTOR (used by Excel_miner_5_0.ipynb) ---
+# Lives in a module (not a notebook cell) so sheets can be handed to worker processes.
+
+# Bump whenever the extracted metadata changes shape, so cached entries are not reused
+EXTRACTOR_VERSION = "6"
+
+
+def get_dependencies_from_tokens(formula, current_sheet, all_headers_map, row=2, col=1):
+    """
+    Header-level dependencies ("Sheet.Header") of a formula entered at (row, col).
+    Backed by the precompiled, memoized extractor in dependency_extractor.py.
+    `all_headers_map` is a HeaderIndex or the legacy {sheet: {col_idx: header}} dict.
+    """
+    if not isinstance(all_headers_map, HeaderIndex):
+        all_headers_map = HeaderIndex({s: SheetHeaders(s, h) for s, h in all_headers_map.items()})
+    dependencies = set()
+    for ref in extract_references(formula, current_sheet, row, col):
+        header = all_headers_map.header(ref.sheet, ref.column)
+        if header:
+            dependencies.add(f"{ref.sheet}.{header}")
+
+    # Sorted so the output does not depend on the process' string hash seed
+    return sorted(dependencies)
+
+def get_all_sheet_headers(file_path):
+    """{sheet: {col_idx: header}} from the shared header index (one row-1 read per sheet)."""
+    return load_header_index(file_path).as_dict()
+
+def extract_sheet_metadata(scanner: WorkbookScanner, sheet_name: str, header_index: HeaderIndex,
+                           sample_rate: float = 1.0) -> Dict[str, Any]:
+    # One pass over the sheet: cached values feed the columnar schema (dtype of the WHOLE
+    # column, not of row 2), every formula cell goes into the R1C1 index so regime
+    # changes further down are seen.
+    column_schema = ColumnarSchema(sample_rate=sample_rate)
+    formula_index = FormulaIndex()
+    for row_num, cells in scanner.iter_rows(sheet_name, min_row=2):
+        for cell in cells:
+            if cell.formula:
+                formula_index.add(row_num, cell.col, cell.formula)
+        column_schema.add_row(row_num, cells)
+
+    # References are extracted once per distinct formula shape, not once per cell.
+    # R1C1 is relative, so the same shape in another column reads other columns:
+    # the column is part of the key.
+    shape_refs: Dict[Tuple[str, int], List[Reference]] = {}
+
+    sheet_formulas = []
+
+    # Track formula headers to filter them out of raw inputs later
+    formula_header_names = []
+
+    headers = header_index[sheet_name]
+    for col_idx, header in headers.by_index.items():
+        regimes = formula_index.column_regimes(col_idx)
+
+        if regimes:
+            formula = regimes[0].formula
+            formula_header_names.append(header)
+
+            references = []
+            for regime in regimes:
+                key = (regime.r1c1, col_idx)
+                if key not in shape_refs:
+                    shape_refs[key] = extract_references(regime.formula, sheet_name, regime.first_row, col_idx)
+                references.extend(r for r in shape_refs[key] if r not in references)
+
+            deps = set()
+            for ref in references:
+                dep_header = header_index.header(ref.sheet, ref.column)
+                if dep_header:
+                    deps.add(f"{ref.sheet}.{dep_header}")
+            deps = sorted(d for d in deps if d != f"{sheet_name}.{header}")
+
+            formula_meta = {
+                "column": header,
+                "excel_col": get_column_letter(col_idx),
+                "formula": formula,
+                "rows": f"{regimes[0].first_row}:{regimes[-1].last_row}",
+                "dtype": column_schema.column(col_idx)["dtype"],
+                "depends_on": deps,
+                "references": references_to_metadata(references, header_index),
+                "method_name": headers.method_name(header)
+            }
+            # The column's logic changes part-way down: report every row range
+            if len(regimes) > 1:
+                formula_meta["regimes"] = [
+                    {"rows": f"{r.first_row}:{r.last_row}", "formula": r.formula} for r in regimes
+                ]
+            sheet_formulas.append(formula_meta)
+
+    # --- UPDATED RAW INPUTS LOGIC ---
+    raw_inputs_with_types = []
+    for col_idx, header in headers.by_index.items():
+        if header not in formula_header_names:
+            # Get type for raw data columns too
+            raw_inputs_with_types.append({
+                "column": header,
+                "dtype": column_schema.column(col_idx)["dtype"]
+            })
+
+    return {
+        "formulas": sheet_formulas,
+        "raw_inputs": raw_inputs_with_types
+    }
+
+def _extract_sheet_task(file_path: str, sheet_name: str, header_index: HeaderIndex,
+                        sample_rate: float = 1.0) -> Dict[str, Any]:
+    """Process-pool entry point: everything it needs arrives as picklable arguments."""
+    return extract_sheet_metadata(WorkbookScanner(file_path), sheet_name, header_index, sample_rate=sample_rate)
+
+def extract_metadata_final(file_path: str, cache: Optional[MetadataCache] = None, max_workers: int = 1,
+                           sample_rate: float = 1.0) -> Dict[str, Any]:
+    """
+    `max_workers` > 1 mines sheets in a process pool (None = one per CPU);
+    the result is identical to the serial path.
+    `sample_rate` < 1 infers dtypes from every k-th row only (for very large sheets).
+    """
+    def mine_sheets(sheet_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        # Headers are cross-sheet context, so they are read once here and shipped to the workers
+        header_index = load_header_index(file_path)
+        return mine_in_parallel(_extract_sheet_task, file_path, sheet_names or header_index.sheetnames,
+                                max_workers=max_workers, header_index=header_index, sample_rate=sample_rate)
+
+    if cache is None:
+        return mine_sheets()
+    # Dependencies are resolved through every sheet's headers -> cross_sheet keys.
+    # The workbook is only opened when at least one sheet is stale.
+    return cache.get_or_mine(file_path, f"formulas_raw_inputs@{sample_rate}", EXTRACTOR_VERSION, mine_sheets,
+                             cross_sheet=True)
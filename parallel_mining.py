@@ -0,0 +1,38 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+from workbook_scanner import WorkbookScanner
+
+
+# --- PARALLEL PER-SHEET MINING ---
+# Sheets share no state while being mined, so each one can run in its own process.
+# `task` must be a module-level function (picklable) called as
+# task(file_path, sheet_name, **task_kwargs) and returning that sheet's metadata.
+
+def _largest_first(file_path: str, sheet_names: List[str]) -> List[str]:
+    """Submit the biggest sheets first so one huge sheet does not start last and dominate wall time."""
+    scanner = WorkbookScanner(file_path)
+    with zipfile.ZipFile(file_path) as zf:
+        sizes = {name: zf.getinfo(scanner.sheet_path(name)).file_size for name in sheet_names}
+    return sorted(sheet_names, key=lambda name: -sizes[name])
+
+
+def mine_in_parallel(task: Callable[..., Dict[str, Any]], file_path: str, sheet_names: List[str],
+                     max_workers: Optional[int] = 1, **task_kwargs) -> Dict[str, Any]:
+    """
+    Runs `task` for every sheet and merges the results in `sheet_names` order, so the
+    output is identical to the serial loop. max_workers=1 stays in-process;
+    max_workers=None uses one worker per CPU.
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(sheet_names))
+    if workers <= 1:
+        return {name: task(file_path, name, **task_kwargs) for name in sheet_names}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(task, file_path, name, **task_kwargs)
+            for name in _largest_first(file_path, sheet_names)
+        }
+        return {name: futures[name].result() for name in sheet_names}
@@ -0,0 +1,220 @@
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable
+
+from openpyxl.utils import column_index_from_string
+
+from dependency_extractor import extract_references, references_to_metadata
+from formula_index import to_r1c1
+from header_index import HeaderIndex
+
+
+# --- COMPACT PROMPT ENCODING ---
+# The prompts used to embed `str(metadata)`: every formula went in twice
+# (excel_pattern + python_semantic in the agent, formula + depends_on +
+# references in the notebook) and every key name was repeated per column. The
+# encoder writes the same information as plain lines:
+#
+#   LEGEND: #1=Total_Operating_Expenses
+#   SHAPES (R1C1, shared by several columns): F1: =RC[-2]*RC[-1]
+#   Sheet Sales | inputs: TransactionID int, ProductID str, Quantity int 1..20
+#     Price_Adjusted [D, float, rows 2:6, calculate_price_adjusted] = VLOOKUP(B2, ...)
+#       refs: B=ProductID (row), Products!A2:A5=ProductID, ...
+#       (relative references show their row offset: B=Value (row-1) in =B2*C3 at row 3;
+#       whole columns are written G:G)
+#
+# - formulas with the same R1C1 shape (filled right/down) are written once
+# - header names used more than once and longer than their alias go through the legend
+# - `only` trims the output to the formulas one generation unit needs (plus the inputs they read)
+# Token counts come from tiktoken when its encoding is available locally, else a
+# characters/4 estimate (marked with "~").
+
+MIN_ALIAS_LENGTH = 8
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Not installed, unknown model, or the BPE file cannot be downloaded here
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    encoding = _encoding(model)
+    return len(encoding.encode(text)) if encoding else (len(text) + 3) // 4
+
+
+def token_report(before: str, after: str, model: str = "gpt-4o") -> str:
+    """'3,412 -> 1,020 tokens (-70%)' for two renderings of the same prompt section."""
+    n_before, n_after = count_tokens(before, model), count_tokens(after, model)
+    mark = "" if _encoding(model) else "~"
+    saved = 100 * (n_before - n_after) / n_before if n_before else 0.0
+    return f"{mark}{n_before:,} -> {mark}{n_after:,} tokens (-{saved:.0f}%)"
+
+
+def _schema_line(name: str, info: Dict[str, Any]) -> str:
+    text = f"{name} {info.get('dtype', info.get('type', '?'))}"
+    if info.get("type") == "numeric" and info.get("min") is not None:
+        text += f" {info['min']:g}..{info['max']:g}"
+    elif info.get("cardinality") is not None:
+        text += f" ({info['cardinality']} distinct)"
+    if info.get("null_rate"):
+        text += f" {info['null_rate']:.0%} blank"
+    return text
+
+
+class PromptEncoder:
+    """Renders agent metadata ({sheet: {logic, schema}}) or notebook metadata ({sheet: {formulas, raw_inputs}})."""
+
+    def __init__(self, header_index: Optional[HeaderIndex] = None):
+        # Only needed for agent metadata, whose formulas do not carry their own references
+        self.header_index = header_index
+
+    def encode(self, metadata: Dict[str, Any], only: Optional[Iterable[str]] = None) -> str:
+        """
+        `only` selects formulas by method name (notebook), "Sheet.Column" or column
+        name (agent); None encodes everything.
+        """
+        wanted = set(only) if only is not None else None
+        items = self._formulas(metadata, wanted)
+
+        # Shapes shared by several formulas are defined once
+        shape_count: Dict[str, int] = {}
+        for item in items:
+            if not item["letter"]:
+                continue
+            for regime in item["regimes"]:
+                shape_count[regime["shape"]] = shape_count.get(regime["shape"], 0) + 1
+        shape_ids = {shape: f"F{i}" for i, shape in enumerate((s for s, n in shape_count.items() if n > 1), 1)}
+        examples: Dict[str, str] = {}
+        for item in items:
+            for regime in item["regimes"] if item["letter"] else []:
+                if regime["shape"] in shape_ids and regime["shape"] not in examples:
+                    first_row = str(regime["rows"] or "2").partition(":")[0]
+                    examples[regime["shape"]] = f"{item['sheet']}!{item['letter']}{first_row}: {regime['formula']}"
+
+        # Headers repeated across the encoded formulas go through the legend
+        name_count: Dict[str, int] = {}
+        for item in items:
+            for ref in item["refs"]:
+                name_count[ref["column"]] = name_count.get(ref["column"], 0) + 1
+        aliases = {name: f"#{i}" for i, name in enumerate(
+            (n for n, count in name_count.items() if count > 1 and len(n) >= MIN_ALIAS_LENGTH), 1)}
+
+        lines = []
+        if aliases:
+            lines.append("LEGEND: " + "  ".join(f"{alias}={name}" for name, alias in aliases.items()))
+        if shape_ids:
+            lines.append("SHAPES (R1C1, shared by several columns; R = the row, C[-1] = one column left):")
+            lines += [f"  {fid}: {shape}   e.g. {examples[shape]}" for shape, fid in shape_ids.items()]
+
+        sheets = list(dict.fromkeys(item["sheet"] for item in items))
+        formula_sheets = set(sheets)
+        read_sheets = {ref["sheet"] for item in items for ref in item["refs"]}
+        for sheet in metadata:
+            if sheet not in sheets and (wanted is None or sheet in read_sheets):
+                sheets.append(sheet)
+        for sheet in sheets:
+            inputs = self._inputs(metadata[sheet], sheet, items if wanted is not None else None)
+            if wanted is not None and not inputs and sheet not in formula_sheets:
+                continue
+            lines.append(f"Sheet {sheet}" + (f" | inputs: {', '.join(inputs)}" if inputs else ""))
+            for item in (i for i in items if i["sheet"] == sheet):
+                lines.extend(self._formula_lines(item, shape_ids, aliases))
+        return "\n".join(lines)
+
+    # --- Collection ---
+    def _formulas(self, metadata: Dict[str, Any], wanted: Optional[set]) -> List[Dict[str, Any]]:
+        items = []
+        for sheet, meta in metadata.items():
+            if "formulas" in meta:
+                for formula_meta in meta["formulas"]:
+                    if wanted is not None and formula_meta["method_name"] not in wanted:
+                        continue
+                    # The formula's own column: a header can repeat, its left-most column may be another one
+                    letter = formula_meta.get("excel_col")
+                    items.append(self._item(sheet, formula_meta["column"], letter, formula_meta,
+                                            formula_meta.get("method_name")))
+            for column, rule in meta.get("logic", {}).items():
+                if wanted is not None and column not in wanted and f"{sheet}.{column}" not in wanted:
+                    continue
+                items.append(self._item(sheet, column, rule.get("excel_col"), rule, None))
+        return items
+
+    def _item(self, sheet: str, column: str, letter: Optional[str], meta: Dict[str, Any],
+              method_name: Optional[str]) -> Dict[str, Any]:
+        col_idx = column_index_from_string(letter) if letter else 1
+        regimes = []
+        for regime in meta.get("regimes") or [{"rows": meta.get("rows"), "formula": meta.get("formula", "")}]:
+            formula = regime.get("formula") or ""
+            first_row = int(str(regime.get("rows") or "2").partition(":")[0])
+            regimes.append({"rows": regime.get("rows"), "formula": formula,
+                            "shape": to_r1c1(formula, first_row, col_idx) if letter else formula})
+
+        refs = meta.get("references")
+        if refs is None and self.header_index is not None:
+            # Agent metadata has no references: resolve them like the notebook miner does
+            refs = references_to_metadata(
+                extract_references(regimes[0]["formula"], sheet, int(str(meta.get("rows") or "2").partition(":")[0]),
+                                   col_idx), self.header_index)
+        refs = [{**r, "column": str(r["column"])} for r in refs or []]
+        covered = {f"{r['sheet']}.{r['column']}" for r in refs}
+        return {
+            "sheet": sheet, "column": str(column), "letter": letter, "method_name": method_name,
+            "dtype": meta.get("dtype"), "rows": meta.get("rows"), "regimes": regimes, "refs": refs,
+            "extra_deps": [d for d in meta.get("depends_on", []) if d not in covered],
+        }
+
+    def _inputs(self, meta: Dict[str, Any], sheet: str, items: Optional[List[Dict[str, Any]]]) -> List[str]:
+        read = None
+        if items is not None:
+            read = {ref["column"] for item in items for ref in item["refs"] if ref["sheet"] == sheet}
+        if "raw_inputs" in meta:
+            return [f"{raw['column']} {raw.get('dtype', '?')}" for raw in meta["raw_inputs"]
+                    if read is None or str(raw["column"]) in read]
+        formula_columns = set(meta.get("logic", {}))
+        return [_schema_line(name, info) for name, info in meta.get("schema", {}).items()
+                if name not in formula_columns and (read is None or name in read)]
+
+    # --- Rendering ---
+    @staticmethod
+    def _formula_lines(item: Dict[str, Any], shape_ids: Dict[str, str], aliases: Dict[str, str]) -> List[str]:
+        tags = [t for t in (item["letter"], item["dtype"], f"rows {item['rows']}" if item["rows"] else None,
+                            item["method_name"]) if t and t != "Unknown"]
+        head = f"  {item['column']} [{', '.join(tags)}]"
+
+        def formula_text(regime):
+            return f"= {shape_ids[regime['shape']]}" if regime["shape"] in shape_ids else regime["formula"]
+
+        if len(item["regimes"]) == 1:
+            lines = [f"{head} {formula_text(item['regimes'][0])}"]
+        else:
+            lines = [f"{head} changes down the column:"]
+            lines += [f"    rows {r['rows']}: {formula_text(r)}" for r in item["regimes"]]
+
+        def ref_text(ref):
+            name = aliases.get(ref["column"], ref["column"])
+            letter = ref["excel_col"]
+            prefix = "" if ref["sheet"] == item["sheet"] else f"{ref['sheet']}!"
+            if not prefix and ref.get("row_offset") is not None:
+                # Moves with the formula cell: (row) = the same row, (row-1) = the row above
+                offset = ref["row_offset"]
+                return f"{letter}={name} (row{offset:+d})" if offset else f"{letter}={name} (row)"
+            if ref["rows"] == ":":
+                return f"{prefix}{letter}:{letter}={name}"
+            first, _, last = str(ref["rows"]).partition(":")
+            span = f"{letter}{first}:{letter}{last}" if last else f"{letter}{first}"
+            return f"{prefix}{span}={name}"
+
+        if item["refs"]:
+            lines.append("    refs: " + ", ".join(ref_text(r) for r in item["refs"]))
+        if item["extra_deps"]:
+            lines.append("    also depends on: " + ", ".join(item["extra_deps"]))
+        return lines
+
+
+def encode_metadata(metadata: Dict[str, Any], only: Optional[Iterable[str]] = None,
+                    header_index: Optional[HeaderIndex] = None) -> str:
+    return PromptEncoder(header_index).encode(metadata, only)
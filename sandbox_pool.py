@@ -0,0 +1,370 @@
+import os
+import sys
+import mmap
+import time
+import queue
+import signal
+import atexit
+import pickle
+import importlib
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource   # POSIX only: CPU / memory limits are skipped elsewhere
+except ImportError:
+    resource = None
+
+
+# --- OUT-OF-PROCESS SANDBOX POOL ---
+# Generated code used to be exec'd inside the graph process. A runaway candidate
+# (an accidental O(n²) loop, a huge allocation) hung or bloated the whole agent,
+# and every validation paid the pandas import and setup again. Code now runs in a
+# pool of pre-warmed worker processes (pandas, NumPy and the runtimes already
+# imported):
+#   * wall-clock timeout from the parent; CPU seconds (RLIMIT_CPU) and address
+#     space (RLIMIT_AS) limits inside the worker. A worker that is killed, times
+#     out or runs out of memory is replaced by a fresh one.
+#   * input frames go through shared memory: numeric columns are copied once into
+#     a block and mapped copy-on-write by the worker (Linux), so the code may edit
+#     its frames without touching the shared copy. Text columns are pickled.
+#   * jobs are module-level functions (see JOBS) called as job(code, sheets, **kwargs);
+#     the result comes back with wall time, CPU time and peak memory.
+#
+#   pool = SandboxPool(workers=2, timeout=60, cpu_seconds=60, memory_mb=2048)
+#   result = pool.run("model_transform", code, sheets, plan=plan)
+#   result.ok, result.value, result.error, result.seconds
+
+SIGXCPU = getattr(signal, "SIGXCPU", 24)
+WARM_IMPORTS = ("pandas", "numpy", "lookup_runtime", "calculator_runtime", "generation_units")
+NUMERIC_KINDS = "biufmM"
+
+
+class SandboxResult(NamedTuple):
+    ok: bool
+    value: Any
+    error: Optional[str]          # traceback, or "timeout" / "cpu limit" / "memory limit" / "worker died" text
+    seconds: float                # wall time inside the worker (or until the parent gave up)
+    cpu_seconds: float
+    peak_mb: float                # peak resident memory of the worker so far
+
+
+# --- Shared input frames ---
+class SharedFrames:
+    """{sheet: DataFrame} published once; numeric columns live in shared memory blocks."""
+
+    def __init__(self, sheets: Dict[Any, pd.DataFrame]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.manifest: Dict[Any, Dict[str, Any]] = {}
+        for sheet, frame in sheets.items():
+            columns = []
+            for n in range(frame.shape[1]):
+                series = frame.iloc[:, n]
+                if series.dtype.kind in NUMERIC_KINDS and isinstance(series.dtype, np.dtype):
+                    values = np.ascontiguousarray(series.to_numpy())
+                    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                    np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+                    self._blocks.append(block)
+                    columns.append(("shared", block.name, values.dtype.str, values.shape))
+                else:
+                    columns.append(("pickled", series.to_numpy(), str(series.dtype)))
+            self.manifest[sheet] = {"index": frame.index, "names": list(frame.columns),
+                                    "names_dtype": str(frame.columns.dtype), "columns": columns}
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(manifest: Dict[Any, Dict[str, Any]]) -> Dict[Any, pd.DataFrame]:
+    """Worker side: rebuilds the frames on private copy-on-write mappings of the shared blocks."""
+    sheets = {}
+    for sheet, meta in manifest.items():
+        data = {}
+        for n, column in enumerate(meta["columns"]):
+            if column[0] == "pickled":
+                values, dtype = column[1], column[2]
+                data[n] = pd.array(values, dtype=dtype) if dtype != "object" else values
+                continue
+            _, name, dtype, shape = column
+            dtype = np.dtype(dtype)
+            path = os.path.join("/dev/shm", name)
+            if os.path.exists(path):
+                with open(path, "r+b") as fh:
+                    buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+                data[n] = np.ndarray(shape, dtype, buffer=buffer)
+            else:
+                # No /dev/shm (macOS, Windows): attach and take a private copy
+                block = shared_memory.SharedMemory(name=name)
+                data[n] = np.ndarray(shape, dtype, buffer=block.buf).copy()
+                block.close()
+        frame = pd.DataFrame(data, index=meta["index"], copy=False)
+        frame.columns = pd.Index(meta["names"], dtype=meta["names_dtype"])
+        sheets[sheet] = frame
+    return sheets
+
+
+# --- Jobs (run inside the worker) ---
+def _load(code: str, class_name: str):
+    namespace = {"pd": pd, "np": np, "Dict": Dict, "Any": Any}
+    exec(code, namespace)
+    return namespace[class_name]
+
+
+def model_transform(code: str, sheets: Dict[str, pd.DataFrame], plan=None, columns=None) -> Dict[str, Any]:
+    """
+    ExcelModel().transform(sheets) for the notebook validator. On a crash the plan is
+    re-run method by method (generation_units.run_steps) to name the method that raised.
+    Returns {"load_error"} or {"frames": {sheet: formula columns}, "crashes": {method: error}}.
+    """
+    from generation_units import run_steps
+
+    try:
+        model = _load(code, "ExcelModel")()
+    except Exception as e:
+        return {"load_error": f"{type(e).__name__}: {e}"}
+    crashes = {}
+    try:
+        results = model.transform(sheets)
+    except Exception:
+        if plan is None:
+            raise
+        results, crashes = run_steps(model, plan, sheets)
+        if not crashes:
+            raise
+    # Only the formula columns travel back
+    frames = {sheet: results[sheet][[c for c in cols if c in results[sheet].columns]]
+              for sheet, cols in (columns or {}).items() if sheet in results}
+    return {"frames": frames, "crashes": crashes}
+
+
+def calculator_properties(code: str, sheets: Dict[str, pd.DataFrame], logic=None) -> Dict[str, Any]:
+    """
+    Structure test of the agent's ExcelCalculator: every property of every sheet
+    must evaluate. `logic` = {sheet: [column, ...]}. Returns the properties checked
+    and the slowest-formula lines of CalculatorBase subclasses.
+    """
+    calculator_class = _load(code, "ExcelCalculator")
+    checked, timings = [], []
+    for sheet, columns in (logic or {}).items():
+        calc = calculator_class(df=sheets[sheet], all_data=sheets)
+        for col in columns:
+            getattr(calc, col.lower())
+            checked.append(f"{sheet} -> {col}")
+        if hasattr(calc, "slowest_formulas"):
+            timings += calc.slowest_formulas()
+    return {"checked": checked, "timings": timings}
+
+
+JOBS = {"model_transform": model_transform, "calculator_properties": calculator_properties}
+
+
+def _address_space() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _peak_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _limit(kind: int, soft: int, original):
+    hard = original[1]
+    resource.setrlimit(kind, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def _worker_main(conn, warm_imports):
+    start = time.perf_counter()
+    original = {kind: resource.getrlimit(kind) for kind in (resource.RLIMIT_CPU, resource.RLIMIT_AS)} if resource else {}
+    for module in warm_imports:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    conn.send(("ready", time.perf_counter() - start))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        job, code, manifest, kwargs, cpu_seconds, memory_mb = message
+        start, cpu_start = time.perf_counter(), time.process_time()
+        recycle, sheets = False, None
+        try:
+            sheets = _attach(manifest)
+            if resource is not None:
+                if cpu_seconds:
+                    # SIGXCPU terminates the worker once the task used `cpu_seconds` of CPU
+                    used = int(cpu_start) + 1
+                    _limit(resource.RLIMIT_CPU, used + int(cpu_seconds), original[resource.RLIMIT_CPU])
+                if memory_mb and _address_space():
+                    _limit(resource.RLIMIT_AS, _address_space() + int(memory_mb) * 1024 * 1024,
+                           original[resource.RLIMIT_AS])
+            status, value = "ok", JOBS[job](code, sheets, **kwargs)
+        except MemoryError:
+            status, value, recycle = "memory limit", f"MemoryError: the task needed more than {memory_mb} MB", True
+        except BaseException:
+            status, value = "error", traceback.format_exc()
+        finally:
+            for kind, limits in original.items():
+                resource.setrlimit(kind, limits)
+        reply = (status, value, time.perf_counter() - start, time.process_time() - cpu_start, _peak_mb(), recycle)
+        try:
+            conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            conn.send(("error", f"Result could not be sent back: {e}", *reply[2:]))
+        del sheets
+        if recycle:
+            return
+
+
+# --- Pool (parent side) ---
+class _Worker:
+    def __init__(self, ctx, warm_imports):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, warm_imports), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.warmup_seconds: Optional[float] = None
+
+    def wait_ready(self):
+        if self.warmup_seconds is None:
+            _, self.warmup_seconds = self.conn.recv()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class SandboxPool:
+    def __init__(self, workers: int = 2, timeout: float = 60.0, cpu_seconds: Optional[float] = 60,
+                 memory_mb: Optional[int] = 2048, warm_imports=WARM_IMPORTS):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.warm_imports = tuple(warm_imports)
+        # spawn: a clean interpreter per worker (forking a process with LLM client threads is unsafe)
+        self._ctx = mp.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._started = False
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.replaced = 0
+
+    def start(self):
+        """Starts (pre-warms) every worker; called on first use."""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.workers):
+                self._idle.put(_Worker(self._ctx, self.warm_imports))
+            self._started = True
+            atexit.register(self.close)
+
+    def run(self, job: str, code: str, sheets: Union[Dict[Any, pd.DataFrame], SharedFrames],
+            timeout: Optional[float] = None, **kwargs) -> SandboxResult:
+        """
+        Runs JOBS[job](code, sheets, **kwargs) in a worker. `sheets` may be a SharedFrames
+        published once and reused by several runs (e.g. speculative candidates).
+        """
+        self.start()
+        shared = sheets if isinstance(sheets, SharedFrames) else SharedFrames(sheets)
+        worker = self._idle.get()
+        start = time.perf_counter()
+        try:
+            try:
+                worker.wait_ready()
+                worker.conn.send((job, code, shared.manifest, kwargs, self.cpu_seconds, self.memory_mb))
+                if not worker.conn.poll(timeout or self.timeout):
+                    self._replace(worker)
+                    worker = None
+                    return SandboxResult(False, None, f"timeout: no result after {timeout or self.timeout:.0f}s",
+                                         time.perf_counter() - start, 0.0, 0.0)
+                status, value, seconds, cpu, peak, recycle = worker.conn.recv()
+            except (EOFError, OSError):
+                # The worker was killed: SIGXCPU from RLIMIT_CPU, or the OS ran out of memory
+                worker.process.join(timeout=5)
+                exit_code = worker.process.exitcode
+                reason = "cpu limit" if exit_code == -SIGXCPU else f"worker died (exit code {exit_code})"
+                self._replace(worker)
+                worker = None
+                return SandboxResult(False, None, f"{reason}: the task was terminated",
+                                     time.perf_counter() - start, 0.0, 0.0)
+            if recycle:
+                self._replace(worker)
+                worker = None
+            ok = status == "ok"
+            return SandboxResult(ok, value if ok else None, None if ok else (
+                value if status == "error" else f"{status}: {value}"), seconds, cpu, peak)
+        finally:
+            self.tasks += 1
+            if worker is not None:
+                self._release(worker)
+            if shared is not sheets:
+                shared.close()
+
+    def _release(self, worker: _Worker):
+        with self._lock:
+            if self._started:
+                self._idle.put(worker)
+                return
+        # The pool was closed while the task ran: nobody would ever stop this worker
+        self._stop(worker)
+
+    def _replace(self, worker: _Worker):
+        worker.kill()
+        self.replaced += 1
+        with self._lock:
+            if self._started:
+                self._idle.put(_Worker(self._ctx, self.warm_imports))
+
+    @staticmethod
+    def _stop(worker: _Worker):
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        worker.kill()
+
+    def close(self):
+        """Stops every idle worker; workers busy in other threads are stopped when their task ends."""
+        with self._lock:
+            self._started = False
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._stop(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "tasks": self.tasks, "replaced": self.replaced}
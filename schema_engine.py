@@ -0,0 +1,145 @@
+import datetime
+from typing import Dict, List, Any, Iterable
+
+import numpy as np
+
+from workbook_scanner import ScannedCell
+
+
+# --- COLUMNAR SCHEMA ENGINE ---
+# Replaces the 100-row DataFrame sample (and the one-cell `type(value)` guess) with
+# statistics over the WHOLE column. Values streamed from the scanner are buffered
+# per column and converted to typed NumPy arrays in bulk (one np.array call per
+# chunk); min/max/null-rate/cardinality are then computed with vectorized ops.
+
+class _ColumnAccumulator:
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self._numbers: List[float] = []
+        self._texts: List[str] = []
+        self.number_chunks: List[np.ndarray] = []
+        self.text_chunks: List[np.ndarray] = []
+        self.has_float = False
+        self.bools = 0
+        self.dates = 0
+        self.non_null = 0
+
+    def add(self, value: Any):
+        self.non_null += 1
+        # bool is a subclass of int -> must be checked first
+        if isinstance(value, bool):
+            self.bools += 1
+            self._numbers.append(float(value))
+        elif isinstance(value, (int, float)):
+            self.has_float = self.has_float or isinstance(value, float)
+            self._numbers.append(value)
+        elif isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            self.dates += 1
+            self._texts.append(value.isoformat())
+        else:
+            self._texts.append(str(value))
+
+        if len(self._numbers) >= self.chunk_size or len(self._texts) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._numbers:
+            self.number_chunks.append(np.array(self._numbers, dtype=np.float64))
+            self._numbers = []
+        if self._texts:
+            self.text_chunks.append(np.array(self._texts, dtype=np.str_))
+            self._texts = []
+
+    def dtype(self) -> str:
+        numbers = sum(len(c) for c in self.number_chunks) - self.bools
+        texts = sum(len(c) for c in self.text_chunks) - self.dates
+        kinds = [name for name, count in (("number", numbers), ("bool", self.bools),
+                                          ("datetime", self.dates), ("str", texts)) if count]
+        if not kinds:
+            return "Unknown"
+        if kinds == ["number"]:
+            return "float" if self.has_float else "int"
+        return kinds[0] if len(kinds) == 1 else "mixed"
+
+    def summarize(self, rows: int) -> Dict[str, Any]:
+        self.flush()
+        dtype = self.dtype()
+        null_rate = round(1 - self.non_null / rows, 4) if rows else 0.0
+
+        if dtype in ("int", "float"):
+            values = np.concatenate(self.number_chunks)
+            return {
+                "type": "numeric",
+                "dtype": dtype,
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "null_rate": null_rate,
+                "cardinality": int(np.unique(values).size),
+            }
+
+        cardinality = 0
+        if self.number_chunks:
+            cardinality += int(np.unique(np.concatenate(self.number_chunks)).size)
+        if self.text_chunks:
+            cardinality += int(np.unique(np.concatenate(self.text_chunks)).size)
+        return {
+            "type": "categorical",
+            "dtype": dtype,
+            "null_rate": null_rate,
+            "cardinality": cardinality,
+        }
+
+
+class ColumnarSchema:
+    """
+    Feed it every data row (row >= first_row) in order; ask for `summary()` at the end.
+    `sample_rate` < 1 keeps a systematic sample (every k-th row) for very large
+    sheets; stats are then computed over the sampled rows only.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, first_row: int = 2, chunk_size: int = 65536):
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}")
+        self.step = max(1, round(1 / sample_rate))
+        self.first_row = first_row
+        self.chunk_size = chunk_size
+        self.last_row = first_row - 1
+        self._columns: Dict[int, _ColumnAccumulator] = {}
+
+    def wants_row(self, row_num: int) -> bool:
+        return row_num >= self.first_row and (row_num - self.first_row) % self.step == 0
+
+    def add_row(self, row_num: int, cells: Iterable[ScannedCell]):
+        if not self.wants_row(row_num):
+            return
+        self.last_row = row_num
+        for cell in cells:
+            if cell.value is not None:
+                column = self._columns.get(cell.col)
+                if column is None:
+                    column = self._columns[cell.col] = _ColumnAccumulator(self.chunk_size)
+                column.add(cell.value)
+
+    @property
+    def sampled_rows(self) -> int:
+        if self.last_row < self.first_row:
+            return 0
+        return (self.last_row - self.first_row) // self.step + 1
+
+    def column(self, col: int) -> Dict[str, Any]:
+        """Stats of one column (by 1-based index); a column without any value is an empty categorical."""
+        if col in self._columns:
+            return self._columns[col].summarize(self.sampled_rows)
+        return {"type": "categorical", "dtype": "Unknown", "null_rate": 1.0, "cardinality": 0}
+
+    def summary(self, column_names: Dict[int, str]) -> Dict[str, Dict[str, Any]]:
+        """Stats per column name, in column order."""
+        if not self.sampled_rows:
+            return {}
+        summary = {}
+        for col in sorted(set(column_names) | set(self._columns)):
+            stats = self.column(col)
+            if not column_names.get(col) and stats["null_rate"] >= 1.0:
+                continue   # no header and no value: a formatted or cleared column, nothing to describe
+            summary[column_names.get(col) or f"Col_{col}"] = stats
+        return summary
@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, NamedTuple
+
+
+# --- SHARDED PYTEST RUNNER ---
+# execute_tests_node used to call pytest.main() inside the agent and scrape the
+# captured stdout. The generated `model` module stayed cached in sys.modules, so
+# the next repair iteration could be testing yesterday's code, and tests ran one
+# at a time. The suite now runs in fresh interpreters:
+#   * `pytest --collect-only` lists the test ids, which are split into shards
+#     (longest first, by the previous run's durations when known) and every shard
+#     runs in its own `python -m pytest` subprocess, all shards in parallel
+#   * each shard writes a junit XML report; results come back as CaseResult
+#     records (outcome, seconds, message, assertion diff) instead of text
+#   * bytecode is not written (PYTHONDONTWRITEBYTECODE), so a model.py rewritten
+#     within the same second can never be served from a stale .pyc
+#
+#   run = run_tests("test_model.py", workers=4)
+#   run.passed, run.failures(), run.summary(), run.report()
+
+DEFAULT_SECONDS = 1.0   # assumed duration of a test that has not run before
+
+
+class CaseResult(NamedTuple):
+    nodeid: str
+    outcome: str            # "passed" / "failed" / "error" / "skipped"
+    seconds: float
+    message: str = ""       # first line of the failure, e.g. "AssertionError: Failed! Expected: 5, but got: 4"
+    diff: str = ""          # pytest's "E   ..." lines: the assertion with both sides expanded
+    details: str = ""       # full failure text (traceback)
+
+
+class SuiteRun(NamedTuple):
+    results: List[CaseResult]
+    collection_error: Optional[str]   # the suite could not even be collected (syntax / import error)
+    seconds: float
+    shards: int
+
+    @property
+    def passed(self) -> bool:
+        return self.collection_error is None and bool(self.results) and not self.failures()
+
+    def failures(self) -> List[CaseResult]:
+        return [r for r in self.results if r.outcome in ("failed", "error")]
+
+    def durations(self) -> Dict[str, float]:
+        """Feed back into the next run_tests() for better balanced shards."""
+        return {r.nodeid: r.seconds for r in self.results}
+
+    def summary(self) -> str:
+        if self.collection_error is not None:
+            return f"collection failed in {self.seconds:.1f}s"
+        counts: Dict[str, int] = {}
+        for r in self.results:
+            counts[r.outcome] = counts.get(r.outcome, 0) + 1
+        parts = [f"{n} {outcome}" for outcome, n in sorted(counts.items())] or ["no tests"]
+        return f"{', '.join(parts)} in {self.seconds:.1f}s ({self.shards} shards)"
+
+    def report(self) -> str:
+        """Readable text in the spirit of `pytest -v` (what the graph used to print)."""
+        if self.collection_error is not None:
+            return f"COLLECTION ERROR\n{self.collection_error}"
+        lines = [f"{r.nodeid} {r.outcome.upper()} ({r.seconds:.2f}s)" for r in self.results]
+        for r in self.failures():
+            lines += ["", f"___ {r.nodeid} ___", r.diff or r.message or r.details]
+        lines += ["", self.summary()]
+        return "\n".join(lines)
+
+
+def _env(pythonpath: Optional[List[str]] = None) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    if pythonpath:
+        env["PYTHONPATH"] = os.pathsep.join(list(pythonpath) + [p for p in [env.get("PYTHONPATH")] if p])
+    return env
+
+
+def _pytest(*args: str) -> List[str]:
+    # No cache provider: shards must not race on .pytest_cache (and --lf state is meaningless here)
+    return [sys.executable, "-m", "pytest", "-p", "no:cacheprovider", *args]
+
+
+def collect(test_path: str, cwd: str = ".", timeout: float = 120.0,
+            pythonpath: Optional[List[str]] = None) -> List[str]:
+    """Node ids of the suite; raises RuntimeError with pytest's output when collection fails."""
+    proc = subprocess.run(_pytest("--collect-only", "-q", test_path), cwd=cwd, env=_env(pythonpath),
+                          capture_output=True, text=True, timeout=timeout)
+    nodeids = [line.strip() for line in proc.stdout.splitlines() if "::" in line and " " not in line.strip()]
+    # 5 = nothing collected, which is not an error in itself
+    if proc.returncode not in (0, 5):
+        raise RuntimeError((proc.stdout + proc.stderr).strip())
+    return nodeids
+
+
+def shard(nodeids: List[str], shards: int, durations: Optional[Dict[str, float]] = None) -> List[List[str]]:
+    """Longest known test first onto the least loaded shard; unknown tests count DEFAULT_SECONDS."""
+    durations = durations or {}
+    buckets: List[List[str]] = [[] for _ in range(max(1, min(shards, len(nodeids))))]
+    load = [0.0] * len(buckets)
+    for nodeid in sorted(nodeids, key=lambda n: -durations.get(n, DEFAULT_SECONDS)):
+        i = load.index(min(load))
+        buckets[i].append(nodeid)
+        load[i] += durations.get(nodeid, DEFAULT_SECONDS)
+    # Keep collection order inside a shard (module fixtures are set up once per shard)
+    order = {n: i for i, n in enumerate(nodeids)}
+    return [sorted(b, key=order.__getitem__) for b in buckets if b]
+
+
+def _junit_key(nodeid: str):
+    # "pkg/test_x.py::TestA::test_b[1]" -> ("pkg.test_x.TestA", "test_b[1]"), as junit XML names it
+    path, *scopes = nodeid.split("::")
+    module = path[:-3] if path.endswith(".py") else path
+    return ".".join([module.replace("/", ".").replace("\\", ".")] + scopes[:-1]), scopes[-1] if scopes else ""
+
+
+def _diff(text: str) -> str:
+    return "\n".join(line[1:].strip() for line in text.splitlines() if line.startswith("E ")).strip()
+
+
+def parse_junit(path: str, nodeids: List[str]) -> Dict[str, CaseResult]:
+    by_key = {_junit_key(n): n for n in nodeids}
+    results = {}
+    for case in ET.parse(path).getroot().iter("testcase"):
+        key = (case.get("classname", ""), case.get("name", ""))
+        nodeid = by_key.get(key, "::".join(filter(None, key)))
+        outcome, message, details = "passed", "", ""
+        # A setup error next to a failure is reported as the error
+        for tag in ("skipped", "failure", "error"):
+            node = case.find(tag)
+            if node is not None:
+                outcome = "failed" if tag == "failure" else "skipped" if tag == "skipped" else "error"
+                message = (node.get("message") or "").strip()
+                details = (node.text or "").strip()
+        results[nodeid] = CaseResult(nodeid, outcome, float(case.get("time") or 0.0),
+                                     message.splitlines()[0] if message else "", _diff(details), details)
+    return results
+
+
+def run_tests(test_path: str, workers: Optional[int] = None, cwd: str = ".", timeout: float = 300.0,
+              durations: Optional[Dict[str, float]] = None, pythonpath: Optional[List[str]] = None) -> SuiteRun:
+    """
+    Run the suite sharded over `workers` subprocesses (default: one per core, at most
+    one per test). A shard that crashes or exceeds `timeout` reports its tests as errors.
+    `cwd` is where the suite and the code it imports live (a run's Workspace);
+    `pythonpath` is prepended to PYTHONPATH for the shards.
+    """
+    start = time.perf_counter()
+    try:
+        nodeids = collect(test_path, cwd, timeout, pythonpath)
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        error = str(e) if isinstance(e, RuntimeError) else f"collection timed out after {timeout:.0f}s"
+        return SuiteRun([], error, time.perf_counter() - start, 0)
+    if not nodeids:
+        return SuiteRun([], None, time.perf_counter() - start, 0)
+
+    shards = shard(nodeids, workers or os.cpu_count() or 1, durations)
+    report_dir = tempfile.mkdtemp(prefix="test_runner_")
+    try:
+        procs = []
+        for i, ids in enumerate(shards):
+            xml_path = os.path.join(report_dir, f"shard_{i}.xml")
+            args = _pytest("-q", "-o", "junit_logging=no", f"--junitxml={xml_path}", *ids)
+            procs.append((ids, xml_path, subprocess.Popen(args, cwd=cwd, env=_env(pythonpath), stdout=subprocess.PIPE,
+                                                          stderr=subprocess.STDOUT, text=True)))
+
+        results: Dict[str, CaseResult] = {}
+        deadline = time.monotonic() + timeout
+        for ids, xml_path, proc in procs:
+            try:
+                output, _ = proc.communicate(timeout=max(0.0, deadline - time.monotonic()))
+                problem = f"shard exited with code {proc.returncode}"
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                output, _ = proc.communicate()
+                problem = f"timeout after {timeout:.0f}s"
+            parsed = parse_junit(xml_path, ids) if os.path.exists(xml_path) else {}
+            results.update(parsed)
+            # Tests the report does not mention never finished (killed, or the interpreter died)
+            tail = "\n".join((output or "").strip().splitlines()[-20:])
+            for nodeid in ids:
+                if nodeid not in parsed:
+                    results[nodeid] = CaseResult(nodeid, "error", 0.0, problem, "", tail)
+    finally:
+        shutil.rmtree(report_dir, ignore_errors=True)
+
+    ordered = [results.pop(n) for n in nodeids if n in results] + list(results.values())
+    return SuiteRun(ordered, None, time.perf_counter() - start, len(shards))
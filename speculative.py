@@ -0,0 +1,110 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple, NamedTuple
+
+
+# --- SPECULATIVE CANDIDATE GENERATION ---
+# The repair loops (architect -> sandbox -> architect, generator -> validator) pay a
+# whole LLM round trip plus a validation for every failed attempt. In speculative
+# mode K candidates are generated concurrently (temperature/seed varied), each is
+# validated as soon as it arrives, and the first one that passes wins: candidates
+# still waiting for the LLM are cancelled. Validations already running cannot be
+# (they run in threads) and are waited for, so their cost is bounded by the
+# validator's own limits (the sandbox pool timeout). A semaphore caps the number
+# of concurrent LLM calls so we stay inside the API rate limits.
+#
+#   result = speculate(generate, validate, k=3, max_concurrency=2)
+#   code = result.winner.value if result.winner else result.candidates[0].value
+
+class Candidate(NamedTuple):
+    index: int
+    settings: Dict[str, Any]   # LLM call overrides, e.g. {"temperature": 0.3, "seed": 1}
+    value: Any
+    ok: bool
+    report: Any                # whatever `validate` returned next to the verdict
+    seconds: float             # generation + validation wall time
+
+
+class SpeculativeResult(NamedTuple):
+    winner: Optional[Candidate]
+    candidates: List[Candidate]   # finished candidates, in completion order
+    cancelled: int
+
+    def summary(self) -> str:
+        status = f"candidate {self.winner.index} passed" if self.winner else "no candidate passed"
+        return (f"{status} ({len(self.candidates)} finished, {self.cancelled} cancelled; "
+                + ", ".join(f"#{c.index}: {'ok' if c.ok else 'fail'} in {c.seconds:.1f}s" for c in self.candidates)
+                + ")")
+
+
+def candidate_settings(k: int, base_temperature: float = 0.0, step: float = 0.3,
+                       max_temperature: float = 1.0) -> List[Dict[str, Any]]:
+    """Candidate 0 keeps the base temperature; the others explore with rising temperature and their own seed."""
+    return [
+        {"temperature": round(min(base_temperature + i * step, max_temperature), 2), "seed": i}
+        for i in range(k)
+    ]
+
+
+async def race(generate: Callable[[Dict[str, Any]], Awaitable[Any]],
+               validate: Callable[[Any], Tuple[bool, Any]],
+               k: int = 3, max_concurrency: int = 2,
+               settings: Optional[List[Dict[str, Any]]] = None) -> SpeculativeResult:
+    """
+    `generate(settings)` is a coroutine producing one candidate (e.g. an LLM call).
+    `validate(candidate)` is blocking -> (passed, report); it runs in a worker thread.
+    At most `max_concurrency` generations are in flight at once.
+
+    Once a candidate passes, only work that has not started is cancelled: pending and
+    in-flight generations stop and their candidates are never validated, but a
+    validation already running in its thread cannot be interrupted: it finishes and
+    its result is discarded. asyncio.run (and so `speculate`) waits for it.
+    """
+    settings = settings or candidate_settings(k)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    finished: List[Candidate] = []
+    winner: List[Candidate] = []
+
+    async def attempt(index: int, overrides: Dict[str, Any]) -> Candidate:
+        start = time.perf_counter()
+        try:
+            async with semaphore:
+                value = await generate(overrides)
+            ok, report = await asyncio.to_thread(validate, value)
+        except Exception as e:
+            # A failed LLM call (or a crashing validator) is just a failed candidate
+            value, ok, report = None, False, f"{type(e).__name__}: {e}"
+        candidate = Candidate(index, overrides, value, bool(ok), report, time.perf_counter() - start)
+        finished.append(candidate)
+        return candidate
+
+    tasks = [asyncio.ensure_future(attempt(i, s)) for i, s in enumerate(settings[:k])]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            candidate = await next_done
+            if candidate.ok:
+                winner.append(candidate)
+                break
+    finally:
+        pending = [t for t in tasks if not t.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return SpeculativeResult(winner[0] if winner else None, finished, len(pending))
+
+
+def speculate(generate: Callable[[Dict[str, Any]], Awaitable[Any]],
+              validate: Callable[[Any], Tuple[bool, Any]],
+              k: int = 3, max_concurrency: int = 2,
+              settings: Optional[List[Dict[str, Any]]] = None) -> SpeculativeResult:
+    """Blocking wrapper for graph nodes. Works inside Jupyter (already running loop) too."""
+    coro = race(generate, validate, k=k, max_concurrency=max_concurrency, settings=settings)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # A loop is running in this thread (notebook): run ours in a helper thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
@@ -0,0 +1,56 @@
+# test_batch_convert.py
+
+import csv
+import json
+import os
+
+from batch_convert import BatchJob, Ledger, discover, format_table, pending, run_id_for, write_summary
+
+
+def test_discover_directories_and_manifests(tmp_path):
+    for name in ("b.xlsx", "sub/a.XLSX", "~$b.xlsx", "notes.txt"):
+        path = tmp_path / "books" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    books = str(tmp_path / "books")
+    assert discover(books) == [os.path.join(books, "b.xlsx"), os.path.join(books, "sub", "a.XLSX")]
+
+    (tmp_path / "list.txt").write_text("# templates\nbooks/b.xlsx\n\n/abs/c.xlsx\n")
+    assert discover(str(tmp_path / "list.txt")) == [os.path.join(str(tmp_path), "books/b.xlsx"), "/abs/c.xlsx"]
+    (tmp_path / "list.json").write_text(json.dumps(["books/b.xlsx"]))
+    assert discover(str(tmp_path / "list.json")) == [os.path.join(str(tmp_path), "books/b.xlsx")]
+
+
+def test_ledger_resumes_finished_workbooks(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    ledger.append({"workbook": "a.xlsx", "key": "k1", "status": "error"})
+    ledger.append({"workbook": "a.xlsx", "key": "k1", "status": "passed"})
+    ledger.append({"workbook": "b.xlsx", "key": "k2", "status": "tests_failed"})
+    with open(ledger.path, "a") as fh:
+        fh.write('{"workbook": "c.xl')   # torn last line of an interrupted run
+    done = ledger.records()
+    assert {path: r["status"] for path, r in done.items()} == {"a.xlsx": "passed", "b.xlsx": "tests_failed"}
+
+    jobs = [BatchJob("a.xlsx", "k1"), BatchJob("b.xlsx", "k2"), BatchJob("c.xlsx", "k3"), BatchJob("a.xlsx", "new")]
+    assert pending(jobs, done) == jobs[2:]
+    assert pending(jobs, done, retry_failed=True) == jobs[1:]
+    assert run_id_for(jobs[0]) == run_id_for(BatchJob("a.xlsx", "k1")) != run_id_for(jobs[3])
+
+
+def test_summary_csv_and_table(tmp_path):
+    records = [
+        {"workbook": "/x/a.xlsx", "status": "passed", "iterations": 2, "wall_s": 1.5,
+         "input_tokens": 1000, "output_tokens": 200, "extra": "dropped"},
+        {"workbook": "/x/b.xlsx", "status": "invalid", "iterations": 5, "wall_s": 9.0,
+         "input_tokens": 3000, "output_tokens": 800},
+    ]
+    path = str(tmp_path / "summary.csv")
+    write_summary(records, path)
+    with open(path, newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [row["status"] for row in rows] == ["passed", "invalid"] and "extra" not in rows[0]
+
+    table = format_table(records).splitlines()
+    assert table[0].split() == ["workbook", "status", "iterations", "wall_s", "input_tokens", "output_tokens"]
+    assert table[1].split() == ["a.xlsx", "passed", "2", "1.5", "1000", "200"]
+    assert table[-1] == "2 workbooks: 1 invalid, 1 passed; 5,000 tokens"
@@ -0,0 +1,59 @@
+# test_calculator_runtime.py
+
+import pandas as pd
+
+from calculator_runtime import CalculatorBase, formula_property
+
+
+class Calculator(CalculatorBase):
+    @formula_property
+    def total_sales(self):
+        return self.all_data["Sales"]["Amount"].sum()
+
+    @formula_property
+    def margin(self):
+        return self.total_sales * self.all_data["Margins"]["Rate"].iloc[0]
+
+    @formula_property
+    def rows(self):
+        return len(self.df)
+
+
+def _data():
+    return {"Sales": pd.DataFrame({"Amount": [10, 20]}), "Margins": pd.DataFrame({"Rate": [0.5]})}
+
+
+def test_values_are_memoized_until_an_input_is_replaced():
+    data = _data()
+    calc = Calculator(data["Sales"], data)
+    assert calc.margin == 15.0 and calc.margin == 15.0
+    stats = calc.formula_stats()
+    assert stats["margin"]["computes"] == 1 and stats["margin"]["hits"] == 1
+    assert stats["total_sales"]["computes"] == 1
+
+    # margin read Sales through total_sales, so a new Sales frame recomputes both
+    data["Sales"] = pd.DataFrame({"Amount": [1, 2, 3]})
+    assert calc.margin == 3.0
+    assert calc.formula_stats()["total_sales"]["computes"] == 2
+    # ...but a property reading only self.df is untouched by that
+    assert calc.rows == 2 and calc.rows == 2
+    calc.df = data["Sales"]
+    assert calc.rows == 3
+
+
+def test_in_place_edits_need_invalidate():
+    data = _data()
+    calc = Calculator(data["Sales"], data)
+    assert calc.total_sales == 30
+    data["Sales"].loc[0, "Amount"] = 100
+    assert calc.total_sales == 30
+    calc.invalidate("total_sales")
+    assert calc.total_sales == 120
+    assert len(calc.slowest_formulas(1)) == 1
+
+
+def test_plain_classes_get_a_plain_property():
+    class Plain:
+        value = formula_property(lambda self: 42)
+
+    assert Plain().value == 42
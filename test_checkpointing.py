@@ -0,0 +1,90 @@
+# test_checkpointing.py
+
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from checkpointing import SqliteCheckpointer, run_or_resume, run_status
+
+
+class State(TypedDict):
+    big: str
+    n: int
+
+
+def build_graph(path, crash, ran):
+    """mine-like node `a` (large output) -> `b` (crashes while `crash`) -> `c`."""
+    def a(state):
+        ran.append("a")
+        return {"big": "x" * 100_000, "n": 1}
+
+    def b(state):
+        ran.append("b")
+        if crash:
+            raise RuntimeError("killed")
+        return {"n": state["n"] + 1}
+
+    def c(state):
+        ran.append("c")
+        return {"n": state["n"] * 10}
+
+    graph = StateGraph(State)
+    for name, node in (("a", a), ("b", b), ("c", c)):
+        graph.add_node(name, node)
+    graph.add_edge(START, "a")
+    graph.add_edge("a", "b")
+    graph.add_edge("b", "c")
+    graph.add_edge("c", END)
+    checkpointer = SqliteCheckpointer(str(path))
+    return graph.compile(checkpointer=checkpointer), checkpointer
+
+
+def test_crashed_run_resumes_from_the_last_node(tmp_path):
+    path = tmp_path / "graph.sqlite"
+    ran = []
+    graph, _ = build_graph(path, crash=True, ran=ran)
+    with pytest.raises(RuntimeError, match="killed"):
+        run_or_resume(graph, {"big": "", "n": 0}, "run-1")
+    assert run_status(graph, "run-1") == {"exists": True, "finished": False, "next": ["b"], "step": 1}
+
+    # A new process: same database, the node that crashed runs again, `a` does not
+    ran.clear()
+    graph, checkpointer = build_graph(path, crash=False, ran=ran)
+    final = run_or_resume(graph, {"big": "", "n": 0}, "run-1")
+    assert ran == ["b", "c"]
+    assert final["n"] == 20 and final["big"] == "x" * 100_000
+    assert run_status(graph, "run-1")["finished"]
+
+    stats = checkpointer.stats()
+    assert stats["threads"] == 1 and stats["checkpoints"] == 5
+    # Each distinct value is stored once and the 100 kB string compresses to almost nothing
+    assert stats["payloads"] == 9 and stats["payload_bytes"] < 1_000
+
+    # A finished run is not executed again
+    assert run_or_resume(graph, None, "run-1")["n"] == 20 and ran == ["b", "c"]
+
+
+def test_restart_and_delete_thread(tmp_path):
+    ran = []
+    graph, checkpointer = build_graph(tmp_path / "graph.sqlite", crash=False, ran=ran)
+    run_or_resume(graph, {"big": "", "n": 0}, "run-1")
+    final = run_or_resume(graph, {"big": "", "n": 0}, "run-1", restart=True)
+    assert final["n"] == 20 and ran == ["a", "b", "c"] * 2
+
+    checkpointer.delete_thread("run-1")
+    assert checkpointer.stats() == {"threads": 0, "checkpoints": 0, "payloads": 0, "payload_bytes": 0}
+    assert not run_status(graph, "run-1")["exists"]
+
+
+def test_threads_are_isolated_and_share_payloads(tmp_path):
+    ran = []
+    graph, checkpointer = build_graph(tmp_path / "graph.sqlite", crash=False, ran=ran)
+    run_or_resume(graph, {"big": "", "n": 0}, "run-1")
+    payloads = checkpointer.stats()["payloads"]
+    run_or_resume(graph, {"big": "", "n": 0}, "run-2")
+    assert checkpointer.stats()["threads"] == 2 and checkpointer.stats()["payloads"] == payloads
+
+    checkpointer.delete_thread("run-1")
+    assert run_status(graph, "run-2")["finished"]
+    assert graph.get_state({"configurable": {"thread_id": "run-2"}}).values["n"] == 20
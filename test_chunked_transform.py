@@ -0,0 +1,44 @@
+# test_chunked_transform.py
+
+import pandas as pd
+import pytest
+
+from chunked_transform import (BatchWriter, ChunkedTransform, CsvBatchWriter, excel_batches,
+                               load_resident_sheets, open_writer)
+from dependency_graph import compile_plan, install_methods, install_transform
+from formula_transpiler import MODEL_SCAFFOLD, transpile_model_methods
+from header_index import load_header_index
+from metadata_extractor import extract_metadata_final
+
+TEMPLATE = "complex_financial_model_4.xlsx"
+DATA = "test_financial_model_4.xlsx"
+
+
+@pytest.fixture(scope="module")
+def model_and_metadata():
+    metadata = extract_metadata_final(TEMPLATE)
+    methods, _ = transpile_model_methods(metadata, load_header_index(TEMPLATE))
+    namespace = {}
+    exec(install_transform(install_methods(MODEL_SCAFFOLD, methods, "ExcelModel"), compile_plan(metadata)), namespace)
+    return namespace["ExcelModel"](), metadata
+
+
+def test_batch_writer_is_abstract():
+    with pytest.raises(TypeError):
+        BatchWriter()
+    assert isinstance(open_writer("out.csv"), CsvBatchWriter)
+
+
+def test_streamed_batches_match_the_full_transform(model_and_metadata, tmp_path):
+    model, metadata = model_and_metadata
+    header_index = load_header_index(TEMPLATE)
+    out_path = str(tmp_path / "sales.csv")
+
+    result = ChunkedTransform(model, metadata, header_index, "Sales").run(
+        excel_batches(DATA, "Sales", header_index, batch_rows=2), load_resident_sheets(DATA, "Sales"),
+        open_writer(out_path))
+
+    full = model.transform({str(k).strip(): v for k, v in pd.read_excel(DATA, sheet_name=None).items()})
+    assert pd.read_csv(out_path)["Price_Adjusted"].tolist() == pytest.approx(full["Sales"]["Price_Adjusted"].tolist())
+    assert result["Financials"]["Total_Sales"].tolist() == pytest.approx(full["Financials"]["Total_Sales"].tolist())
+    assert result["Financials"]["Profit_Loss"].tolist() == full["Financials"]["Profit_Loss"].tolist()
@@ -0,0 +1,44 @@
+# test_dependency_extractor.py
+
+from dependency_extractor import extract_references, references_to_metadata
+from header_index import HeaderIndex, SheetHeaders
+from incremental import row_wise
+
+
+def _refs(formula, sheet="Financials", row=3, col=4):
+    return [(r.sheet, r.column, r.rows, r.row_offset) for r in extract_references(formula, sheet, row, col)]
+
+
+def test_row_offset_is_relative_to_the_formula_row():
+    assert _refs("=C3*B2") == [("Financials", "C", "3", 0), ("Financials", "B", "2", -1)]
+    assert _refs("=B2*Settings!B2") == [("Financials", "B", "2", -1), ("Settings", "B", "2", -1)]
+
+
+def test_absolute_ranges_and_whole_columns_have_no_offset():
+    assert _refs("=$B$2+SUM(Data!A2:A9)+SUM(G:G)") == [
+        ("Financials", "B", "2", None), ("Data", "A", "2:9", None), ("Financials", "G", ":", None)]
+
+
+def test_strings_and_function_names_are_not_references():
+    assert _refs('=IF(C3="B2", LOG10(C3), 0)') == [("Financials", "C", "3", 0)]
+
+
+def test_row_local_only_for_the_own_row():
+    refs = extract_references("=C3*B2", "Financials", 3, 4)
+    assert [r.row_local for r in refs] == [True, False]
+
+
+def _formula_meta(formula, row=2, col=4, sheet="Sales"):
+    headers = HeaderIndex({s: SheetHeaders(s, {1: "Item", 2: "Qty", 3: "Price", 4: "Total"}) for s in ("Sales", "Tax")})
+    refs = references_to_metadata(extract_references(formula, sheet, row, col), headers)
+    return {"column": "Total", "formula": formula, "rows": f"{row}:10", "references": refs}
+
+
+def test_row_wise():
+    assert row_wise("Sales", _formula_meta("=B2*C2"))
+    assert row_wise("Sales", _formula_meta("=B2*Tax!$B$2"))
+    # The previous row (a running total) or another sheet's row cannot be recomputed row by row
+    assert not row_wise("Sales", _formula_meta("=B2+D1", row=2))
+    assert not row_wise("Sales", _formula_meta("=B3+D2", row=3))
+    assert not row_wise("Sales", _formula_meta("=B2*Tax!B2"))
+    assert not row_wise("Sales", _formula_meta("=SUM(B:B)"))
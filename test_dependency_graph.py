@@ -0,0 +1,75 @@
+# test_dependency_graph.py
+
+import pandas as pd
+import pytest
+
+from dependency_graph import CycleError, compile_plan, install_methods, install_transform, ensure_import
+
+
+def _formula(column, depends_on, rows="2:4"):
+    return {"column": column, "method_name": f"calculate_{column.lower()}", "depends_on": depends_on, "rows": rows}
+
+
+METADATA = {
+    "Sales": {"raw_inputs": [{"column": "Qty"}], "formulas": [
+        _formula("Total", ["Sales.Price", "Sales.Qty"]),
+        _formula("Price", ["Sales.Qty"]),
+    ]},
+    "Summary": {"raw_inputs": [], "formulas": [_formula("Revenue", ["Sales.Total"], rows="2")]},
+}
+
+MODEL = '''import pandas as pd
+
+class ExcelModel:
+    def calculate_price(self, sheets):
+        return sheets["Sales"]["Qty"] * 10
+
+    def calculate_total(self, sheets):
+        return sheets["Sales"]["Price"] * sheets["Sales"]["Qty"]
+
+    def calculate_revenue(self, sheets):
+        return [sheets["Sales"]["Total"].sum()]
+
+    def transform(self, all_sheets_dict):
+        return all_sheets_dict
+'''
+
+
+def test_levels_follow_the_dependencies():
+    plan = compile_plan(METADATA)
+    assert [[step.node for step in level] for level in plan.levels] == [
+        ["Sales.Price"], ["Sales.Total"], ["Summary.Revenue"]]
+    # Raw input columns are sources, not edges
+    assert plan.levels[0][0].depends_on == ()
+    assert plan.derived_sheets == {"Summary": 1}
+    assert plan.describe().splitlines()[1] == "Level 2: calculate_total -> Sales.Total"
+    assert [step.node for step in plan.without(["calculate_total"]).order] == ["Sales.Price"]
+
+
+def test_cycles_are_reported():
+    metadata = {"S": {"formulas": [_formula("A", ["S.B"]), _formula("B", ["S.C"]), _formula("C", ["S.A"])]}}
+    with pytest.raises(CycleError) as err:
+        compile_plan(metadata)
+    assert err.value.cycle == ["S.A", "S.B", "S.C", "S.A"]
+
+
+def test_rendered_transform_runs_the_plan():
+    code = install_transform(MODEL, compile_plan(METADATA))
+    assert code.count("def transform") == 1
+    namespace = {}
+    exec(code, namespace)
+    inputs = {"Sales": pd.DataFrame({"Qty": [1, 2, 3]})}
+    result = namespace["ExcelModel"]().transform(inputs)
+    assert list(result["Sales"]["Total"]) == [10, 40, 90]
+    assert list(result["Summary"]["Revenue"]) == [140]
+    assert list(inputs["Sales"].columns) == ["Qty"]
+
+
+def test_install_methods_and_imports():
+    code = install_methods(MODEL, {"calculate_price": "    def calculate_price(self, sheets):\n        return 1\n"},
+                           "ExcelModel")
+    assert code.count("def calculate_price") == 1 and "return 1" in code
+    assert install_methods("def broken(:\n", {"x": ""}, "ExcelModel") == "def broken(:\n"
+    code = ensure_import(MODEL, "import numpy as np")
+    assert code.splitlines()[:2] == ["import pandas as pd", "import numpy as np"]
+    assert ensure_import(code, "import numpy as np") == code
@@ -0,0 +1,63 @@
+# test_formula_evaluator.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from formula_evaluator import EvaluationError, FormulaEvaluator, WorkbookEvaluator
+from header_index import load_header_index
+from metadata_extractor import extract_metadata_final
+
+TEMPLATE = "complex_financial_model_4.xlsx"
+
+
+def _evaluate(formula, sheets, first_row=2):
+    headers = {sheet: list(frame.columns) for sheet, frame in sheets.items()}
+    evaluator = FormulaEvaluator(sheets, lambda sheet, col: headers[sheet][col - 1] if col <= len(headers[sheet]) else None)
+    return evaluator.evaluate(formula, "Sales", np.arange(len(sheets["Sales"])), first_row)
+
+
+SHEETS = {
+    "Sales": pd.DataFrame({"Product": ["p1", "P2", "P9"], "Qty": [2, None, 5]}),
+    "Products": pd.DataFrame({"Product": ["P1", "P2", "P1"], "Price": [10.0, 20.0, 99.0]}),
+}
+
+
+def test_excel_semantics():
+    # Blank cells are 0 in arithmetic
+    assert list(_evaluate("=B2*2", SHEETS)) == [4, 0, 10]
+    # Case-insensitive lookups take the first match; misses become NaN
+    prices = _evaluate("=VLOOKUP(A2, Products!$A$2:$B$4, 2, FALSE)", SHEETS)
+    assert list(prices[:2]) == [10.0, 20.0] and np.isnan(prices[2])
+    assert list(_evaluate("=IFERROR(VLOOKUP(A2, Products!$A$2:$B$4, 2, FALSE), -1)", SHEETS)) == [10.0, 20.0, -1]
+    assert _evaluate("=SUM($B$2:$B$4)", SHEETS) == 7
+    assert _evaluate('=SUMIF(Products!$A$2:$A$4, "P1", Products!$B$2:$B$4)', SHEETS) == 109.0
+    assert list(_evaluate('=IF(B2>3, "big", "small")', SHEETS)) == ["small", "small", "big"]
+    # INDEX rows outside the range are #REF! (NaN), never wrapped around
+    assert np.isnan(_evaluate("=INDEX(Products!$B$2:$B$4, -1)", SHEETS))
+    rows = _evaluate("=INDEX(Products!$B$2:$B$4, B2)", SHEETS)
+    assert rows[0] == 20.0 and np.isnan(rows[2])
+    with pytest.raises(EvaluationError):
+        _evaluate("=INDEX(Products!$B$2:$B$4, 0)", SHEETS)
+    with pytest.raises(EvaluationError):
+        _evaluate("=SUM(B2:", SHEETS)
+    # A relative range would slide with the row: not supported
+    with pytest.raises(EvaluationError):
+        _evaluate("=SUM(B2:B4)", SHEETS)
+
+
+def test_recomputes_the_cached_workbook_values():
+    sheets = {str(k).strip(): v for k, v in pd.read_excel(TEMPLATE, sheet_name=None).items()}
+    metadata = extract_metadata_final(TEMPLATE)
+    inputs = {name: frame.drop(columns=[f["column"] for f in metadata.get(name, {}).get("formulas", [])], errors="ignore")
+              for name, frame in sheets.items()}
+    result = WorkbookEvaluator(metadata, load_header_index(TEMPLATE)).evaluate(inputs)
+    assert "Price_Adjusted" not in inputs["Sales"]
+    for sheet, meta in metadata.items():
+        for formula_meta in meta["formulas"]:
+            column = formula_meta["column"]
+            expected, actual = sheets[sheet][column].tolist(), result[sheet][column].tolist()
+            if all(isinstance(v, (int, float)) for v in expected):
+                assert actual == pytest.approx(expected), column
+            else:
+                assert actual == expected, column
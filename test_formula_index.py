@@ -0,0 +1,30 @@
+# test_formula_index.py
+
+from formula_index import FormulaIndex, to_r1c1
+
+
+def test_to_r1c1():
+    assert to_r1c1("=C2*D2", 2, 5) == "=RC[-2]*RC[-1]"
+    assert to_r1c1("=C3*D3", 3, 5) == "=RC[-2]*RC[-1]"
+    assert to_r1c1("=VLOOKUP(B2, Products!$A$2:$C$5, 3, FALSE)", 2, 4) == \
+        "=VLOOKUP(RC[-2], Products!R2C1:R5C3, 3, FALSE)"
+    assert to_r1c1("=SUM(G:G)+$B1", 4, 1) == "=SUM(C[6]:C[6])+R[-3]C2"
+    # Text that only looks like a reference stays as it is
+    assert to_r1c1('=IF(A2="B2", LOG10(A2), 0)', 2, 3) == '=IF(RC[-2]="B2", LOG10(RC[-2]), 0)'
+
+
+def test_regimes_split_where_the_logic_changes():
+    index = FormulaIndex()
+    for row in range(2, 6):
+        index.add(row, 3, f"=A{row}*B{row}")
+    index.add(6, 3, "=SUM(C2:C5)")
+    for row in (8, 9):     # a gap starts a new regime even for the same shape
+        index.add(row, 3, f"=A{row}*B{row}")
+    index.add(2, 4, "=C2*0.1")
+
+    regimes = index.column_regimes(3)
+    assert [(r.first_row, r.last_row, r.formula) for r in regimes] == [
+        (2, 5, "=A2*B2"), (6, 6, "=SUM(C2:C5)"), (8, 9, "=A8*B8")]
+    assert regimes[0].rows == 4 and regimes[0].r1c1 == regimes[2].r1c1 == "=RC[-2]*RC[-1]"
+    assert index.columns == [3, 4] and index.first_formula(4) == "=C2*0.1"
+    assert len(index.shapes()["=RC[-2]*RC[-1]"]) == 2 and len(list(index)) == 4
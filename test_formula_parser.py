@@ -0,0 +1,31 @@
+# test_formula_parser.py
+
+import pytest
+
+from formula_parser import (Binary, Bool, Call, CellRef, Empty, FormulaSyntaxError, Number, RangeRef, Text, Unary,
+                            parse_formula)
+
+
+def test_precedence_follows_excel():
+    assert parse_formula("=1+2*3") == Binary("+", Number(1.0), Binary("*", Number(2.0), Number(3.0)))
+    # Unary minus binds tighter than ^: =-2^2 is 4 in Excel
+    assert parse_formula("=-2^2") == Binary("^", Unary("-", Number(2.0)), Number(2.0))
+    assert parse_formula("=10%") == Unary("%", Number(10.0))
+    assert parse_formula('=A1&"x"=B1').op == "="
+
+
+def test_references_and_literals():
+    assert parse_formula("=$A$2:B5") == RangeRef(None, 1, 2, 2, 5, True, False)
+    assert parse_formula("=Tax!A:B") == RangeRef("Tax", 1, 2, None, None, True, True)
+    assert parse_formula("='My Sheet'!B3") == CellRef("My Sheet", 2, 3, False, False)
+    assert parse_formula('="a""b"') == Text('a"b')
+    assert parse_formula("=VLOOKUP(A2,B:C,2,)").args[3] == Empty()
+    assert parse_formula("=IF(TRUE,1,0)") == Call("IF", (Bool(True), Number(1.0), Number(0.0)))
+    # Function names that look like cell references stay functions
+    assert parse_formula("=LOG10(2)") == Call("LOG10", (Number(2.0),))
+
+
+@pytest.mark.parametrize("formula", ["=SUM(A1", "=1+", "=A1 B1", "=)"])
+def test_syntax_errors(formula):
+    with pytest.raises(FormulaSyntaxError):
+        parse_formula(formula)
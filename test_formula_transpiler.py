@@ -0,0 +1,60 @@
+# test_formula_transpiler.py
+
+import ast
+
+import pandas as pd
+import pytest
+
+from formula_transpiler import (MODEL_SCAFFOLD, properties_named, transpile_calculator_properties,
+                                transpile_model_methods)
+from header_index import HeaderIndex, SheetHeaders
+
+HEADERS = HeaderIndex({"Files": SheetHeaders("Files", {1: "Path", 2: "Flag"})})
+# A trailing backslash and a run of quotes: both used to end the generated docstring early
+FORMULA = '=IF(A2="C:\\", """", "")'
+
+
+def test_model_method_keeps_the_formula_in_its_docstring():
+    metadata = {"Files": {"formulas": [{"column": "Flag", "formula": FORMULA, "rows": "2:3",
+                                        "method_name": "calculate_flag", "depends_on": ["Files.Path"]}]}}
+    methods, remaining = transpile_model_methods(metadata, HEADERS)
+    assert remaining == []
+
+    source = MODEL_SCAFFOLD.rstrip() + "\n\n" + methods["calculate_flag"]
+    namespace = {}
+    exec(source, namespace)
+    method = namespace["ExcelModel"].calculate_flag
+    assert f"Excel: {FORMULA}\n" in method.__doc__
+    result = method(namespace["ExcelModel"](), {"Files": pd.DataFrame({"Path": ["C:\\", "D:"]})})
+    assert result.tolist() == ['"', ""]
+
+
+@pytest.mark.parametrize("formula", [FORMULA, '="abc"', '=A2&"\\"'])
+def test_calculator_property_docstring_compiles(formula):
+    properties, remaining = transpile_calculator_properties("Files", {"Flag": {"formula": formula, "rows": "2:3"}},
+                                                            HEADERS)
+    assert remaining == []
+    function = ast.parse("class C:\n" + properties["flag"]).body[0].body[0]
+    assert ast.get_docstring(function) == f"Excel: {formula} (transpiled, no LLM)"
+
+
+def test_regime_comments_stay_on_one_line():
+    headers = HeaderIndex({"Sales": SheetHeaders("Sales", {1: "A", 2: "B", 3: "Total"})})
+    regimes = [{"rows": "2:3", "formula": "=A2+\nB2"}, {"rows": "4", "formula": "=A4*2"}]
+    metadata = {"Sales": {"formulas": [{"column": "Total", "formula": "=A2+\nB2", "rows": "2:4", "regimes": regimes,
+                                        "method_name": "calculate_total", "depends_on": ["Sales.A", "Sales.B"]}]}}
+    methods, remaining = transpile_model_methods(metadata, headers)
+    assert remaining == [] and "# rows 2:3: =A2+ B2\n" in methods["calculate_total"]
+
+    namespace = {}
+    exec(MODEL_SCAFFOLD.rstrip() + "\n\n" + methods["calculate_total"], namespace)
+    sheets = {"Sales": pd.DataFrame({"A": [1, 2, 3], "B": [10, 20, 30]})}
+    assert namespace["ExcelModel"]().calculate_total(sheets).tolist() == [11, 22, 6]
+
+
+def test_properties_named_in_an_error_log():
+    metadata = {"Sales": {"logic": {"Total_Sales": {}, "Sales": {}}}, "Tax": {"logic": {"Rate": {}}}}
+    log = ("Unit test failures:\n- test_model.py::test_total_sales: assert 10.0 == 12.0\n"
+           "- test_model.py::test_cross_sheet: AttributeError: 'ExcelCalculator' object has no attribute 'rate'")
+    assert properties_named(log, metadata) == ["Sales.Total_Sales", "Tax.Rate"]
+    assert properties_named("Structure Error: KeyError: 'Qty'", metadata) == []
@@ -0,0 +1,65 @@
+# test_generation_units.py
+
+import pandas as pd
+import pytest
+
+from dependency_graph import compile_plan
+from generation_units import GenerationUnits
+
+METADATA = {
+    "Sales": {
+        "formulas": [
+            {"column": "Total", "formula": "=B2*C2", "rows": "2:3", "method_name": "calculate_total",
+             "depends_on": ["Sales.Price", "Sales.Quantity"]},
+            {"column": "Tax", "formula": "=D2*0.1", "rows": "2:3", "method_name": "calculate_tax",
+             "depends_on": ["Sales.Total"]},
+            {"column": "Count", "formula": "=C2+1", "rows": "2:3", "method_name": "calculate_count",
+             "depends_on": ["Sales.Quantity"]},
+        ],
+        "raw_inputs": [{"column": "Price"}, {"column": "Quantity"}],
+    }
+}
+
+ANSWER = '''```python
+import numpy as np
+
+class ExcelModel:
+    def calculate_total(self, sheets):
+        """=B2*C2"""
+        return sheets["Sales"]["Price"] * sheets["Sales"]["Quantity"]
+
+    def calculate_tax(self, sheets):
+        """=D2*0.1"""
+        return sheets["Sales"]["Total"] * 0.1
+```'''
+
+
+def _model(code):
+    namespace = {}
+    exec(code, namespace)
+    return namespace["ExcelModel"]()
+
+
+def test_plan_without_drops_downstream_steps():
+    plan = compile_plan(METADATA).without(["calculate_total"])
+    assert [step.method_name for step in plan.order] == ["calculate_count"]
+
+
+def test_assemble_leaves_out_methods_without_source():
+    units = GenerationUnits(METADATA)
+    assert units.accept(ANSWER, ["calculate_total", "calculate_tax", "calculate_count"]) == ["calculate_count"]
+    assert units.unsourced() == ["calculate_count"]
+
+    code = units.assemble(compile_plan(METADATA))
+    assert "NotImplementedError" not in code and "calculate_count" not in code
+    sheets = _model(code).transform({"Sales": pd.DataFrame({"Price": [2.0, 3.0], "Quantity": [1, 2]})})
+    assert sheets["Sales"]["Tax"].tolist() == pytest.approx([0.2, 0.6])
+
+
+def test_record_keeps_downstream_units_pending():
+    units = GenerationUnits(METADATA)
+    units.accept(ANSWER, ["calculate_total", "calculate_tax"])
+    units.record({"calculate_total": "mismatch", "calculate_tax": "mismatch"}, plan=compile_plan(METADATA))
+    assert units.units["calculate_total"]["status"] == "failed"
+    assert units.units["calculate_tax"]["status"] == "pending"
+    assert units.needs_llm() == ["calculate_total", "calculate_count"]
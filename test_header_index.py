@@ -0,0 +1,26 @@
+# test_header_index.py
+
+from header_index import SheetHeaders, load_header_index, sanitize_identifier
+
+
+def test_lookups_in_every_direction():
+    sheet = SheetHeaders("Sales", {3: "Unit Price", 1: "Product", 4: "Product", 5: 0}, max_column=6)
+    assert sheet.header(3) == sheet.header("C") == "Unit Price"
+    # Duplicate headers resolve to the left-most column
+    assert sheet.letter("Product") == "A" and sheet.index("Product") == 1
+    assert sheet.letter("Missing") is None and sheet.index("Missing") is None
+    assert sheet.identifier(3) == "Unit_Price"
+    # Falsy headers fall back to Col_<n>
+    assert sheet.identifier(2) == "Col_2" and sheet.identifier(5) == "Col_5"
+    assert sheet.method_name("Unit Price") == "calculate_unit_price"
+    assert sheet.column_map() == {"A": "Product", "B": "Col_2", "C": "Unit_Price", "D": "Product",
+                                  "E": "Col_5", "F": "Col_6"}
+    assert sanitize_identifier("Margin %") == "Margin__"
+
+
+def test_workbook_index_is_shared_per_file_version():
+    index = load_header_index("complex_financial_model_4.xlsx")
+    assert load_header_index("complex_financial_model_4.xlsx") is index
+    assert "Sales" in index and "Nope" not in index
+    assert index.header("Sales", "D") == "Price_Adjusted" and index.header("Nope", 1) is None
+    assert index.as_dict()["Sales"] == {1: "TransactionID", 2: "ProductID", 3: "Quantity", 4: "Price_Adjusted"}
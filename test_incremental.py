@@ -0,0 +1,66 @@
+# test_incremental.py
+
+import pandas as pd
+import pytest
+
+from dependency_graph import compile_plan, install_methods, install_transform
+from formula_transpiler import MODEL_SCAFFOLD, transpile_model_methods
+from header_index import load_header_index
+from incremental import Change, IncrementalTransform
+from metadata_extractor import extract_metadata_final
+
+TEMPLATE = "complex_financial_model_4.xlsx"
+
+
+@pytest.fixture(scope="module")
+def model_and_metadata():
+    metadata = extract_metadata_final(TEMPLATE)
+    methods, _ = transpile_model_methods(metadata, load_header_index(TEMPLATE))
+    namespace = {}
+    exec(install_transform(install_methods(MODEL_SCAFFOLD, methods, "ExcelModel"), compile_plan(metadata)), namespace)
+    return namespace["ExcelModel"](), metadata
+
+
+def _inputs():
+    return {str(k).strip(): v for k, v in pd.read_excel(TEMPLATE, sheet_name=None).items()}
+
+
+def _assert_same(result, expected):
+    for sheet, frame in expected.items():
+        for column in frame.columns:
+            expected_values = frame[column].tolist()
+            if frame[column].dtype.kind in "if":
+                expected_values = pytest.approx(expected_values)
+            assert result[sheet][column].tolist() == expected_values, f"{sheet}.{column}"
+
+
+def test_row_changes_recompute_only_those_rows(model_and_metadata):
+    model, metadata = model_and_metadata
+    inc = IncrementalTransform(model, metadata)
+    inputs = _inputs()
+    inc.run(inputs)
+
+    inputs["Sales"] = inputs["Sales"].copy()
+    inputs["Sales"].loc[1, "Quantity"] = 7
+    result = inc.update(inputs, [Change("Sales", "Quantity", rows=[1])])
+    assert inc.last_recomputed == {"Sales.Price_Adjusted": 1, "Financials.Total_Sales": None,
+                                   "Financials.Global_Margins_Value": None, "Financials.Profit_Loss": None}
+    _assert_same(result, model.transform(inputs))
+
+
+def test_other_sheet_changes_recompute_whole_columns(model_and_metadata):
+    model, metadata = model_and_metadata
+    inc = IncrementalTransform(model, metadata)
+    inputs = _inputs()
+    inc.run(inputs)
+
+    inputs["Global_Margins"] = pd.DataFrame({"Global_Margin": [5000], "Value": [0.5]})
+    result = inc.update(inputs, [Change("Global_Margins", "Value")])
+    assert list(inc.last_recomputed) == ["Financials.Global_Margins_Value", "Financials.Profit_Loss"]
+    _assert_same(result, model.transform(inputs))
+
+    # Added rows replace the sheet and recompute everything downstream in full
+    inputs["Sales"] = pd.concat([inputs["Sales"], inputs["Sales"].tail(1)], ignore_index=True)
+    result = inc.update(inputs, [Change("Sales", "Quantity", rows=[5])])
+    assert inc.last_recomputed["Sales.Price_Adjusted"] is None and len(result["Sales"]) == 6
+    _assert_same(result, model.transform(inputs))
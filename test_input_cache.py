@@ -0,0 +1,54 @@
+# test_input_cache.py
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from input_cache import InputCache
+
+WORKBOOKS = ["test_financial_model_4.xlsx", "Project_Management_System.xlsx"]
+
+
+@pytest.mark.parametrize("path", WORKBOOKS)
+def test_cached_frames_equal_read_excel(path, tmp_path):
+    cache = InputCache(str(tmp_path))
+    expected = pd.read_excel(path, sheet_name=None)
+    for status in ("built", "hit"):
+        sheets = cache.load(path)
+        assert cache.last_status == status
+        assert list(sheets) == list(expected)
+        for name, frame in expected.items():
+            pd.testing.assert_frame_equal(sheets[name], frame)
+
+
+def test_frames_are_writable_and_edits_do_not_reach_the_cache(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"))
+    sheets = cache.load("test_financial_model_4.xlsx")
+    sales = next(frame for frame in sheets.values() if "Quantity" in frame.columns)
+    sales.loc[0, "Quantity"] = -1
+    again = next(frame for frame in cache.load("test_financial_model_4.xlsx").values() if "Quantity" in frame.columns)
+    assert again.loc[0, "Quantity"] != -1
+
+
+def test_a_changed_workbook_is_rebuilt(tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    shutil.copy("test_financial_model_4.xlsx", path)
+    cache = InputCache(str(tmp_path / "cache"))
+    cache.load(path)
+    old_key = cache.key(path)
+
+    frames = pd.read_excel(path, sheet_name=None)
+    first = next(iter(frames))
+    frames[first] = frames[first].head(1)
+    with pd.ExcelWriter(path) as writer:
+        for name, frame in frames.items():
+            frame.to_excel(writer, sheet_name=name, index=False)
+
+    assert len(cache.load(path)[first]) == 1
+    assert cache.last_status == "rebuilt (workbook changed)"
+    assert not os.path.exists(tmp_path / "cache" / old_key)
+    cache.invalidate(path)
+    cache.load(path)
+    assert cache.last_status == "built"
@@ -0,0 +1,71 @@
+# test_llm_cache.py
+
+import asyncio
+import os
+
+from langchain_core.messages import AIMessage
+
+from llm_cache import CachedLLM, LLMCache, metered
+
+
+class FakeChat:
+    def __init__(self, **params):
+        self.params = params
+        self.calls = []
+
+    @property
+    def _identifying_params(self):
+        return {"model": "fake", **self.params}
+
+    def bind(self, **kwargs):
+        return FakeChat(**{**self.params, **kwargs})
+
+    def invoke(self, prompt, **kwargs):
+        self.calls.append((prompt, kwargs))
+        return AIMessage(content=f"{prompt} {kwargs}", usage_metadata={"input_tokens": 3, "output_tokens": 2,
+                                                                       "total_tokens": 5})
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+
+def test_nothing_on_disk_before_the_first_response(tmp_path):
+    cache_dir = str(tmp_path / "llm")
+    cache = LLMCache(cache_dir)
+    assert cache.get(cache.key({}, "prompt")) is None
+    assert cache.stats()["entries"] == 0
+    cache.clear()
+    assert not os.path.exists(cache_dir)
+
+    CachedLLM(FakeChat(), cache).invoke("prompt")
+    assert os.path.exists(cache.path) and cache.stats()["entries"] == 1
+
+
+def test_repeated_prompt_is_served_from_the_cache(tmp_path):
+    chat = FakeChat(temperature=0)
+    llm = CachedLLM(chat, LLMCache(str(tmp_path)))
+    with metered() as usage:
+        first = llm.invoke("hello")
+        second = asyncio.run(llm.ainvoke("hello"))
+    assert first.content == second.content and len(chat.calls) == 1
+    assert usage == {"calls": 1, "cached_calls": 1, "input_tokens": 3, "output_tokens": 2}
+    # A new process reads the same database
+    assert CachedLLM(chat, LLMCache(str(tmp_path))).invoke("hello").content == first.content
+    assert len(chat.calls) == 1
+
+
+def test_bound_parameters_and_call_arguments_are_part_of_the_key(tmp_path):
+    chat = FakeChat(temperature=0)
+    llm = CachedLLM(chat, LLMCache(str(tmp_path)))
+    llm.invoke("hello")
+    llm.invoke("hello", stop=["```"])
+    llm.invoke("hello", stop=["```"])
+    assert chat.calls == [("hello", {}), ("hello", {"stop": ["```"]})]
+    assert llm.bind(temperature=0.7).invoke("hello").content == "hello {}"
+    assert llm.cache.stats()["entries"] == 3
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = LLMCache(str(tmp_path), ttl_seconds=-1)
+    cache.put("k", "old", 1.0)
+    assert cache.get("k") is None
@@ -0,0 +1,28 @@
+# test_lookup_runtime.py
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from lookup_runtime import LookupIndex, vlookup
+
+PRODUCTS = pd.DataFrame({"ProductID": ["P1", "p2", "P1", None, 3], "Price": [10, 20, 99, 5, 30]})
+
+
+def test_first_match_wins_and_never_adds_rows():
+    sales = pd.Series(["P1", "P2", "P9", 3.0, None], index=[10, 11, 12, 13, 14])
+    prices = vlookup(sales, PRODUCTS, "ProductID", "Price")
+    assert list(prices.index) == [10, 11, 12, 13, 14]
+    assert prices.tolist()[:2] == [10.0, 20.0] and prices[13] == 30.0
+    # Misses and blank keys are NaN (#N/A), never a match on the blank table row
+    assert math.isnan(prices[12]) and math.isnan(prices[14])
+    assert len(LookupIndex(PRODUCTS["ProductID"])) == 3
+
+
+def test_single_keys_and_found_mask():
+    index = LookupIndex(PRODUCTS["ProductID"])
+    assert index.lookup("p1", PRODUCTS["Price"]) == 10
+    assert math.isnan(index.lookup("nope", PRODUCTS["Price"]))
+    assert index.match(np.array(["P2", "x"])).found.tolist() == [True, False]
+    assert LookupIndex([]).lookup(pd.Series(["a"]), pd.Series([], dtype=float)).isna().all()
@@ -0,0 +1,55 @@
+# test_metadata_cache.py
+
+import openpyxl
+
+from metadata_cache import MetadataCache
+
+
+def _workbook(path, sales_rows):
+    workbook = openpyxl.Workbook()
+    sales = workbook.active
+    sales.title = "Sales"
+    sales.append(["Product", "Qty"])
+    for row in sales_rows:
+        sales.append(row)
+    products = workbook.create_sheet("Products")
+    products.append(["Product", "Price"])
+    products.append(["P1", 100])
+    workbook.save(path)
+
+
+def test_only_changed_sheets_are_mined_again(tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    cache = MetadataCache(str(tmp_path / "cache"))
+    mined = []
+
+    def mine_sheets(names):
+        mined.append(sorted(names))
+        return {name: {"sheet": name, "rows": 1} for name in names}
+
+    _workbook(path, [["P1", 1]])
+    first = cache.get_or_mine(path, "test", "1", mine_sheets)
+    assert list(first) == ["Sales", "Products"] and mined == [["Products", "Sales"]]
+
+    # Unchanged file: one manifest lookup, nothing mined
+    assert cache.get_or_mine(path, "test", "1", mine_sheets) == first
+    assert len(mined) == 1
+
+    # Sales edited: Products comes from its sheet entry
+    _workbook(path, [["P1", 1], ["P1", 2]])
+    cache.get_or_mine(path, "test", "1", mine_sheets)
+    assert mined[-1] == ["Sales"]
+
+    # A new miner version mines everything again
+    cache.get_or_mine(path, "test", "2", mine_sheets)
+    assert mined[-1] == ["Products", "Sales"]
+    assert cache.stats() == {"hits": 3, "misses": 5, "hit_rate": 0.375}
+
+
+def test_cached_value_looks_like_a_fresh_one(tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    _workbook(path, [["P1", 1]])
+    cache = MetadataCache(str(tmp_path / "cache"))
+    fresh = cache.get_or_mine(path, "test", "1", lambda names: {n: {"rows": (1, 2)} for n in names})
+    assert fresh["Sales"] == {"rows": [1, 2]}
+    assert MetadataCache(str(tmp_path / "cache")).get_or_mine(path, "test", "1", None) == fresh
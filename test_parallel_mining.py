@@ -0,0 +1,44 @@
+# test_parallel_mining.py
+
+import pytest
+
+from logic_miner import IndustryLogicMiner
+from metadata_extractor import extract_metadata_final, get_dependencies_from_tokens
+from metadata_cache import MetadataCache
+
+WORKBOOKS = ["complex_financial_model_4.xlsx", "Project_Management_System.xlsx"]
+
+
+@pytest.mark.parametrize("path", WORKBOOKS)
+def test_process_pool_matches_the_serial_miners(path):
+    assert extract_metadata_final(path, max_workers=2) == extract_metadata_final(path, max_workers=1)
+    assert (IndustryLogicMiner(path, max_workers=2).extract_full_context()
+            == IndustryLogicMiner(path, max_workers=1).extract_full_context())
+
+
+def test_notebook_metadata():
+    metadata = extract_metadata_final("complex_financial_model_4.xlsx")
+    assert list(metadata) == ["Discounts", "Global_Margins", "Tax", "Products", "Sales", "Financials"]
+    sales = metadata["Sales"]
+    assert [raw["column"] for raw in sales["raw_inputs"]] == ["TransactionID", "ProductID", "Quantity"]
+    (price,) = sales["formulas"]
+    assert price["method_name"] == "calculate_price_adjusted" and price["rows"] == "2:6"
+    assert "Tax.Tax_Rate" in price["depends_on"] and "Sales.Quantity" in price["depends_on"]
+    assert [f["depends_on"] for f in metadata["Financials"]["formulas"]] == [
+        ["Sales.Price_Adjusted"], ["Financials.Total_Sales", "Global_Margins.Value"],
+        ["Financials.Global_Margins_Value", "Global_Margins.Global_Margin"]]
+
+
+def test_cached_miners_return_the_same_metadata(tmp_path):
+    path = "Project_Management_System.xlsx"
+    cache = MetadataCache(str(tmp_path))
+    assert extract_metadata_final(path, cache=cache) == extract_metadata_final(path)
+    assert extract_metadata_final(path, cache=cache) == extract_metadata_final(path)
+    assert cache.stats()["hits"] == len(extract_metadata_final(path))
+
+
+def test_dependencies_from_legacy_header_map():
+    headers = {"Sales": {1: "Product", 2: "Qty", 3: "Price"}, "Tax": {1: "Product", 2: "Rate"}}
+    assert get_dependencies_from_tokens('=IF(B2>0, C2*VLOOKUP(A2, Tax!$A$2:$B$9, 2, FALSE), "B2")', "Sales",
+                                        headers) == ["Sales.Price", "Sales.Product", "Sales.Qty",
+                                                     "Tax.Product", "Tax.Rate"]
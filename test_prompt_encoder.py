@@ -0,0 +1,46 @@
+# test_prompt_encoder.py
+
+from dependency_extractor import extract_references, references_to_metadata
+from header_index import HeaderIndex, SheetHeaders
+from prompt_encoder import encode_metadata
+from schema_engine import ColumnarSchema
+from workbook_scanner import ScannedCell
+
+HEADERS = HeaderIndex({
+    "Budget": SheetHeaders("Budget", {1: "Dept", 2: "Allocated", 3: "Spent", 4: "Value", 5: "Value"}),
+    "Tasks": SheetHeaders("Tasks", {1: "Task", 2: "Dept"}),
+})
+
+
+def _formula(column, letter, formula, row=2, sheet="Budget"):
+    refs = extract_references(formula, sheet, row, ord(letter) - 64)
+    return {"column": column, "excel_col": letter, "formula": formula, "rows": f"{row}:5",
+            "references": references_to_metadata(refs, HEADERS), "method_name": f"calculate_{letter.lower()}"}
+
+
+def _encode(*formulas):
+    return encode_metadata({"Budget": {"formulas": list(formulas), "raw_inputs": []}})
+
+
+def test_duplicate_header_keeps_its_own_column():
+    text = _encode(_formula("Value", "D", "=IFERROR(C2/B2, 0)"), _formula("Value", "E", "=B2-C2"))
+    assert "Value [D, rows 2:5, calculate_d] =IFERROR(C2/B2, 0)" in text
+    assert "Value [E, rows 2:5, calculate_e] =B2-C2" in text
+
+
+def test_relative_rows_show_their_offset():
+    text = _encode(_formula("Value", "D", "=C3-C2+D2", row=3))
+    assert "refs: C=Spent (row), C=Spent (row-1), D=Value (row-1)" in text
+
+
+def test_whole_columns():
+    text = _encode(_formula("Spent", "C", "=SUMIFS(Tasks!B:B, Tasks!A:A, A2)"))
+    assert "Tasks!B:B=Dept, Tasks!A:A=Task, A=Dept (row)" in text
+
+
+def test_blank_unnamed_columns_are_not_in_the_schema():
+    schema = ColumnarSchema()
+    schema.add_row(2, [ScannedCell(2, 1, None, "a"), ScannedCell(2, 2, None, 1)])
+    schema.add_row(3, [ScannedCell(3, 1, None, "b"), ScannedCell(3, 3, None, None)])
+    summary = schema.summary({1: "Name", 2: None, 3: None, 4: "Empty"})
+    assert list(summary) == ["Name", "Col_2", "Empty"]
@@ -0,0 +1,92 @@
+# test_sandbox_pool.py
+
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from sandbox_pool import SandboxPool, SharedFrames
+
+MODEL = '''
+class ExcelModel:
+    def transform(self, sheets):
+        sales = sheets["Sales"]
+        sales["Total"] = sales["Qty"] * sales["Price"]
+        sales["Qty"] += 1000   # in-place edit of the shared input
+        return sheets
+'''
+
+SPIN = '''
+class ExcelModel:
+    def transform(self, sheets):
+        while True:
+            pass
+'''
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(workers=1, timeout=30, cpu_seconds=2, memory_mb=512, warm_imports=("pandas",))
+    yield pool
+    pool.close()
+
+
+def _sheets():
+    return {"Sales": pd.DataFrame({"Product": ["P1", "P2"], "Qty": [2, 3], "Price": [10.0, 20.0]})}
+
+
+def test_jobs_run_on_copy_on_write_inputs(pool):
+    sheets = _sheets()
+    with SharedFrames(sheets) as shared:
+        first = pool.run("model_transform", MODEL, shared, columns={"Sales": ["Total"]})
+        again = pool.run("model_transform", MODEL, shared, columns={"Sales": ["Total"]})
+    assert first.ok and first.error is None
+    assert first.value["frames"]["Sales"]["Total"].tolist() == [20.0, 60.0]
+    # The worker's edit of Qty never reached the shared block
+    assert again.value["frames"]["Sales"]["Total"].tolist() == [20.0, 60.0]
+    assert sheets["Sales"]["Qty"].tolist() == [2, 3]
+
+
+def test_errors_come_back_as_text(pool):
+    result = pool.run("model_transform", "class ExcelModel:\n    def transform(self, s):\n        return 1 / 0\n", _sheets())
+    assert not result.ok and "ZeroDivisionError" in result.error
+    assert pool.run("model_transform", "def (", _sheets()).value == {"load_error": "SyntaxError: invalid syntax (<string>, line 1)"}
+
+
+def test_runaway_code_is_killed_and_the_worker_replaced(pool):
+    replaced = pool.stats()["replaced"]
+    result = pool.run("model_transform", SPIN, _sheets(), timeout=1)
+    assert not result.ok and result.error.startswith("timeout")
+    result = pool.run("model_transform", SPIN, _sheets())
+    assert not result.ok and result.error.startswith("cpu limit")
+    assert pool.stats()["replaced"] == replaced + 2
+    assert pool.run("model_transform", MODEL, _sheets(), columns={"Sales": ["Total"]}).ok
+
+
+def test_closing_during_a_task_leaves_no_worker_behind():
+    before = set(mp.active_children())
+    pool = SandboxPool(workers=1, timeout=30, cpu_seconds=None, memory_mb=None, warm_imports=())
+    pool.start()
+    results = []
+    busy = threading.Thread(target=lambda: results.append(pool.run("model_transform", SPIN, _sheets(), timeout=2)))
+    busy.start()
+    time.sleep(0.5)
+    pool.close()
+    busy.join()
+    # The timed-out worker is killed and not replaced: nothing is left to leak
+    assert results[0].error.startswith("timeout") and pool._idle.empty()
+    assert not [p for p in set(mp.active_children()) - before if p.is_alive()]
+
+
+def test_agent_module_is_safe_to_import_in_a_worker(tmp_path):
+    # Spawned workers re-import the main script: importing the agent must build nothing
+    probe = "import ExelMINER_Agent as agent; print(sorted(agent._singletons))"
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__)), "OPENAI_API_KEY": "unused"}
+    out = subprocess.run([sys.executable, "-c", probe], cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,38 @@
+# test_schema_engine.py
+
+import datetime
+
+import pytest
+
+from schema_engine import ColumnarSchema
+from workbook_scanner import ScannedCell
+
+
+def _feed(schema, rows):
+    for row_num, values in enumerate(rows, start=2):
+        schema.add_row(row_num, [ScannedCell(row_num, col, None, v) for col, v in enumerate(values, 1)])
+    return schema
+
+
+def test_stats_cover_the_whole_column():
+    # chunk_size=2 forces several NumPy chunks per column
+    rows = [[i, f"P{i % 3}", 1.5 * i if i % 4 else None, True, datetime.date(2024, 1, i)] for i in range(1, 11)]
+    summary = _feed(ColumnarSchema(chunk_size=2), rows).summary({1: "Id", 2: "Product", 3: "Price", 4: "Flag", 5: "Day"})
+
+    assert summary["Id"] == {"type": "numeric", "dtype": "int", "min": 1.0, "max": 10.0, "null_rate": 0.0,
+                             "cardinality": 10}
+    assert summary["Product"] == {"type": "categorical", "dtype": "str", "null_rate": 0.0, "cardinality": 3}
+    assert summary["Price"]["dtype"] == "float" and summary["Price"]["null_rate"] == 0.2
+    assert summary["Price"]["max"] == pytest.approx(15.0)
+    assert summary["Flag"]["dtype"] == "bool" and summary["Day"]["dtype"] == "datetime"
+
+
+def test_mixed_columns_and_sampling():
+    rows = [[n] for n in (1, "two", 3, "four", 5, 6)]
+    assert _feed(ColumnarSchema(), rows).summary({1: "Value"})["Value"]["dtype"] == "mixed"
+
+    sampled = _feed(ColumnarSchema(sample_rate=0.5), [[n] for n in range(1, 11)])
+    assert sampled.sampled_rows == 5
+    assert sampled.summary({1: "Value"})["Value"]["max"] == 9.0
+    with pytest.raises(ValueError):
+        ColumnarSchema(sample_rate=0)
@@ -0,0 +1,60 @@
+# test_sharded_pytest.py
+
+import textwrap
+
+from sharded_pytest import run_tests, shard
+
+SUITE = textwrap.dedent('''
+    import pytest
+    from model import VALUE
+
+    def test_value():
+        assert VALUE == 5
+
+    def test_wrong_value():
+        assert VALUE == 4, f"Failed! Expected: 4, but got: {VALUE}"
+
+    @pytest.fixture
+    def broken():
+        raise RuntimeError("fixture blew up")
+
+    def test_setup_error(broken):
+        pass
+
+    @pytest.mark.parametrize("n", [1, 2])
+    def test_param(n):
+        assert n
+''')
+
+
+def test_shard_balances_by_duration():
+    durations = {"t::a": 5.0, "t::b": 3.0, "t::c": 2.0, "t::d": 1.0}
+    assert shard(list(durations), 2, durations) == [["t::a", "t::d"], ["t::b", "t::c"]]
+    assert shard(["t::a"], 4) == [["t::a"]]
+
+
+def test_run_tests_in_subprocesses(tmp_path):
+    (tmp_path / "model.py").write_text("VALUE = 5\n")
+    (tmp_path / "test_model.py").write_text(SUITE)
+
+    run = run_tests("test_model.py", workers=2, cwd=str(tmp_path))
+    outcomes = {r.nodeid: r.outcome for r in run.results}
+    assert outcomes == {"test_model.py::test_value": "passed", "test_model.py::test_wrong_value": "failed",
+                        "test_model.py::test_setup_error": "error", "test_model.py::test_param[1]": "passed",
+                        "test_model.py::test_param[2]": "passed"}
+    assert not run.passed and run.shards == 2
+    failed = {r.nodeid: r for r in run.failures()}
+    assert failed["test_model.py::test_wrong_value"].message.startswith("AssertionError: Failed! Expected: 4")
+    assert "assert 5 == 4" in failed["test_model.py::test_wrong_value"].diff
+    assert "fixture blew up" in failed["test_model.py::test_setup_error"].details
+
+    # The model is re-imported by every run: no stale module or bytecode
+    (tmp_path / "model.py").write_text("VALUE = 4\n")
+    rerun = run_tests("test_model.py::test_wrong_value", workers=1, cwd=str(tmp_path), durations=run.durations())
+    assert rerun.passed and [r.outcome for r in rerun.results] == ["passed"]
+
+
+def test_collection_error(tmp_path):
+    (tmp_path / "test_model.py").write_text("import missing_module_xyz\n\ndef test_x():\n    pass\n")
+    run = run_tests("test_model.py", cwd=str(tmp_path))
+    assert not run.passed and "missing_module_xyz" in run.collection_error
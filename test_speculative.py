@@ -0,0 +1,49 @@
+# test_speculative.py
+
+import asyncio
+
+from speculative import candidate_settings, speculate
+
+
+def test_first_passing_candidate_wins_and_the_rest_is_cancelled():
+    validated = []
+
+    async def generate(settings):
+        # Candidate 1 is the fastest; 0 and 2 are still waiting for the "LLM" when it passes
+        await asyncio.sleep({0: 0.5, 1: 0.05, 2: 0.5}[settings["seed"]])
+        return f"code{settings['seed']}"
+
+    def validate(code):
+        validated.append(code)
+        return code == "code1", {"checked": code}
+
+    result = speculate(generate, validate, k=3, max_concurrency=3)
+    assert result.winner.value == "code1" and result.winner.report == {"checked": "code1"}
+    assert result.cancelled == 2 and validated == ["code1"]
+
+
+def test_failures_are_failed_candidates():
+    async def generate(settings):
+        if settings["seed"] == 0:
+            raise RuntimeError("rate limited")
+        return settings["seed"]
+
+    result = speculate(generate, lambda value: (False, "wrong"), k=2, max_concurrency=1)
+    assert result.winner is None
+    assert sorted((c.index, c.ok, c.report) for c in result.candidates) == [
+        (0, False, "RuntimeError: rate limited"), (1, False, "wrong")]
+
+
+def test_speculate_inside_a_running_loop():
+    async def generate(settings):
+        return settings["temperature"]
+
+    async def main():
+        return speculate(generate, lambda value: (True, None), k=1)
+
+    assert asyncio.run(main()).winner.value == 0.0
+
+
+def test_candidate_settings():
+    assert candidate_settings(3, step=0.5) == [{"temperature": 0.0, "seed": 0}, {"temperature": 0.5, "seed": 1},
+                                               {"temperature": 1.0, "seed": 2}]
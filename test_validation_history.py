@@ -0,0 +1,45 @@
+# test_validation_history.py
+
+import pandas as pd
+
+from validation_history import ValidationHistory, compare_columns, failure, render_failure, render_history
+
+
+def test_compare_columns_keeps_the_first_differing_rows():
+    excel = pd.Series([1.0, 2.0, 3.0, 4.0], index=[10, 11, 12, 13])
+    assert compare_columns(excel, excel + 0.001) is None
+    diff = compare_columns(excel, pd.Series([1.0, 9.0, 3.0, 8.0], index=excel.index), top_k=1)
+    assert diff == {"mismatches": 2, "rows": [11], "excel": [2.0], "python": [9.0]}
+
+    text = compare_columns(pd.Series(["Profit", "Loss"]), pd.Series(["Profit", "Profit"]))
+    assert text == {"mismatches": 1, "rows": [1], "excel": ["Loss"], "python": ["Profit"]}
+    assert compare_columns(excel, excel.iloc[:2]) == {"mismatches": 4, "rows": [], "excel": [], "python": []}
+
+
+def test_history_is_a_capped_ring_of_records():
+    state = []
+    for iteration in range(1, 5):
+        history = ValidationHistory(state, limit=2)
+        entry = history.start(iteration)
+        entry["passed"].append(["Sales", "Total"])
+        entry["failures"].append(failure("crash", method="calculate_x", error="KeyError: 'Qty'"))
+        new_state = history.append(entry)
+        assert new_state is not state
+        state = new_state
+    assert [entry["iteration"] for entry in state] == [3, 4]
+    assert ValidationHistory(state).last()["iteration"] == 4
+
+    text = render_history(state, separator="--")
+    assert text.startswith("(iterations 1-2 dropped: the history keeps the last 2)\n--- 🧪 ITERATION 3 ---\n")
+    assert "💥 CRASH: calculate_x raised KeyError: 'Qty'\n✅ PASS: Sales -> Total\n--\n" in text
+
+
+def test_render_failure_kinds():
+    mismatch = failure("mismatch", sheet="Sales", column="Price", formula="=B2*2",
+                       **compare_columns(pd.Series([1.0, 2.0]), pd.Series([1.0, 5.0])))
+    assert "formula" in mismatch and "error" not in mismatch
+    assert render_failure(mismatch).splitlines()[:3] == [
+        "❌ FAIL: Price in Sales (1 rows differ)", "Formula: =B2*2", "Sample Mismatches:"]
+    assert render_failure(failure("missing", sheet="Sales", column="Price")) == \
+        "❌ MISSING COLUMN: Price was not found in Sales output."
+    assert render_failure(failure("load_error", error="SyntaxError")) == "❌ EXECUTION CRASH: SyntaxError"
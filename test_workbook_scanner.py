@@ -0,0 +1,72 @@
+# test_workbook_scanner.py
+
+import zipfile
+
+import openpyxl
+import pytest
+
+from workbook_scanner import WorkbookScanner
+
+WORKBOOKS = ["complex_financial_model_4.xlsx", "Project_Management_System.xlsx", "test_financial_model_4.xlsx"]
+
+
+def _openpyxl_cells(path, data_only):
+    workbook = openpyxl.load_workbook(path, data_only=data_only)
+    cells = {}
+    for sheet in workbook.worksheets:
+        for row in sheet.iter_rows():
+            for cell in row:
+                if cell.value is not None:
+                    cells[(sheet.title, cell.row, cell.column)] = cell.value
+    return cells
+
+
+@pytest.mark.parametrize("path", WORKBOOKS)
+def test_one_pass_matches_both_openpyxl_reads(path):
+    scanner = WorkbookScanner(path)
+    formulas, values = {}, {}
+    for sheet in scanner.sheetnames:
+        for row_num, cells in scanner.iter_rows(sheet):
+            for cell in cells:
+                formulas[(sheet, row_num, cell.col)] = cell.formula
+                if cell.value is not None:
+                    values[(sheet, row_num, cell.col)] = cell.value
+
+    assert values == _openpyxl_cells(path, data_only=True)
+    expected = {k: v for k, v in _openpyxl_cells(path, data_only=False).items() if isinstance(v, str) and v.startswith("=")}
+    assert {k: v for k, v in formulas.items() if v is not None} == expected
+
+
+def test_read_header_and_row_window():
+    scanner = WorkbookScanner("complex_financial_model_4.xlsx")
+    header, max_column = scanner.read_header("Sales")
+    assert [cell.value for cell in header] == ["TransactionID", "ProductID", "Quantity", "Price_Adjusted"]
+    assert max_column == 4
+    rows = [row_num for row_num, _ in scanner.iter_rows("Sales", min_row=3, max_row=4)]
+    assert rows == [3, 4]
+
+
+def test_shared_formulas_are_translated(tmp_path):
+    path = str(tmp_path / "shared.xlsx")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Qty", "Double"])
+    for n in (1, 2, 3):
+        sheet.append([n, f"=A{n + 1}*2"])
+    workbook.save(path)
+
+    # openpyxl writes plain formulas: rewrite B2:B4 as one shared block, like Excel does on fill-down
+    with zipfile.ZipFile(path) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+    xml = parts["xl/worksheets/sheet1.xml"].decode()
+    xml = xml.replace("<f>A2*2</f>", '<f t="shared" ref="B2:B4" si="0">A2*2</f>')
+    xml = xml.replace("<f>A3*2</f>", '<f t="shared" si="0"/>').replace("<f>A4*2</f>", '<f t="shared" si="0"/>')
+    assert xml.count('si="0"') == 3
+    parts["xl/worksheets/sheet1.xml"] = xml.encode()
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+
+    scanner = WorkbookScanner(path)
+    formulas = [cell.formula for _, cells in scanner.iter_rows("Sheet", min_row=2) for cell in cells if cell.col == 2]
+    assert formulas == ["=A2*2", "=A3*2", "=A4*2"]
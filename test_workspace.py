@@ -0,0 +1,31 @@
+# test_workspace.py
+
+import sys
+
+from workspace import Workspace, list_runs, new_run_id, prune_runs
+
+
+def test_runs_do_not_share_files(tmp_path):
+    root = str(tmp_path)
+    first, second = Workspace(root=root), Workspace(root=root)
+    first.write("model.py", "VALUE = 1\n")
+    second.write("model.py", "VALUE = 2\n")
+    assert first.read("model.py") == "VALUE = 1\n"
+    assert first.files() == {"model.py": 10}
+
+    # Same id -> same directory, e.g. a resumed run
+    assert Workspace(first.run_id, root=root).read("model.py") == "VALUE = 1\n"
+    assert first.load_module("model").VALUE == 1 and second.load_module("model").VALUE == 2
+    assert first.module_name("model") not in sys.modules
+
+
+def test_list_and_prune_in_start_order(tmp_path):
+    root = str(tmp_path)
+    run_ids = ["20250101-120000-aaaaaaaa", "20250101-120001-bbbbbbbb", "20250102-090000-cccccccc"]
+    for run_id in reversed(run_ids):
+        Workspace(run_id, root=root)
+    assert list_runs(root) == run_ids
+    assert prune_runs(keep=1, root=root) == run_ids[:2]
+    assert list_runs(root) == run_ids[2:]
+    assert list_runs(str(tmp_path / "missing")) == []
+    assert len(new_run_id()) == len(run_ids[0])
@@ -0,0 +1,124 @@
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# --- STRUCTURED VALIDATION HISTORY ---
+# The validator used to append a multi-line text block per iteration to
+# state["history_log"] (a `diff_df.to_string()` for every failing column), mutate
+# the list in place and return it, so the whole text log travelled through every
+# graph step and checkpoint although only the last entry was ever read. Now each
+# iteration is a small record:
+#
+#   {"iteration": 2, "passed": [["Sales", "Total_Sales"]],
+#    "failures": [{"kind": "mismatch", "sheet": "Sales", "column": "Price_Adjusted",
+#                  "method": "calculate_price_adjusted", "formula": "=VLOOKUP(...)",
+#                  "mismatches": 37, "rows": [1, 4, ...], "excel": [800.0, ...], "python": [750.0, ...]}]}
+#
+# Only the first TOP_K differing rows are kept, and the history holds the last
+# HISTORY_LIMIT iterations (a ring buffer; the iteration numbers show what was
+# dropped). Text is rendered only where it is read: the log file
+# (render_history) and the repair prompt (render_failure, via the generation units).
+#
+#   history = ValidationHistory(state["history_log"])
+#   entry = history.start(state["iterations"] + 1)
+#   entry["failures"].append(failure("crash", method=name, error=str(e)))
+#   return {"history_log": history.append(entry)}     # a new capped list, nothing mutated
+
+HISTORY_LIMIT = 10
+TOP_K = 5
+
+
+def compare_columns(excel: pd.Series, python: pd.Series, top_k: int = TOP_K,
+                    atol: float = 1e-2) -> Optional[Dict[str, Any]]:
+    """None when the columns agree, else {mismatches, rows, excel, python} for the first `top_k` differing rows."""
+    try:
+        pd.testing.assert_series_equal(excel, python, atol=atol, check_dtype=False)
+        return None
+    except AssertionError:
+        pass
+    try:
+        diff_mask = ~(np.isclose(excel, python, atol=atol, equal_nan=True))
+    except TypeError:
+        # Text columns (e.g. "Profit" / "Loss") cannot go through isclose
+        left, right = excel.to_numpy(), python.to_numpy()
+        diff_mask = ~((left == right) | (pd.isna(left) & pd.isna(right)))
+    except ValueError:
+        diff_mask = np.zeros(0, dtype=bool)
+    diff_mask = np.asarray(diff_mask, dtype=bool)
+    if len(excel) != len(python) or not diff_mask.any():
+        # Length, index or dtype differences that no single row shows
+        return {"mismatches": max(len(excel), len(python)), "rows": [], "excel": [], "python": []}
+    rows = np.flatnonzero(diff_mask)[:top_k]
+    return {
+        "mismatches": int(diff_mask.sum()),
+        "rows": excel.index[rows].tolist(),
+        "excel": excel.iloc[rows].tolist(),
+        "python": python.iloc[rows].tolist(),
+    }
+
+
+def failure(kind: str, sheet: Optional[str] = None, column: Optional[str] = None, method: Optional[str] = None,
+            formula: Optional[str] = None, error: Optional[str] = None, **diff) -> Dict[str, Any]:
+    """kind: "mismatch" (with the compare_columns fields), "missing", "crash", "load_error" or "runtime_error"."""
+    record = {"kind": kind, "sheet": sheet, "column": column, "method": method, "formula": formula, "error": error}
+    record.update(diff)
+    return {k: v for k, v in record.items() if v is not None}
+
+
+class ValidationHistory:
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None, limit: int = HISTORY_LIMIT):
+        self.entries = list(entries or [])
+        self.limit = limit
+
+    @staticmethod
+    def start(iteration: int) -> Dict[str, Any]:
+        return {"iteration": iteration, "passed": [], "failures": []}
+
+    def append(self, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The new state value: a fresh list holding the last `limit` entries."""
+        self.entries = (self.entries + [entry])[-self.limit:]
+        return self.entries
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.entries[-1] if self.entries else None
+
+
+# --- Rendering (only when text is needed) ---
+def render_failure(record: Dict[str, Any]) -> str:
+    kind = record["kind"]
+    if kind == "mismatch":
+        text = (f"❌ FAIL: {record['column']} in {record['sheet']} "
+                f"({record['mismatches']} rows differ)\nFormula: {record.get('formula', '')}\n")
+        if record["rows"]:
+            sample = pd.DataFrame({"Excel_Actual": record["excel"], "Python_Calculated": record["python"]},
+                                  index=record["rows"])
+            text += f"Sample Mismatches:\n{sample.to_string()}\n"
+        else:
+            text += "The columns differ in length, index or type.\n"
+        return text
+    if kind == "missing":
+        if record.get("error"):
+            return f"❌ MISSING METHOD: {record['method']} ({record['sheet']} -> {record['column']}): {record['error']}"
+        return f"❌ MISSING COLUMN: {record['column']} was not found in {record['sheet']} output."
+    if kind == "crash":
+        return f"💥 CRASH: {record['method']} raised {record['error']}"
+    if kind == "load_error":
+        return f"❌ EXECUTION CRASH: {record['error']}"
+    return f"💥 RUNTIME ERROR during comparison: {record.get('error', '')}"
+
+
+def render_iteration(entry: Dict[str, Any]) -> str:
+    lines = [f"--- 🧪 ITERATION {entry['iteration']} ---"]
+    lines += [render_failure(record) for record in entry["failures"] if record["kind"] == "crash"]
+    lines += [f"✅ PASS: {sheet} -> {column}" for sheet, column in entry["passed"]]
+    lines += [render_failure(record) for record in entry["failures"] if record["kind"] != "crash"]
+    return "\n".join(lines)
+
+
+def render_history(entries: List[Dict[str, Any]], separator: str = "-" * 50) -> str:
+    text = ""
+    if entries and entries[0]["iteration"] > 1:
+        text += f"(iterations 1-{entries[0]['iteration'] - 1} dropped: the history keeps the last {len(entries)})\n"
+    return text + "".join(f"{render_iteration(entry)}\n{separator}\n" for entry in entries)
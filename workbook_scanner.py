@@ -0,0 +1,216 @@
+import re
+import zipfile
+import posixpath
+from typing import Dict, List, Any, Optional, Iterator, Tuple, NamedTuple
+from xml.etree.ElementTree import iterparse, fromstring
+
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import from_excel
+
+
+# --- STREAMING WORKBOOK SCANNER ---
+# Reads every worksheet XML exactly once and emits the formula text together with
+# the cached (last calculated) value of each cell. This replaces opening the same
+# file twice with openpyxl (data_only=False + data_only=True).
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+COORD_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+class ScannedCell(NamedTuple):
+    row: int
+    col: int
+    formula: Optional[str]  # "=..." when the cell holds a formula, else None
+    value: Any              # cached value (what data_only=True would return)
+
+
+class WorkbookScanner:
+    """
+    Single-pass reader over the raw .xlsx package.
+    Only the shared strings and the style -> date-format table are held in memory;
+    sheet rows are streamed and released as soon as the caller moves on.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        with zipfile.ZipFile(file_path) as zf:
+            self._sheet_paths = self._read_sheet_paths(zf)
+            self._shared_strings = self._read_shared_strings(zf)
+            self._date_styles = self._read_date_styles(zf)
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._sheet_paths)
+
+    def sheet_path(self, sheet_name: str) -> str:
+        return self._sheet_paths[sheet_name]
+
+    @property
+    def shared_strings(self) -> List[str]:
+        return self._shared_strings
+
+    @property
+    def date_styles(self) -> set:
+        return self._date_styles
+
+    # --- Package metadata ---
+    @staticmethod
+    def _read_sheet_paths(zf: zipfile.ZipFile) -> Dict[str, str]:
+        rels = fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        targets = {}
+        for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+            target = rel.get("Target")
+            # Targets are relative to xl/ unless they are absolute package paths
+            targets[rel.get("Id")] = target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+
+        workbook = fromstring(zf.read("xl/workbook.xml"))
+        return {
+            sheet.get("name"): targets[sheet.get(f"{REL_NS}id")]
+            for sheet in workbook.iter(f"{NS}sheet")
+        }
+
+    @staticmethod
+    def _read_shared_strings(zf: zipfile.ZipFile) -> List[str]:
+        if "xl/sharedStrings.xml" not in zf.namelist():
+            return []
+        strings = []
+        with zf.open("xl/sharedStrings.xml") as fh:
+            for _, elem in iterparse(fh):
+                if elem.tag == f"{NS}si":
+                    # Rich text is split into several <t> runs; join them like Excel does
+                    strings.append("".join(t.text or "" for t in elem.iter(f"{NS}t")))
+                    elem.clear()
+        return strings
+
+    @staticmethod
+    def _read_date_styles(zf: zipfile.ZipFile) -> set:
+        if "xl/styles.xml" not in zf.namelist():
+            return set()
+        styles = fromstring(zf.read("xl/styles.xml"))
+        custom_formats = {
+            int(fmt.get("numFmtId")): fmt.get("formatCode")
+            for fmt in styles.iter(f"{NS}numFmt")
+        }
+        cell_xfs = styles.find(f"{NS}cellXfs")
+        date_styles = set()
+        for idx, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            fmt_id = int(xf.get("numFmtId", 0))
+            code = custom_formats.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if code and is_date_format(code):
+                date_styles.add(idx)
+        return date_styles
+
+    def read_header(self, sheet_name: str) -> Tuple[List[ScannedCell], int]:
+        """
+        Row-1 cells plus the right edge of the sheet's declared <dimension>, from ONE
+        parse that stops at the end of the first row.
+        """
+        max_column = 0
+        with zipfile.ZipFile(self.file_path) as zf, zf.open(self._sheet_paths[sheet_name]) as fh:
+            for event, elem in iterparse(fh, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{NS}dimension":
+                        match = COORD_RE.match(elem.get("ref", "A1").split(":")[-1])
+                        max_column = column_index_from_string(match.group(1)) if match else 0
+                    continue
+                if elem.tag == f"{NS}row":
+                    if int(elem.get("r", 1)) != 1:
+                        break
+                    return self._decode_row(elem, 1, {}), max_column
+        return [], max_column
+
+    # --- Cell decoding ---
+    def _decode_value(self, cell_type: Optional[str], raw: Optional[str], style: Optional[str]) -> Any:
+        if raw is None:
+            return None
+        if cell_type == "s":
+            return self._shared_strings[int(raw)]
+        if cell_type in ("str", "inlineStr", "e"):
+            return raw
+        if cell_type == "b":
+            return raw == "1"
+        if cell_type == "d":
+            return raw
+        # Plain number (t="n" or missing): keep ints as ints like openpyxl does
+        number = float(raw) if any(ch in raw for ch in ".eE") else int(raw)
+        if style is not None and int(style) in self._date_styles:
+            return from_excel(number)
+        return number
+
+    def iter_rows(self, sheet_name: str, min_row: int = 1,
+                  max_row: Optional[int] = None) -> Iterator[Tuple[int, List[ScannedCell]]]:
+        """
+        Yields (row_number, cells) for every non-empty row in [min_row, max_row].
+        Cells are sparse: empty cells are not emitted. Parsing stops as soon as
+        max_row has been passed, so reading a header or a sample is cheap.
+        """
+        shared_formulas: Dict[str, Tuple[str, str]] = {}
+
+        with zipfile.ZipFile(self.file_path) as zf, zf.open(self._sheet_paths[sheet_name]) as fh:
+            sheet_data = None
+            row_num = 0
+            for event, elem in iterparse(fh, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{NS}sheetData":
+                        sheet_data = elem
+                    continue
+
+                if elem.tag != f"{NS}row":
+                    continue
+
+                row_num = int(elem.get("r", row_num + 1))
+                if max_row is not None and row_num > max_row:
+                    break
+
+                cells = self._decode_row(elem, row_num, shared_formulas)
+
+                # Release the parsed row so memory stays flat regardless of sheet length
+                elem.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+                if row_num >= min_row and cells:
+                    yield row_num, cells
+
+    def _decode_row(self, elem, row_num: int, shared_formulas: Dict[str, Tuple[str, str]]) -> List[ScannedCell]:
+        cells = []
+        col_num = 0
+        for c in elem.iter(f"{NS}c"):
+            ref = c.get("r")
+            col_num = column_index_from_string(COORD_RE.match(ref).group(1)) if ref else col_num + 1
+            formula = self._read_formula(c, row_num, col_num, shared_formulas)
+
+            cell_type = c.get("t")
+            if cell_type == "inlineStr":
+                raw = "".join(t.text or "" for t in c.iter(f"{NS}t"))
+            else:
+                v = c.find(f"{NS}v")
+                raw = v.text if v is not None else None
+
+            value = self._decode_value(cell_type, raw, c.get("s"))
+            if formula is not None or value is not None:
+                cells.append(ScannedCell(row_num, col_num, formula, value))
+        return cells
+
+    @staticmethod
+    def _read_formula(c, row_num: int, col_num: int, shared_formulas: Dict[str, Tuple[str, str]]) -> Optional[str]:
+        f = c.find(f"{NS}f")
+        if f is None:
+            return None
+        coord = f"{get_column_letter(col_num)}{row_num}"
+        if f.get("t") == "shared":
+            si = f.get("si")
+            if f.text:
+                # Master cell of a shared formula block
+                shared_formulas[si] = (f"={f.text}", coord)
+                return f"={f.text}"
+            if si in shared_formulas:
+                master_formula, master_coord = shared_formulas[si]
+                return Translator(master_formula, origin=master_coord).translate_formula(coord)
+            return None
+        return f"={f.text}" if f.text else None
@@ -0,0 +1,102 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+import importlib.util
+from types import ModuleType
+from typing import Dict, List, Optional
+
+
+# --- PER-RUN WORKSPACES ---
+# Every conversion used to write its artifacts to fixed names in the current
+# directory (model.py, test_model.py, pytest_demo_data.xlsx in the agent,
+# test_financial_model_5_0.py and pytest_validation_log_5_0.txt in the notebook),
+# so two runs on one host overwrote each other and the pipeline was serialized.
+# Each run now gets its own directory keyed by run id:
+#
+#   .runs/20250101-120000-3f9a1c2e/model.py
+#   .runs/20250101-120000-3f9a1c2e/test_model.py
+#
+# The file names inside stay the same, so a generated test still says
+# `from model import ExcelCalculator`: its pytest subprocess runs with the
+# workspace as cwd (see sharded_pytest) and finds that run's model first. For
+# in-process use, load_module() imports a workspace file under a run-specific
+# module name that is never registered in sys.modules.
+#
+#   ws = Workspace(state.run_id)      # same id -> same directory
+#   ws.write("model.py", code)
+#   run_tests("test_model.py", cwd=ws.path(), pythonpath=ws.pythonpath())
+
+RUNS_DIR = ".runs"
+# Directory of the runtime modules generated code imports (calculator_runtime, lookup_runtime, ...)
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def new_run_id() -> str:
+    """Sortable by start time, unique across threads and processes."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class Workspace:
+    def __init__(self, run_id: Optional[str] = None, root: str = RUNS_DIR):
+        self.run_id = run_id or new_run_id()
+        self.root = root
+        self.dir = os.path.abspath(os.path.join(root, self.run_id))
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, *names: str) -> str:
+        return os.path.join(self.dir, *names)
+
+    def write(self, name: str, text: str) -> str:
+        path = self.path(name)
+        # Readers (a pytest shard, a resumed run) never see a half-written file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp_path, path)
+        return path
+
+    def read(self, name: str) -> str:
+        with open(self.path(name), encoding="utf-8") as fh:
+            return fh.read()
+
+    def pythonpath(self) -> List[str]:
+        """sys.path entries a subprocess needs on top of its cwd (the workspace)."""
+        return [SOURCE_DIR]
+
+    def module_name(self, name: str) -> str:
+        return f"{name}__{self.run_id.replace('-', '_')}"
+
+    def load_module(self, name: str) -> ModuleType:
+        """Imports <workspace>/<name>.py as a private module (nothing cached in sys.modules)."""
+        spec = importlib.util.spec_from_file_location(self.module_name(name), self.path(f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def files(self) -> Dict[str, int]:
+        return {name: os.path.getsize(self.path(name)) for name in sorted(os.listdir(self.dir))
+                if not name.endswith(".tmp")}
+
+    def remove(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __repr__(self) -> str:
+        return f"Workspace({self.run_id!r}, dir={self.dir!r})"
+
+
+def list_runs(root: str = RUNS_DIR) -> List[str]:
+    """Run ids in start order."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+
+
+def prune_runs(keep: int = 20, root: str = RUNS_DIR) -> List[str]:
+    """Deletes all but the `keep` most recent workspaces; returns the removed run ids."""
+    runs = list_runs(root)
+    removed = runs[:max(0, len(runs) - keep)]
+    for run_id in removed:
+        shutil.rmtree(os.path.join(root, run_id), ignore_errors=True)
+    return removed